@@ -0,0 +1,125 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.getcwd())
+
+from routeopt import columnar
+from routeopt.models import OptimizeRequest, OptimizeResponse
+from routeopt.pool import pack_request
+
+# JSON vs columnar MessagePack for one large plan, every hop of /optimize except the solve itself
+# (identical for both): client encode, server decode + validation, packing for the solver pool,
+# response encode, client decode. --http adds a real round trip through the app (short solve).
+
+def make_payload(n, seed):
+    rng = random.Random(seed)
+    return {
+        "depot": {"id": "D1", "lat": 12.9716, "lng": 77.5946, "shift_start_min": 0, "shift_end_min": 1200},
+        "vehicles": [{"id": f"V{i}", "capacity": {"units": 200}, "shift_start_min": 0, "shift_end_min": 1200}
+                     for i in range(max(1, n // 40))],
+        "stops": [{"id": f"S{i}", "lat": 12.9716 + rng.uniform(-0.1, 0.1), "lng": 77.5946 + rng.uniform(-0.1, 0.1),
+                   "demand_units": rng.randint(1, 8), "service_time_min": 5, "priority": rng.choice([1, 2]),
+                   "time_window_start": 480 if i % 2 else None, "time_window_end": 1080 if i % 2 else None,
+                   "items": [{"cylinder_type_id": "14kg", "deliver_units": 2, "pickup_units": 1}] if i % 3 == 0 else []}
+                  for i in range(n)],
+        "params": {"time_limit_seconds": 1, "use_matrix_cache": False},
+    }
+
+def make_response(request, per_route=40):
+    # Synthetic routes over every stop: the response size of a fully served plan
+    routes = []
+    for r in range(0, len(request.stops), per_route):
+        steps = [{"stop_id": s.id, "arrival_time": 500 + k, "departure_time": 505 + k, "service_time": 5,
+                  "waiting_time": 0, "dist_from_prev_km": 1.25, "delivered_units": s.demand_units,
+                  "window_start": 0, "window_end": 1200, "onboard_mass_kg": 310.5, "full_units_onboard": 10,
+                  "empty_units_onboard": 2}
+                 for k, s in enumerate(request.stops[r:r + per_route])]
+        routes.append({"vehicle_id": f"V{r // per_route}", "steps": steps, "total_dist_km": 50.0,
+                       "total_time_min": 400, "total_demand_units": 120, "total_ton_km": 12.5,
+                       "max_onboard_mass_kg": 600.0, "avg_onboard_mass_kg": 300.0, "co2_kg": 4.2})
+    return OptimizeResponse.model_validate({"routes": routes, "summary": {
+        "total_dist_km": 50.0 * len(routes), "total_time_min": 400 * len(routes), "unserved_stop_ids": [],
+        "status": "OK"}}).model_dump()
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+def release(packed):
+    shm, _ = packed
+    shm.close()
+    shm.unlink()
+
+def bench_json(payload, response, repeat):
+    body, enc = timed(lambda: json.dumps(payload).encode(), repeat)
+    request, dec = timed(lambda: OptimizeRequest.model_validate_json(body), repeat)
+    packed, pack = timed(lambda: pack_request(request), 1)
+    release(packed)
+    out, resp_enc = timed(lambda: OptimizeResponse.model_validate(response).model_dump_json().encode(), repeat)
+    _, resp_dec = timed(lambda: json.loads(out), repeat)
+    return {"request_bytes": len(body), "response_bytes": len(out), "client_encode": enc, "server_decode": dec,
+            "pack": pack, "response_encode": resp_enc, "client_decode": resp_dec}
+
+def bench_msgpack(request, response, repeat):
+    body, enc = timed(lambda: columnar.packb(columnar.encode_request(request)), repeat)
+    decoded, dec = timed(lambda: columnar.decode_request(columnar.unpackb(body)), repeat)
+    packed, pack = timed(decoded.pack, 1)
+    release(packed)
+    out, resp_enc = timed(lambda: columnar.packb(columnar.encode_response(response)), repeat)
+    _, resp_dec = timed(lambda: columnar.decode_response(columnar.unpackb(out)), repeat)
+    return {"request_bytes": len(body), "response_bytes": len(out), "client_encode": enc, "server_decode": dec,
+            "pack": pack, "response_encode": resp_enc, "client_decode": resp_dec}
+
+def bench_http(payload, request):
+    from fastapi.testclient import TestClient
+    from routeopt.api import app
+    from routeopt.pool import solver_pool
+    solver_pool.max_workers = 1
+    body = columnar.packb(columnar.encode_request(request))
+    with TestClient(app) as client:
+        client.post("/optimize", json=payload) # Warm the worker (and its imports)
+        t0 = time.perf_counter()
+        r = client.post("/optimize", json=payload)
+        json.loads(r.content)
+        json_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        r = client.post("/optimize", content=body, headers={"Content-Type": columnar.MSGPACK_MEDIA_TYPE})
+        columnar.decode_response(columnar.unpackb(r.content))
+        msgpack_s = time.perf_counter() - t0
+    return json_s, msgpack_s
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/optimize body encodings: JSON vs columnar MessagePack")
+    parser.add_argument("--stops", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N for each phase")
+    parser.add_argument("--http", action="store_true", help="Also time full /optimize round trips (1s solve)")
+    args = parser.parse_args()
+    if not columnar.available():
+        sys.exit("msgpack is not installed (pip install msgpack)")
+
+    payload = make_payload(args.stops, seed=args.stops)
+    request = OptimizeRequest.model_validate(payload)
+    response = make_response(request)
+    results = {"JSON": bench_json(payload, response, args.repeat),
+               "MessagePack": bench_msgpack(request, response, args.repeat)}
+
+    print(f"\n--- {args.stops} stops ---")
+    phases = ["client_encode", "server_decode", "pack", "response_encode", "client_decode"]
+    print(f"{'Format':<12} | {'Req KB':<8} | {'Resp KB':<8} | " + " | ".join(f"{p:<15}" for p in phases) + " | Total(s)")
+    print("-" * 130)
+    for name, r in results.items():
+        print(f"{name:<12} | {r['request_bytes'] / 1e3:<8.0f} | {r['response_bytes'] / 1e3:<8.0f} | " +
+              " | ".join(f"{r[p]:<15.4f}" for p in phases) + f" | {sum(r[p] for p in phases):.4f}")
+
+    if args.http:
+        json_s, msgpack_s = bench_http(payload, request)
+        print(f"\nHTTP round trip (incl. 1s solve): JSON {json_s:.3f}s, MessagePack {msgpack_s:.3f}s")
@@ -0,0 +1,93 @@
+import sys
+import os
+import random
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+from routeopt.matrix import haversine_distance, compute_distance_matrix
+
+# Reference: the pre-NumPy double loop, as create_data_model used to call it
+# (distance matrix + an unused time matrix at speed 1.0).
+def legacy_distance_matrix(locations):
+    size = len(locations)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if i != j:
+                matrix[i][j] = haversine_distance(locations[i][0], locations[i][1],
+                                                  locations[j][0], locations[j][1])
+    return matrix
+
+def legacy_time_matrix(locations, speed_kmh=1.0):
+    size = len(locations)
+    matrix = [[0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if i != j:
+                dist = haversine_distance(locations[i][0], locations[i][1],
+                                          locations[j][0], locations[j][1])
+                matrix[i][j] = int(round((dist / speed_kmh) * 60))
+    return matrix
+
+def random_locations(n, seed):
+    rng = random.Random(seed)
+    # Bangalore approx, +/- ~10km
+    return [(12.9716 + rng.uniform(-0.1, 0.1), 77.5946 + rng.uniform(-0.1, 0.1)) for _ in range(n)]
+
+def run_size(n, legacy_limit):
+    locations = random_locations(n, seed=n)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fast = compute_distance_matrix(locations)
+    fast_s = time.perf_counter() - t0
+    _, fast_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    legacy_s = None
+    max_err = None
+    if n <= legacy_limit:
+        t0 = time.perf_counter()
+        ref = legacy_distance_matrix(locations)
+        legacy_time_matrix(locations)
+        legacy_s = time.perf_counter() - t0
+        # Spot-check a sample of cells against the scalar reference
+        rng = random.Random(0)
+        max_err = 0.0
+        for _ in range(2000):
+            i, j = rng.randrange(n), rng.randrange(n)
+            max_err = max(max_err, abs(float(fast[i][j]) - ref[i][j]))
+
+    return {
+        "nodes": n,
+        "numpy_s": fast_s,
+        "legacy_s": legacy_s,
+        "speedup": (legacy_s / fast_s) if legacy_s else None,
+        "matrix_mb": fast.nbytes / 1e6,
+        "peak_mb": fast_peak / 1e6,
+        "max_abs_err_km": max_err,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distance matrix engine: NumPy vs legacy double loop")
+    parser.add_argument("--sizes", default="100,250,500,1000,2000,5000")
+    parser.add_argument("--legacy-limit", type=int, default=5000,
+                        help="Skip the legacy loop above this many nodes (it is slow)")
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        print(f"--- Running {n} nodes ---", flush=True)
+        results.append(run_size(n, args.legacy_limit))
+
+    print("\n--- Summary ---")
+    print(f"{'Nodes':<8} | {'NumPy(s)':<10} | {'Legacy(s)':<10} | {'Speedup':<9} | {'Matrix MB':<10} | {'Peak MB':<9} | {'MaxErr km':<10}")
+    print("-" * 82)
+    for r in results:
+        legacy = f"{r['legacy_s']:.3f}" if r['legacy_s'] is not None else "skipped"
+        speedup = f"{r['speedup']:.1f}x" if r['speedup'] is not None else "-"
+        err = f"{r['max_abs_err_km']:.2e}" if r['max_abs_err_km'] is not None else "-"
+        print(f"{r['nodes']:<8} | {r['numpy_s']:<10.4f} | {legacy:<10} | {speedup:<9} | {r['matrix_mb']:<10.2f} | {r['peak_mb']:<9.2f} | {err:<10}")
@@ -0,0 +1,118 @@
+import sys
+import os
+import random
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+from routeopt.models import Depot, Stop
+from routeopt.nodes import NodeTable, SPLIT_CHUNK_SIZE
+
+# Reference: the dict-per-node model create_data_model used to build
+# (solver_nodes + node_map + the time_windows/service_times/demands lists).
+def legacy_nodes(depots, stops, default_window):
+    solver_nodes = []
+    for depot in depots:
+        solver_nodes.append({
+            'lat': depot.lat, 'lng': depot.lng, 'demand': 0, 'service': 0, 'stop_ref': None,
+            'start': depot.shift_start_min, 'end': depot.shift_end_min, 'type': 'depot', 'id': depot.id
+        })
+    node_map = {i: None for i in range(len(solver_nodes))}
+    for stop in stops:
+        demand = stop.demand_units
+        if demand > SPLIT_CHUNK_SIZE:
+            remaining, chunk_idx = demand, 0
+            service_per_unit = stop.service_time_min / demand
+            while remaining > 0:
+                take = min(remaining, SPLIT_CHUNK_SIZE)
+                chunk_id = f"{stop.id}#chunk_{chunk_idx}"
+                chunk_idx += 1
+                solver_nodes.append({
+                    'lat': stop.lat, 'lng': stop.lng, 'demand': take, 'service': int(round(service_per_unit * take)),
+                    'stop_ref': stop, 'chunk_id': chunk_id, 'start': stop.time_window_start,
+                    'end': stop.time_window_end, 'type': 'stop', 'id': chunk_id
+                })
+                remaining -= take
+        else:
+            solver_nodes.append({
+                'lat': stop.lat, 'lng': stop.lng, 'demand': demand, 'service': stop.service_time_min,
+                'stop_ref': stop, 'chunk_id': stop.id, 'start': stop.time_window_start,
+                'end': stop.time_window_end, 'type': 'stop', 'id': stop.id
+            })
+    for i in range(len(depots), len(solver_nodes)):
+        node_map[i] = solver_nodes[i]
+    time_windows, service_times, demands = [], [], []
+    for n in solver_nodes:
+        s = n['start'] if n['start'] is not None else default_window[0]
+        e = n['end'] if n['end'] is not None else default_window[1]
+        time_windows.append((int(s * 100), int(e * 100)))
+        service_times.append(n['service'])
+        demands.append(n['demand'])
+    return solver_nodes, node_map, time_windows, service_times, demands
+
+def random_stops(n, seed):
+    rng = random.Random(seed)
+    stops = []
+    for i in range(n):
+        start = rng.choice([None, 420, 600, 780])
+        # ~1 in 10 stops is above the chunk size and gets split
+        demand = rng.randint(16, 60) if rng.random() < 0.1 else rng.randint(1, 10)
+        stops.append(Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.1, 0.1), lng=77.5946 + rng.uniform(-0.1, 0.1),
+                          demand_units=demand, service_time_min=rng.randint(3, 15), time_window_start=start,
+                          time_window_end=None if start is None else start + 90))
+    return stops
+
+def measure(build):
+    # Retained = still allocated after the build (what the solve keeps alive); stops are allocated beforehand
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+def run_size(n):
+    depots = [Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=360, shift_end_min=1320)]
+    stops = random_stops(n, seed=n)
+    window = (360, 1320)
+
+    legacy, legacy_s, legacy_mb, legacy_peak = measure(lambda: legacy_nodes(depots, stops, window))
+    table, table_s, table_mb, table_peak = measure(lambda: NodeTable.build(depots, stops, window))
+
+    # Both models must describe the same nodes
+    solver_nodes, _, time_windows, service_times, demands = legacy
+    if (table.node_ids() != [n['id'] for n in solver_nodes] or table.demand.tolist() != demands
+            or table.service_min.tolist() != service_times
+            or list(zip(table.window_start_cmin.tolist(), table.window_end_cmin.tolist())) != time_windows):
+        raise SystemExit(f"NodeTable differs from the legacy node model at {n} stops")
+
+    return {
+        "stops": n,
+        "nodes": len(table),
+        "legacy_s": legacy_s,
+        "table_s": table_s,
+        "legacy_mb": legacy_mb / 1e6,
+        "table_mb": table_mb / 1e6,
+        "columns_mb": table.nbytes() / 1e6,
+        "reduction": legacy_mb / table_mb,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Node model memory: NodeTable columns vs dict-per-node")
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        print(f"--- Running {n} stops ---", flush=True)
+        results.append(run_size(n))
+
+    print("\n--- Summary ---")
+    print(f"{'Stops':<8} | {'Nodes':<8} | {'Legacy MB':<10} | {'Table MB':<9} | {'Columns MB':<10} | {'Reduction':<9} | {'Legacy(s)':<9} | {'Table(s)':<9}")
+    print("-" * 90)
+    for r in results:
+        print(f"{r['stops']:<8} | {r['nodes']:<8} | {r['legacy_mb']:<10.2f} | {r['table_mb']:<9.2f} | {r['columns_mb']:<10.2f} | "
+              f"{r['reduction']:<9.1f} | {r['legacy_s']:<9.4f} | {r['table_s']:<9.4f}")
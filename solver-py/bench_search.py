@@ -0,0 +1,65 @@
+import sys
+import os
+import random
+import time
+import argparse
+
+sys.path.append(os.getcwd())
+
+from routeopt.models import OptimizeRequest, Depot, Vehicle, Stop, Capacity, SolverParams
+from routeopt.solver import solve_vrp
+
+def make_request(num_stops, num_vehicles, speeds, cost_model, time_limit, seed, symmetry_breaking=None):
+    rng = random.Random(seed)
+    depot = Depot(id="depot_main", lat=12.9716, lng=77.5946, shift_start_min=480, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"v_{i}", capacity=Capacity(units=60), shift_start_min=480, shift_end_min=1200,
+                        speed_kmph=speeds[i % len(speeds)], depot_id="depot_main", fixed_cost=500.0)
+                for i in range(num_vehicles)]
+    stops = [Stop(id=f"s_{i}", lat=12.9716 + rng.uniform(-0.1, 0.1), lng=77.5946 + rng.uniform(-0.1, 0.1),
+                  demand_units=rng.randint(1, 8), service_time_min=10,
+                  time_window_start=480, time_window_end=1200)
+             for i in range(num_stops)]
+    params = SolverParams(time_limit_seconds=time_limit, local_search_metaheuristic="GUIDED_LOCAL_SEARCH",
+                          cost_model=cost_model, fuel_cost_per_km=12.0, driver_cost_per_hour=250.0,
+                          symmetry_breaking=symmetry_breaking, stream_interval_seconds=0)
+    return OptimizeRequest(depot=depot, depots=[depot], vehicles=vehicles, stops=stops, params=params)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GLS search throughput (accepted solutions/s) at a fixed time limit")
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=12)
+    parser.add_argument("--speeds", default="30,30,45", help="Comma-separated speed classes assigned round-robin")
+    parser.add_argument("--cost-model", default="DISTANCE")
+    parser.add_argument("--time-limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Compare convergence without and with each symmetry-breaking mode")
+    args = parser.parse_args()
+
+    speeds = [float(x) for x in args.speeds.split(",")]
+    if args.symmetry:
+        # Convergence per symmetry mode: time to reach within 1% / 3% of that run's final objective
+        print(f"{'Symmetry':<10} | {'Classes':<7} | {'First':<10} | {'t(3%)':<7} | {'t(1%)':<7} | {'Last imp(s)':<11} | {'Objective':<10} | {'Vehicles':<8}")
+        print("-" * 90)
+        for mode in (None, "USAGE", "START_TIME"):
+            req = make_request(args.stops, args.vehicles, speeds, args.cost_model.upper(), args.time_limit, args.seed, mode)
+            trace = []
+            resp = solve_vrp(req, on_progress=lambda p: trace.append((p["elapsed_seconds"], p["objective_value"])))
+            final = resp.summary.objective_value
+            within = lambda pct: next(t for t, o in trace if o <= final * (1 + pct))
+            print(f"{mode or 'NONE':<10} | {resp.summary.search_stats.vehicle_classes:<7} | {trace[0][1]:<10} | "
+                  f"{within(0.03):<7.2f} | {within(0.01):<7.2f} | {trace[-1][0]:<11.2f} | {final:<10} | {len(resp.routes):<8}")
+        sys.exit(0)
+
+    req = make_request(args.stops, args.vehicles, speeds, args.cost_model.upper(), args.time_limit, args.seed)
+    t0 = time.perf_counter()
+    resp = solve_vrp(req)
+    wall = time.perf_counter() - t0
+
+    # Each GLS iteration that is accepted registers as a solution
+    stats, search_s = resp.summary.search_stats, resp.summary.timings.search_seconds
+    rate = stats.solutions / search_s if search_s else 0.0
+    print(f"{'Stops':<6} | {'Veh':<4} | {'Model':<8} | {'Wall(s)':<8} | {'Solutions':<9} | {'Sol/s':<8} | {'Branches':<9} | {'Dist(km)':<9}")
+    print("-" * 80)
+    print(f"{args.stops:<6} | {args.vehicles:<4} | {args.cost_model.upper():<8} | {wall:<8.2f} | {stats.solutions:<9} | "
+          f"{rate:<8.1f} | {stats.branches:<9} | {resp.summary.total_dist_km:<9.2f}")
@@ -1,132 +1,285 @@
+"""
+Solver benchmark suite.
 
+    python benchmark.py run [--families uniform,money] [--sizes 50,200] [--repeat 3] [--out bench.json]
+    python benchmark.py compare baseline.json bench.json [--threshold 0.15]
+    python benchmark.py list
+
+Every scenario is generated from a fixed seed and solved in its own process (peak RSS is per scenario).
+Search defaults to first solution + plain local search, which ends at a deterministic local optimum,
+so timings and objectives are comparable between runs. `--metaheuristic` switches to a time-limited search.
+"""
 import sys
 import os
-import random
-import time
 import json
-from datetime import datetime
-
-# Enhance path to ensure we can import routeopt
-sys.path.append(os.getcwd())
-
-from routeopt.models import OptimizeRequest, Depot, Vehicle, Stop, Capacity, SolverParams
-from routeopt.solver import solve_vrp
-
-def generate_random_request(num_stops, num_vehicles, enable_local_search=False):
-    # Center (Bangalore approx)
-    center_lat = 12.9716
-    center_lng = 77.5946
-    
-    # Depot
-    depot = Depot(
-        id="depot_main",
-        lat=center_lat,
-        lng=center_lng,
-        shift_start_min=480, # 8 AM
-        shift_end_min=1200   # 8 PM
-    )
-    
-    # Vehicles
-    vehicles = []
-    for i in range(num_vehicles):
-        vehicles.append(Vehicle(
-            id=f"v_{i}",
-            capacity=Capacity(units=100), # Ample capacity
-            shift_start_min=480,
-            shift_end_min=1200,
-            speed_kmph=30.0,
-            depot_id="depot_main"
-        ))
-        
-    # Stops
+import math
+import time
+import random
+import platform
+import argparse
+import statistics
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from routeopt.models import (OptimizeRequest, Depot, Vehicle, Stop, Capacity, SolverParams, GlobalSettings)
+
+CENTER = (12.9716, 77.5946) # Bangalore
+FAMILIES = ("uniform", "clustered", "tight_windows", "split_demand", "multi_trip", "multi_depot", "money", "sparse",
+            "multi_trip3", "reloads")
+DEFAULT_SIZES = (50, 200)
+PHASES = ("data_model", "matrix", "model_build", "search", "extraction", "total")
+# Phase differences below this are noise at any threshold
+MIN_REGRESSION_SECONDS = 0.01
+
+# --- Scenario families -----------------------------------------------------------------------
+
+def _point(rng, spread=0.1):
+    return CENTER[0] + rng.uniform(-spread, spread), CENTER[1] + rng.uniform(-spread, spread)
+
+def _clustered_points(rng, n, clusters=6):
+    centres = [_point(rng, 0.12) for _ in range(clusters)]
+    points = []
+    for i in range(n):
+        lat, lng = centres[i % clusters]
+        points.append((lat + rng.gauss(0, 0.008), lng + rng.gauss(0, 0.008)))
+    return points
+
+def make_scenario(family: str, num_stops: int, seed: int = 0, metaheuristic=None, time_limit: int = 30) -> OptimizeRequest:
+    """
+    Deterministic request for (family, size, seed).
+    """
+    # "sparse" solves the same plan as "uniform", on k-nearest arcs; "reloads" the same 3-trip plan
+    # as "multi_trip3", with depot reload visits instead of vehicle clones
+    plan = {"sparse": "uniform", "reloads": "multi_trip3"}.get(family, family)
+    rng = random.Random(f"{plan}:{num_stops}:{seed}")
+    depot = Depot(id="depot_main", lat=CENTER[0], lng=CENTER[1], shift_start_min=480, shift_end_min=1200)
+    depots = [depot]
+    num_vehicles = max(2, num_stops // 10)
+    capacity = 60
+    params = dict(time_limit_seconds=time_limit, local_search_metaheuristic=metaheuristic, use_matrix_cache=False)
+
+    if family == "clustered":
+        points = _clustered_points(rng, num_stops)
+    else:
+        points = [_point(rng) for _ in range(num_stops)]
+
     stops = []
-    for i in range(num_stops):
-        # vary by ~0.1 deg (approx 10km)
-        lat = center_lat + random.uniform(-0.1, 0.1)
-        lng = center_lng + random.uniform(-0.1, 0.1)
-        stops.append(Stop(
-            id=f"s_{i}",
-            lat=lat,
-            lng=lng,
-            demand_units=5,
-            service_time_min=10,
-            time_window_start=480,
-            time_window_end=1200
-        ))
-        
-    # Params
-    # We will pass extra fields in dict if model doesn't support them yet, 
-    # but initially we run baseline which ignore them or we modify model first.
-    # For now, we assume we will add 'local_search' in params or it's ignored.
-    params = SolverParams(
-        time_limit_seconds=30 if num_stops > 80 else 10 # 30s for large, 10s for others
-    )
-    
-    # Hack to inject the flag if we haven't updated the model definition yet
-    # But Pydantic might strip it.
-    # We will assume we update the model before running the 'After' test.
-    # For the script, we can attach it to params if we modify the class at runtime or just pass it to generator
-    # but the solver needs to read it.
-    
-    if enable_local_search:
-        setattr(params, 'local_search_metaheuristic', 'GUIDED_LOCAL_SEARCH') 
-    
-    return OptimizeRequest(
-        depot=depot,
-        depots=[depot],
-        vehicles=vehicles,
-        stops=stops,
-        params=params
-    )
-
-def run_benchmark(name, num_stops, num_vehicles, enable_local_search):
-    print(f"--- Running {name} (stops={num_stops}, vehicles={num_vehicles}, local_search={enable_local_search}) ---")
-    req = generate_random_request(num_stops, num_vehicles, enable_local_search)
-    
-    start_time = time.time()
+    for i, (lat, lng) in enumerate(points):
+        demand, window = rng.randint(1, 8), (480, 1200)
+        if family == "tight_windows":
+            start = rng.randrange(480, 1080, 30)
+            window = (start, start + 60)
+        elif family == "split_demand" and i % 3 == 0:
+            demand = rng.randint(20, 45) # Split into 15-unit chunks
+        stops.append(Stop(id=f"s_{i}", lat=lat, lng=lng, demand_units=demand, service_time_min=10,
+                          time_window_start=window[0], time_window_end=window[1]))
+
+    if family == "split_demand":
+        capacity = 200
+        params["split_chunk_size"] = 15 # Trucks carry any order: split on a fixed chunk size
+    elif family == "multi_trip":
+        capacity = 25
+        params["global_settings"] = GlobalSettings(enable_multi_trip=True, max_trips_per_vehicle=2, reload_time_min=20)
+    elif plan == "multi_trip3":
+        capacity = 25
+        num_vehicles = max(2, num_stops // 12)
+        params["global_settings"] = GlobalSettings(enable_multi_trip=True, max_trips_per_vehicle=3, reload_time_min=20,
+                                                   multi_trip_model="RELOADS" if family == "reloads" else "CLONES")
+    elif family == "multi_depot":
+        for d in range(2):
+            lat, lng = _point(rng, 0.08)
+            depots.append(Depot(id=f"depot_{d}", lat=lat, lng=lng, shift_start_min=480, shift_end_min=1200))
+    elif family == "money":
+        params.update(cost_model="MONEY", fuel_cost_per_km=12.0, driver_cost_per_hour=250.0)
+    elif family == "sparse":
+        params["sparse_neighbors"] = 15
+
+    speeds = (30.0, 30.0, 45.0) if family == "money" else (30.0,)
+    vehicles = [Vehicle(id=f"v_{i}", capacity=Capacity(units=capacity), shift_start_min=480, shift_end_min=1200,
+                        speed_kmph=speeds[i % len(speeds)], depot_id=depots[i % len(depots)].id,
+                        fixed_cost=500.0 if family == "money" else 0.0)
+                for i in range(num_vehicles)]
+    return OptimizeRequest(depot=depot, depots=depots, vehicles=vehicles, stops=stops, params=SolverParams(**params))
+
+# --- Measurement ----------------------------------------------------------------------------
+# Phase timings and search counters come from the response (summary.timings / summary.search_stats).
+
+def _peak_rss_mb():
     try:
-        resp = solve_vrp(req)
-        duration = time.time() - start_time
-        
-        print(f"Status: {resp.summary.status}")
-        print(f"Solve Time: {duration:.4f}s")
-        print(f"Total Dist: {resp.summary.total_dist_km} km")
-        print(f"Total Time: {resp.summary.total_time_min} min")
-        print(f"Unserved: {len(resp.summary.unserved_stop_ids)}")
-        return {
-            "scenario": name,
-            "stops": num_stops,
-            "vehicles": num_vehicles,
-            "local_search": enable_local_search,
-            "solve_time": duration,
-            "dist": resp.summary.total_dist_km,
-            "total_time": resp.summary.total_time_min,
-            "unserved": len(resp.summary.unserved_stop_ids)
-        }
-    except Exception as e:
-        print(f"Failed: {e}")
+        import resource
+    except ImportError: # Windows
         return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _run_scenario(family, num_stops, seed, repeat, metaheuristic, time_limit):
+    """
+    Worker process: warm up, then solve the scenario `repeat` times. Phases are medians.
+    """
+    from routeopt.solver import solve_vrp
+    solve_vrp(make_scenario("uniform", 5, seed=1)) # Pay first-solve costs outside the measurement
+    base_rss = _peak_rss_mb()
+
+    runs = []
+    for _ in range(repeat):
+        response = solve_vrp(make_scenario(family, num_stops, seed, metaheuristic, time_limit))
+        timings = response.summary.timings
+        runs.append({phase: getattr(timings, f"{phase}_seconds") for phase in PHASES})
+
+    summary = response.summary
+    return {
+        "scenario": f"{family}/{num_stops}", "family": family, "stops": num_stops,
+        "vehicles": summary.search_stats.vehicles, "nodes": summary.search_stats.nodes, "seed": seed, "repeat": repeat,
+        "phases": {p: round(statistics.median(r[p] for r in runs), 4) for p in PHASES},
+        "peak_rss_mb": _peak_rss_mb(), "base_rss_mb": base_rss,
+        "status": summary.status, "objective": summary.objective_value, "total_dist_km": summary.total_dist_km,
+        "unserved": len(summary.unserved_stop_ids), "stop_reason": summary.stop_reason,
+        "search_stats": summary.search_stats.model_dump(exclude={"nodes", "vehicles"}),
+    }
+
+# --- Run / compare ---------------------------------------------------------------------------
+
+def calibrate() -> float:
+    """
+    Fixed CPU workload (seconds, best of 3). Compare scales timings by this ratio so results
+    from different machines are comparable.
+    """
+    best = math.inf
+    for _ in range(3):
+        t0 = time.perf_counter()
+        rng = random.Random(0)
+        acc = 0.0
+        for _ in range(300_000):
+            acc += math.sin(rng.random()) * math.sqrt(rng.random())
+        best = min(best, time.perf_counter() - t0)
+    return round(best, 4)
+
+def environment() -> dict:
+    import numpy
+    import ortools
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git_commit": commit,
+        "python": platform.python_version(), "ortools": ortools.__version__, "numpy": numpy.__version__,
+        "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+        "calibration_seconds": calibrate(),
+    }
+
+def run(args):
+    families = args.families.split(",") if args.families else FAMILIES
+    unknown = set(families) - set(FAMILIES)
+    if unknown:
+        sys.exit(f"Unknown families: {sorted(unknown)} (choose from {', '.join(FAMILIES)})")
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else DEFAULT_SIZES
+
+    report = {"environment": environment(), "settings": {
+        "repeat": args.repeat, "seed": args.seed, "metaheuristic": args.metaheuristic, "time_limit": args.time_limit},
+        "results": []}
+    print(f"{'Scenario':<20} | {'Total':>7} | {'Data':>6} | {'Matrix':>6} | {'Build':>6} | {'Search':>7} | "
+          f"{'Extract':>7} | {'RSS MB':>7} | {'Objective':>11} | {'Unsrv':>5}")
+    print("-" * 112)
+    spawn = multiprocessing.get_context("spawn")
+    for family in families:
+        for size in sizes:
+            # Fresh process per scenario: peak RSS is not polluted by earlier scenarios
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                r = executor.submit(_run_scenario, family, size, args.seed, args.repeat,
+                                    args.metaheuristic, args.time_limit).result()
+            report["results"].append(r)
+            p = r["phases"]
+            print(f"{r['scenario']:<20} | {p['total']:>7.3f} | {p['data_model']:>6.3f} | {p['matrix']:>6.3f} | "
+                  f"{p['model_build']:>6.3f} | {p['search']:>7.3f} | {p['extraction']:>7.3f} | "
+                  f"{r['peak_rss_mb'] or 0:>7.1f} | {r['objective'] or 0:>11} | {r['unserved']:>5}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+def compare_reports(baseline: dict, current: dict, threshold: float, normalize: bool = True):
+    """
+    Returns (rows, regressions). A phase regresses when it is more than `threshold` (relative) and
+    MIN_REGRESSION_SECONDS slower than baseline; objective/unserved regress on any increase;
+    peak RSS on a relative increase above `threshold`.
+    """
+    scale = 1.0
+    base_cal = baseline["environment"].get("calibration_seconds")
+    cur_cal = current["environment"].get("calibration_seconds")
+    if normalize and base_cal and cur_cal:
+        scale = cur_cal / base_cal # >1: this machine is slower, so expect proportionally slower phases
+
+    base_by_name = {r["scenario"]: r for r in baseline["results"]}
+    rows, regressions = [], []
+    for cur in current["results"]:
+        base = base_by_name.get(cur["scenario"])
+        if base is None:
+            continue
+        for phase in PHASES:
+            expected = base["phases"][phase] * scale
+            actual = cur["phases"][phase]
+            change = (actual - expected) / expected if expected > 0 else 0.0
+            row = (cur["scenario"], phase, expected, actual, change)
+            rows.append(row)
+            if change > threshold and actual - expected > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{cur['scenario']} {phase}: {expected:.3f}s -> {actual:.3f}s ({change:+.0%})")
+        if cur["objective"] is not None and base["objective"] is not None and cur["objective"] > base["objective"]:
+            regressions.append(f"{cur['scenario']} objective: {base['objective']} -> {cur['objective']}")
+        if cur["unserved"] > base["unserved"]:
+            regressions.append(f"{cur['scenario']} unserved: {base['unserved']} -> {cur['unserved']}")
+        if base.get("peak_rss_mb") and cur.get("peak_rss_mb") and cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{cur['scenario']} peak RSS: {base['peak_rss_mb']} -> {cur['peak_rss_mb']} MB")
+    return rows, regressions
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows, regressions = compare_reports(baseline, current, args.threshold, normalize=not args.no_normalize)
+
+    print(f"{'Scenario':<20} | {'Phase':<11} | {'Baseline':>9} | {'Current':>9} | {'Change':>7}")
+    print("-" * 68)
+    for scenario, phase, expected, actual, change in rows:
+        print(f"{scenario:<20} | {phase:<11} | {expected:>9.4f} | {actual:>9.4f} | {change:>+7.1%}")
+    if regressions:
+        print(f"\nREGRESSIONS ({len(regressions)}):")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print("\nNo regressions.")
 
 if __name__ == "__main__":
-    results = []
-    
-    # Baseline
-    results.append(run_benchmark("Small Baseline", 15, 2, False))
-    results.append(run_benchmark("Medium Baseline", 50, 5, False))
-    results.append(run_benchmark("Large Baseline", 120, 10, False))
-
-    # Guided Local Search (P0 Improvement)
-    results.append(run_benchmark("Small Guided", 15, 2, True))
-    results.append(run_benchmark("Medium Guided", 50, 5, True))
-    results.append(run_benchmark("Large Guided", 120, 10, True))
-    
-    # Print Table
-    print("\n--- Summary ---")
-    print(f"{'Scenario':<20} | {'Stop/Veh':<10} | {'Time(s)':<8} | {'Dist(km)':<10} | {'Unserved':<8}")
-    print("-" * 70)
-    for r in results:
-        if r:
-            s_v = f"{r['stops']}/{r['vehicles']}"
-            print(f"{r['scenario']:<20} | {s_v:<10} | {r['solve_time']:<8.4f} | {r['dist']:<10.2f} | {r['unserved']:<8}")
-
-    
+    parser = argparse.ArgumentParser(description="Solver benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run scenarios and optionally write JSON")
+    p_run.add_argument("--families", help=f"Comma-separated subset of: {', '.join(FAMILIES)}")
+    p_run.add_argument("--sizes", help="Comma-separated stop counts (default 50,200)")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--repeat", type=int, default=3, help="Solves per scenario; phases are medians")
+    p_run.add_argument("--metaheuristic", default=None, help="e.g. GUIDED_LOCAL_SEARCH (runs to --time-limit)")
+    p_run.add_argument("--time-limit", type=int, default=30)
+    p_run.add_argument("--out", help="JSON report path")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="Flag regressions of a report against a baseline report")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown tolerated (default 0.15)")
+    p_cmp.add_argument("--no-normalize", action="store_true", help="Skip calibration scaling (same machine)")
+    p_cmp.set_defaults(func=compare)
+
+    p_list = sub.add_parser("list", help="List scenario families")
+    p_list.set_defaults(func=lambda args: print("\n".join(FAMILIES)))
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,8 +1,59 @@
-from fastapi import FastAPI, HTTPException
-from .models import OptimizeRequest, OptimizeResponse, SolutionSummary
-from .solver import solve_vrp
+import os
+import json
+import time
+import asyncio
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response
+from pydantic import ValidationError
+from .models import OptimizeRequest, OptimizeResponse, SolutionSummary, JobStatus, MatrixInput, FIRST_SOLUTION_STRATEGIES
+from .matrix_cache import default_matrix_cache
+from .result_cache import default_result_cache
+from .matrix_store import (default_matrix_store, check_matrix_input, load_matrix_input, matrix_size,
+                           MatrixNotFound)
+from .jobs import job_manager, JobNotFound, JobNotReady, JobFailed
+from .pool import solver_pool
+from .streaming import stream_registry
+from .batch import BatchScheduler, BatchRun
+from . import metrics
+from . import columnar
+from .columnar import MSGPACK_MEDIA_TYPE
 
 app = FastAPI(title="LPG Distribution Solver")
+batch_scheduler = BatchScheduler(solver_pool)
+
+metrics.registry.register(metrics.Gauge(
+    "routeopt_solver_queue_depth", "Solves submitted to the solver pool and not finished.", solver_pool.pending))
+metrics.registry.register(metrics.Gauge(
+    "routeopt_jobs_pending", "Async jobs queued or running.", job_manager.queue_depth))
+metrics.registry.register(metrics.Gauge(
+    "routeopt_streams_active", "Open streaming solves.", lambda: len(stream_registry.active())))
+metrics.registry.register(metrics.Gauge(
+    "routeopt_batch_plans_running", "Batch plans submitted to the solver pool and not finished.",
+    batch_scheduler.running))
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    request.state.received_at = time.perf_counter()
+    if request.url.path == "/optimize" and \
+            request.headers.get("content-type", "").split(";")[0].strip() in columnar.MSGPACK_MEDIA_TYPES:
+        request.scope["path"] = "/optimize/msgpack"
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.http_request_seconds.observe(time.perf_counter() - request.state.received_at,
+                                         route=route.path if route else "unmatched", method=request.method,
+                                         status=str(response.status_code))
+    return response
+
+@app.on_event("startup")
+def start_workers():
+    # Pre-warm solver processes unless explicitly deferred (e.g. for tests)
+    if os.environ.get("ROUTEOPT_PREWARM", "1") != "0":
+        solver_pool.start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    solver_pool.shutdown()
 
 @app.get("/health")
 def health_check():
@@ -13,17 +64,234 @@ def health_check_strict():
     # Could add deeper check like DB ping or scratch dir check
     return {"status": "ready", "service": "routeopt-solver"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/matrix")
+def matrix_cache_stats():
+    return default_matrix_cache.stats()
+
+@app.get("/api/cache/result")
+def result_cache_stats():
+    return default_result_cache.stats()
+
+def validate_request(request: OptimizeRequest, num_stops: Optional[int] = None):
+    # Validate inputs (basic checks). num_stops: stops held as columns (request.stops is empty)
+    if num_stops is None:
+        num_stops = len(request.stops)
+    if not request.vehicles:
+        raise HTTPException(status_code=400, detail="No vehicles provided")
+    if not num_stops:
+        raise HTTPException(status_code=400, detail="No stops provided")
+    fs_name = request.params.first_solution_strategy
+    if fs_name and fs_name.upper() not in FIRST_SOLUTION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported first_solution_strategy {fs_name}; "
+                                                    f"use one of {', '.join(FIRST_SOLUTION_STRATEGIES)}")
+    if request.matrix is not None:
+        # Dimensions only; values are decoded and checked by the solver
+        try:
+            check_matrix_input(request.matrix, matrix_size(request, num_stops))
+        except MatrixNotFound:
+            raise HTTPException(status_code=400, detail=f"Unknown matrix_id {request.matrix.matrix_id}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/matrices", status_code=201)
+def upload_matrix(matrix: MatrixInput):
+    """
+    Stores inline matrices (size required) for reuse as {"matrix": {"matrix_id": ...}}.
+    """
+    if matrix.size is None or matrix.matrix_id is not None:
+        raise HTTPException(status_code=400, detail="Upload inline distances with their size")
+    try:
+        supplied = load_matrix_input(matrix, matrix.size)
+        matrix_id = default_matrix_store.put(supplied)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"matrix_id": matrix_id, "size": supplied.size}
+
+@app.get("/matrices/{matrix_id}")
+def matrix_info(matrix_id: str):
+    try:
+        return {"matrix_id": matrix_id, **default_matrix_store.meta(matrix_id)}
+    except MatrixNotFound:
+        raise HTTPException(status_code=404, detail="Unknown matrix")
+
+@app.delete("/matrices/{matrix_id}")
+def delete_matrix(matrix_id: str):
+    try:
+        found = default_matrix_store.delete(matrix_id)
+    except MatrixNotFound:
+        found = False
+    if not found:
+        raise HTTPException(status_code=404, detail="Unknown matrix")
+    return {"matrix_id": matrix_id, "status": "deleted"}
+
 @app.post("/optimize", response_model=OptimizeResponse)
-def optimize_route(request: OptimizeRequest):
-    try:
-        # Validate inputs (basic checks)
-        if not request.vehicles:
-            raise HTTPException(status_code=400, detail="No vehicles provided")
-        if not request.stops:
-            raise HTTPException(status_code=400, detail="No stops provided")
-            
-        # Call the solver
-        response = solve_vrp(request)
+def optimize_route(request: OptimizeRequest, http_request: Request):
+    validate_request(request)
+    # Body parsing + model validation + checks, from the moment the request arrived
+    validation_seconds = time.perf_counter() - http_request.state.received_at
+    metrics.solve_phase_seconds.observe(validation_seconds, phase="validation")
+    try:
+        # Solve in a pre-warmed worker process; this thread only dispatches and collects.
+        # With use_result_cache, a plan already solved (or being solved) is answered from the result cache.
+        if request.params.use_result_cache:
+            response = default_result_cache.get_or_solve(request, solver_pool.solve)
+        else:
+            response = solver_pool.solve(request)
+        if response.summary.timings is not None:
+            response.summary.timings.validation_seconds = round(validation_seconds, 4)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/optimize/msgpack", response_class=Response, responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+async def optimize_msgpack(http_request: Request):
+    """
+    Columnar MessagePack variant of /optimize (also reached by POSTing Content-Type: application/msgpack to
+    /optimize). Stop columns go to the solver without building Stop objects; routes come back as step columns.
+    """
+    if not columnar.available():
+        raise HTTPException(status_code=415, detail="MessagePack support is not installed (pip install msgpack)")
+    try:
+        decoded = columnar.decode_request(columnar.unpackb(await http_request.body()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    validate_request(decoded.request, decoded.num_stops)
+    validation_seconds = time.perf_counter() - http_request.state.received_at
+    metrics.solve_phase_seconds.observe(validation_seconds, phase="validation")
+    shm, envelope = decoded.pack()
+    try:
+        out = await asyncio.wrap_future(solver_pool.submit_packed(shm, envelope))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    response = out["response"]
+    if response["summary"].get("timings") is not None:
+        response["summary"]["timings"]["validation_seconds"] = round(validation_seconds, 4)
+    return Response(columnar.packb(columnar.encode_response(response)), media_type=MSGPACK_MEDIA_TYPE)
+
+@app.post("/optimize/jobs", response_model=JobStatus, status_code=202)
+def submit_job(request: OptimizeRequest):
+    validate_request(request)
+    job_id = job_manager.submit(request)
+    return job_manager.status(job_id)
+
+@app.get("/optimize/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    try:
+        return job_manager.status(job_id)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+@app.get("/optimize/jobs/{job_id}/result", response_model=OptimizeResponse)
+def job_result(job_id: str):
+    try:
+        return job_manager.result(job_id)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    except JobNotReady:
+        raise HTTPException(status_code=409, detail="Job not finished")
+    except JobFailed as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.post("/optimize/stream")
+def optimize_stream(request: OptimizeRequest):
+    """
+    Server-Sent Events: "start" (stream_id), "solution" per improving plan, then "result" or "error".
+    POST /optimize/stream/{stream_id}/accept ends the search early with the best plan so far.
+    """
+    validate_request(request)
+    stream = stream_registry.open(solver_pool, request)
+
+    async def body():
+        try:
+            yield _sse("start", {"stream_id": stream.stream_id})
+            async for event, payload in stream.events():
+                yield _sse(event, payload)
+        finally:
+            stream_registry.close(stream)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/optimize/stream/{stream_id}/accept")
+def accept_stream(stream_id: str):
+    stream = stream_registry.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Unknown stream")
+    stream.stop()
+    return {"stream_id": stream_id, "status": "accepted"}
+
+@app.post("/optimize/batch")
+def optimize_batch(requests: List[OptimizeRequest]):
+    """
+    Many plans in one call, as Server-Sent Events: "start" (batch_id, plans, shared_matrices), one "plan" per
+    request as it finishes ({"index", "status": "done", "response"} or {"index", "status": "error", "detail"}),
+    then "done". Plans run on the solver pool under the global batch concurrency limit; plans with
+    overlapping coordinates share one matrix.
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="No plans provided")
+    invalid = {}
+    for i, request in enumerate(requests):
+        try:
+            validate_request(request)
+        except HTTPException as e:
+            invalid[i] = e.detail
+    run = BatchRun(batch_scheduler, requests, invalid)
+
+    async def body():
+        try:
+            yield _sse("start", {"batch_id": run.batch_id, "plans": len(requests),
+                                 "shared_matrices": sum(1 for g in run.groups if len(g) > 1)})
+            async for event, payload in run.events():
+                yield _sse(event, payload)
+        finally:
+            run.cancel()
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/optimize/ws")
+async def optimize_ws(websocket: WebSocket):
+    """
+    Client sends the OptimizeRequest, then may send {"action": "accept"} at any time.
+    Server sends {"event": ..., "data": ...} messages, same events as /optimize/stream.
+    """
+    await websocket.accept()
+    try:
+        request = OptimizeRequest.model_validate(await websocket.receive_json())
+        validate_request(request)
+    except (ValidationError, HTTPException, ValueError) as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        await websocket.send_json({"event": "error", "data": {"detail": detail}})
+        await websocket.close()
+        return
+
+    stream = stream_registry.open(solver_pool, request)
+
+    async def listen():
+        # Any accept message or a disconnect ends the search
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if message.get("action") == "accept":
+                    stream.stop()
+        except (WebSocketDisconnect, ValueError):
+            stream.stop()
+
+    listener = asyncio.create_task(listen())
+    try:
+        await websocket.send_json({"event": "start", "data": {"stream_id": stream.stream_id}})
+        async for event, payload in stream.events():
+            await websocket.send_json({"event": event, "data": payload})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.cancel()
+        stream_registry.close(stream)
@@ -0,0 +1,236 @@
+import os
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .models import OptimizeRequest
+from .matrix import compute_distance_matrix
+from .streaming import EVENT_POLL_SECONDS
+
+# Largest union of coordinates computed as one shared matrix (float32: 4000 -> 64 MB)
+SHARED_MATRIX_MAX_LOCATIONS = int(os.environ.get("ROUTEOPT_BATCH_SHARED_MATRIX_MAX", "4000"))
+
+def plan_locations(request: OptimizeRequest) -> set:
+    """
+    Distinct (lat, lng) a plan's matrix covers: its depots and stops.
+    """
+    points = {(d.lat, d.lng) for d in [request.depot] + (request.depots or [])}
+    points.update((s.lat, s.lng) for s in request.stops)
+    return points
+
+def group_plans(location_sets: List[set], max_locations: int = SHARED_MATRIX_MAX_LOCATIONS) -> List[List[int]]:
+    """
+    Greedy grouping of plans by shared coordinates. A plan joins the group where it overlaps most if that grows
+    the group's matrix by fewer cells than the plan's own matrix would have (|G u P|^2 - |G|^2 < |P|^2)
+    and the union stays within `max_locations`. Returns groups of plan indices; singletons share nothing.
+    """
+    groups: List[Tuple[List[int], set]] = []
+    # Largest plans first, so smaller plans (e.g. other days of the same depot) join them
+    for i in sorted(range(len(location_sets)), key=lambda i: -len(location_sets[i])):
+        points = location_sets[i]
+        best, best_overlap = None, 0
+        for group in groups:
+            overlap = len(points & group[1])
+            if overlap > best_overlap:
+                best, best_overlap = group, overlap
+        if best is not None:
+            union_size = len(best[1]) + len(points) - best_overlap
+            if union_size <= max_locations and union_size ** 2 - len(best[1]) ** 2 < len(points) ** 2:
+                best[0].append(i)
+                best[1].update(points)
+                continue
+        groups.append(([i], set(points)))
+    return [members for members, _ in groups]
+
+class SharedMatrix:
+    """
+    One km matrix over the union of a plan group's coordinates, in shared memory.
+    Workers gather their plan's rows/columns from it instead of recomputing.
+    """
+    def __init__(self, locations: List[Tuple[float, float]]):
+        matrix = compute_distance_matrix(locations)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=self._shm.buf)[:] = matrix
+        self.handle = {"shm_name": self._shm.name, "locations": locations, "dtype": matrix.dtype.str}
+
+    def release(self):
+        self._shm.close()
+        self._shm.unlink()
+
+def shared_matrix_builder(handle):
+    """
+    Worker side: a create_data_model matrix_builder that gathers from a SharedMatrix.
+    Falls back to computing the matrix if a location is not in the shared set.
+    """
+    def build(locations: List[Tuple[float, float]]) -> np.ndarray:
+        row = {p: i for i, p in enumerate(handle["locations"])}
+        idx = [row.get(p) for p in locations]
+        if any(i is None for i in idx):
+            return compute_distance_matrix(locations)
+        size = len(handle["locations"])
+        shm = shared_memory.SharedMemory(name=handle["shm_name"])
+        try:
+            view = np.ndarray((size, size), dtype=np.dtype(handle["dtype"]), buffer=shm.buf)
+            idx = np.asarray(idx, dtype=np.intp)
+            matrix = view[np.ix_(idx, idx)]
+            del view
+        finally:
+            shm.close()
+        return matrix
+    return build
+
+class BatchScheduler:
+    """
+    Global cap on batch plans in the solver pool at once (across all batches), so a nightly batch
+    cannot queue hundreds of plans ahead of interactive /optimize calls.
+    Default: ROUTEOPT_BATCH_CONCURRENCY, else one plan per solver process.
+    """
+    def __init__(self, pool, max_concurrency: Optional[int] = None):
+        self.pool = pool
+        self.max_concurrency = max_concurrency or int(os.environ.get("ROUTEOPT_BATCH_CONCURRENCY", "0")) or None
+        self._cond = threading.Condition()
+        self._running = 0
+        self.peak_running = 0
+
+    def limit(self) -> int:
+        return self.max_concurrency or self.pool.max_workers
+
+    def running(self) -> int:
+        with self._cond:
+            return self._running
+
+    def acquire(self, cancelled: threading.Event) -> bool:
+        with self._cond:
+            while self._running >= self.limit():
+                if cancelled.is_set():
+                    return False
+                self._cond.wait(timeout=0.1)
+            self._running += 1
+            self.peak_running = max(self.peak_running, self._running)
+            return True
+
+    def release(self):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+class BatchRun:
+    """
+    API side of one /optimize/batch call. A feeder thread builds the shared matrices, then submits plans
+    (longest first) as scheduler slots free up; finished plans are yielded in completion order.
+    """
+    def __init__(self, scheduler: BatchScheduler, requests: List[OptimizeRequest], invalid: Dict[int, str] = None):
+        self.batch_id = uuid.uuid4().hex
+        self.scheduler = scheduler
+        self.requests = requests
+        self.invalid = invalid or {}
+        self.started_at = time.perf_counter()
+        self._finished = queue.Queue()
+        self._cancelled = threading.Event()
+        self._futures = []
+        # Plans with a supplied matrix compute nothing, so they are not grouped
+        valid = [i for i in range(len(requests)) if i not in self.invalid and requests[i].matrix is None]
+        self.groups = [[valid[k] for k in g] for g in group_plans([plan_locations(requests[i]) for i in valid])]
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._feeder.start()
+
+    def _feed(self):
+        shared = {} # plan index -> SharedMatrix of its group
+        for members in self.groups:
+            if len(members) < 2:
+                continue
+            points = set()
+            for i in members:
+                points |= plan_locations(self.requests[i])
+            try:
+                matrix = SharedMatrix(sorted(points))
+            except (OSError, MemoryError):
+                continue # These plans compute their own matrices
+            shared.update((i, matrix) for i in members)
+        holders = {}
+        for matrix in shared.values():
+            holders[id(matrix)] = holders.get(id(matrix), 0) + 1
+        lock = threading.Lock()
+
+        def unref(matrix):
+            # The last plan of a group to finish (or be dropped) frees the shared block
+            if matrix is None:
+                return
+            with lock:
+                holders[id(matrix)] -= 1
+                last = holders[id(matrix)] == 0
+            if last:
+                matrix.release()
+
+        def done(future, i, matrix):
+            self.scheduler.release()
+            unref(matrix)
+            self._finished.put((i, future))
+
+        # Longest-processing-time first keeps the tail short: wall time ~ total work / slots
+        order = sorted((i for i in range(len(self.requests)) if i not in self.invalid),
+                       key=lambda i: (-self.requests[i].params.time_limit_seconds, -len(self.requests[i].stops)))
+        for pos, i in enumerate(order):
+            matrix = shared.get(i)
+            if self._cancelled.is_set() or not self.scheduler.acquire(self._cancelled):
+                for j in order[pos:]:
+                    unref(shared.get(j))
+                return
+            try:
+                future = self.scheduler.pool.submit(self.requests[i],
+                                                    shared_matrix=matrix.handle if matrix is not None else None)
+            except Exception as e:
+                self.scheduler.release()
+                unref(matrix)
+                self._finished.put((i, e))
+                continue
+            self._futures.append(future)
+            future.add_done_callback(lambda f, i=i, matrix=matrix: done(f, i, matrix))
+
+    def cancel(self):
+        """
+        Client gone: submit nothing more and drop queued plans (running ones finish on their own).
+        """
+        self._cancelled.set()
+        for future in list(self._futures):
+            future.cancel()
+
+    def _drain(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self._finished.get_nowait())
+            except queue.Empty:
+                return finished
+
+    async def events(self):
+        """
+        Yields (event, payload): one "plan" per request in completion order, then "done".
+        """
+        failed = 0
+        solve_seconds = 0.0
+        for i, detail in sorted(self.invalid.items()):
+            failed += 1
+            yield "plan", {"index": i, "status": "error", "detail": detail}
+        remaining = len(self.requests) - len(self.invalid)
+        while remaining:
+            for i, outcome in await asyncio.to_thread(self._drain):
+                remaining -= 1
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    out = outcome.result()
+                    solve_seconds += out["finished_at"] - out["started_at"]
+                    yield "plan", {"index": i, "status": "done", "response": out["response"]}
+                except Exception as e:
+                    failed += 1
+                    yield "plan", {"index": i, "status": "error", "detail": f"{type(e).__name__}: {e}"}
+            if remaining:
+                await asyncio.sleep(EVENT_POLL_SECONDS)
+        yield "done", {"plans": len(self.requests), "failed": failed,
+                       "wall_seconds": round(time.perf_counter() - self.started_at, 3),
+                       "solve_seconds": round(solve_seconds, 3)}
@@ -0,0 +1,229 @@
+from typing import Dict, List, Optional
+import numpy as np
+from .models import OptimizeRequest, RouteStep, VehicleRoute
+from .nodes import STOP_COLUMNS, StopColumns
+from .pool import pack_columns
+
+try:
+    import msgpack
+except ImportError: # Optional: only the application/msgpack content type needs it
+    msgpack = None
+
+# Columnar MessagePack bodies for large plans. Numeric columns travel as {"dtype", "data": raw little-endian bytes};
+# string columns as plain lists. The JSON API is unchanged.
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+COLUMNAR_FORMAT = "routeopt-columnar-v1"
+# Stop columns are float64 (NaN = no value), the solver pool's shared-memory layout, so they are copied as is
+_INT_STOP_COLUMNS = {"demand_units", "service_time_min", "time_window_start", "time_window_end", "priority"}
+_OPTIONAL_STOP_COLUMNS = {"time_window_start", "time_window_end"}
+# Columns a client may leave out (Stop defaults)
+_STOP_DEFAULTS = {"time_window_start": np.nan, "time_window_end": np.nan, "priority": 1.0}
+_DTYPES = {"<f8", "<f4", "<i8", "<i4"}
+
+def _numeric_dtypes(model) -> Dict[str, str]:
+    return {name: "<i8" if f.annotation is int else "<f8" for name, f in model.model_fields.items()
+            if f.annotation in (int, float)}
+
+_STEP_COLUMNS = _numeric_dtypes(RouteStep)
+_ROUTE_COLUMNS = _numeric_dtypes(VehicleRoute)
+
+def available() -> bool:
+    return msgpack is not None
+
+def packb(payload: dict) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(payload, use_bin_type=True)
+
+def unpackb(data: bytes) -> dict:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    try:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid MessagePack body: {e}")
+
+def column(values, dtype: str) -> dict:
+    return {"dtype": dtype, "data": np.ascontiguousarray(values, dtype=dtype).tobytes()}
+
+def read_column(col, name: str, length: Optional[int] = None) -> np.ndarray:
+    if not isinstance(col, dict) or col.get("dtype") not in _DTYPES or not isinstance(col.get("data"), bytes):
+        raise ValueError(f"{name}: expected {{'dtype': one of {sorted(_DTYPES)}, 'data': bytes}}")
+    dt = np.dtype(col["dtype"])
+    if len(col["data"]) % dt.itemsize:
+        raise ValueError(f"{name}: {len(col['data'])} bytes is not a whole number of {col['dtype']} values")
+    values = np.frombuffer(col["data"], dtype=dt)
+    if length is not None and values.shape[0] != length:
+        raise ValueError(f"{name}: expected {length} values, got {values.shape[0]}")
+    return values
+
+def _strings(values, name: str, length: int, optional: bool = False) -> List[Optional[str]]:
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError(f"{name}: expected a list of {length} strings")
+    for v in values:
+        if not isinstance(v, str) and not (optional and v is None):
+            raise ValueError(f"{name}: expected strings, got {type(v).__name__}")
+    return values
+
+class ColumnarRequest:
+    """
+    A decoded columnar request: everything but the stops as a validated OptimizeRequest (stops=[]),
+    stops as STOP_COLUMNS x n float64 plus ids and items. No Stop objects are built in the API process.
+    """
+    __slots__ = ("request", "columns", "stop_ids", "stop_depot_ids", "stop_items")
+
+    def __init__(self, request, columns, stop_ids, stop_depot_ids, stop_items):
+        self.request = request
+        self.columns = columns
+        self.stop_ids = stop_ids
+        self.stop_depot_ids = stop_depot_ids
+        self.stop_items = stop_items
+
+    @property
+    def num_stops(self) -> int:
+        return len(self.stop_ids)
+
+    def pack(self):
+        """
+        (shm, envelope) for SolverPool.submit_packed.
+        """
+        return pack_columns(self.columns, self.stop_ids, self.stop_depot_ids, self.stop_items,
+                            self.request.model_dump(exclude={"stops"}))
+
+    def to_request(self) -> OptimizeRequest:
+        """
+        Full OptimizeRequest (stops built without per-object validation), for in-process solves.
+        """
+        request = self.request.model_copy()
+        request.stops = StopColumns(self.columns, self.stop_ids, self.stop_depot_ids, self.stop_items).to_stops()
+        return request
+
+def encode_request(request: OptimizeRequest) -> dict:
+    """
+    Client side: an OptimizeRequest as a columnar payload (pass to packb).
+    """
+    stops = request.stops
+    item_stop, item_type, deliver, pickup = [], [], [], []
+    for i, s in enumerate(stops):
+        for it in s.items:
+            item_stop.append(i)
+            item_type.append(it.cylinder_type_id)
+            deliver.append(it.deliver_units)
+            pickup.append(it.pickup_units)
+    stop_cols = {name: column([np.nan if getattr(s, name) is None else getattr(s, name) for s in stops], "<f8")
+                 for name in STOP_COLUMNS}
+    return {
+        "format": COLUMNAR_FORMAT,
+        "request": request.model_dump(mode="json", exclude={"stops"}),
+        "stops": {"id": [s.id for s in stops], "depot_id": [s.depot_id for s in stops], **stop_cols,
+                  "items": {"stop_index": column(item_stop, "<i4"), "cylinder_type_id": item_type,
+                            "deliver_units": column(deliver, "<i8"), "pickup_units": column(pickup, "<i8")}},
+    }
+
+def decode_request(payload) -> ColumnarRequest:
+    """
+    Server side: validates the columns (lengths, dtypes, integral ints) and the non-stop fields. Raises ValueError.
+    """
+    if not isinstance(payload, dict) or payload.get("format") != COLUMNAR_FORMAT:
+        raise ValueError(f"Expected a {COLUMNAR_FORMAT} payload")
+    stops = payload.get("stops")
+    if not isinstance(stops, dict):
+        raise ValueError("stops: expected a map of columns")
+    stop_ids = stops.get("id")
+    if not isinstance(stop_ids, list):
+        raise ValueError("stops.id: expected a list of strings")
+    stop_ids = _strings(stop_ids, "stops.id", len(stop_ids))
+    n = len(stop_ids)
+    depot_ids = stops.get("depot_id")
+    depot_ids = [None] * n if depot_ids is None else _strings(depot_ids, "stops.depot_id", n, optional=True)
+
+    columns = np.empty((len(STOP_COLUMNS), n), dtype=np.float64)
+    for r, name in enumerate(STOP_COLUMNS):
+        col = stops.get(name)
+        if col is None and name in _STOP_DEFAULTS:
+            columns[r] = _STOP_DEFAULTS[name]
+            continue
+        values = read_column(col, f"stops.{name}", n).astype(np.float64)
+        missing = np.isnan(values)
+        if missing.any() and name not in _OPTIONAL_STOP_COLUMNS:
+            raise ValueError(f"stops.{name}: missing values")
+        present = values[~missing]
+        if not np.all(np.isfinite(present)):
+            raise ValueError(f"stops.{name}: values must be finite")
+        if name in _INT_STOP_COLUMNS and np.any(present != np.rint(present)):
+            raise ValueError(f"stops.{name}: values must be integers")
+        columns[r] = values
+
+    stop_items = {}
+    items = stops.get("items")
+    if items:
+        if not isinstance(items, dict):
+            raise ValueError("stops.items: expected a column map")
+        index = read_column(items.get("stop_index"), "stops.items.stop_index")
+        count = index.shape[0]
+        types = _strings(items.get("cylinder_type_id"), "stops.items.cylinder_type_id", count)
+        deliver = read_column(items.get("deliver_units"), "stops.items.deliver_units", count)
+        pickup = read_column(items.get("pickup_units"), "stops.items.pickup_units", count)
+        if count and (index.min() < 0 or index.max() >= n):
+            raise ValueError("stops.items.stop_index: out of range")
+        for i, type_id, d, p in zip(index.tolist(), types, deliver.tolist(), pickup.tolist()):
+            if d != int(d) or p != int(p):
+                raise ValueError("stops.items: units must be integers")
+            stop_items.setdefault(i, []).append({"cylinder_type_id": type_id, "deliver_units": int(d),
+                                                 "pickup_units": int(p)})
+
+    fields = payload.get("request")
+    if not isinstance(fields, dict):
+        raise ValueError("request: expected a map")
+    # Raises pydantic's ValidationError (a ValueError) for bad depot/vehicle/params fields
+    request = OptimizeRequest.model_validate({**fields, "stops": []})
+    return ColumnarRequest(request, columns, stop_ids, depot_ids, stop_items)
+
+def encode_response(response: dict) -> dict:
+    """
+    An OptimizeResponse dict (as returned by the solver pool) with routes as flat columns: one row per route,
+    one row per step; route r's steps are rows step_offsets[r]:step_offsets[r + 1]. The summary stays a map.
+    """
+    routes = response["routes"]
+    steps = [s for r in routes for s in r["steps"]]
+    offsets = np.zeros(len(routes) + 1, dtype=np.int64)
+    np.cumsum([len(r["steps"]) for r in routes], out=offsets[1:])
+    return {
+        "format": COLUMNAR_FORMAT,
+        "summary": response["summary"],
+        "routes": {"vehicle_id": [r["vehicle_id"] for r in routes], "step_offsets": column(offsets, "<i8"),
+                   **{name: column(np.fromiter((r[name] for r in routes), dtype=dt, count=len(routes)), dt)
+                      for name, dt in _ROUTE_COLUMNS.items()}},
+        "steps": {"stop_id": [s["stop_id"] for s in steps],
+                  **{name: column(np.fromiter((s[name] for s in steps), dtype=dt, count=len(steps)), dt)
+                     for name, dt in _STEP_COLUMNS.items()}},
+    }
+
+def decode_response(payload: dict) -> dict:
+    """
+    Client side: the columnar response with numeric columns as NumPy arrays (no per-step objects).
+    """
+    return {
+        "summary": payload["summary"],
+        "routes": {name: read_column(col, f"routes.{name}") if isinstance(col, dict) else col
+                   for name, col in payload["routes"].items()},
+        "steps": {name: read_column(col, f"steps.{name}") if isinstance(col, dict) else col
+                  for name, col in payload["steps"].items()},
+    }
+
+def response_routes(columns: dict) -> List[dict]:
+    """
+    Rebuilds VehicleRoute dicts from decode_response output (tests, small plans).
+    """
+    routes, steps = columns["routes"], columns["steps"]
+    offsets = routes["step_offsets"].tolist()
+    step_rows = {name: values.tolist() if isinstance(values, np.ndarray) else values for name, values in steps.items()}
+    out = []
+    for r, vehicle_id in enumerate(routes["vehicle_id"]):
+        lo, hi = offsets[r], offsets[r + 1]
+        route = {"vehicle_id": vehicle_id,
+                 "steps": [{name: step_rows[name][k] for name in ["stop_id"] + list(_STEP_COLUMNS)} for k in range(lo, hi)]}
+        route.update({name: routes[name][r].item() for name in _ROUTE_COLUMNS})
+        out.append(route)
+    return out
@@ -0,0 +1,360 @@
+import math
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from .models import OptimizeRequest, OptimizeResponse, SolutionSummary, SubproblemReport, VehicleRoute
+from .pool import SolverPool, get_subsolve_pool
+from .matrix import haversine_cross
+from .matrix_store import subset_matrix_input
+
+# Share of the time limit spent on partition solves; the rest goes to boundary repair
+PARTITION_TIME_SHARE = 0.8
+# Routes per side of a partition boundary that are re-optimized together
+REPAIR_ROUTES_PER_SIDE = 2
+KMEANS_ITERATIONS = 25
+
+def base_stop_id(step_id: str) -> str:
+    return step_id.rsplit("#chunk_", 1)[0]
+
+def base_vehicle_id(route_id: str) -> str:
+    return route_id.rsplit("#trip", 1)[0]
+
+def _planar(lats, lngs, ref_lat):
+    # Equirectangular projection: good enough for clustering within a region
+    return np.column_stack([np.asarray(lngs) * math.cos(math.radians(ref_lat)), np.asarray(lats)])
+
+def partition_sweep(request: OptimizeRequest, k: int) -> List[int]:
+    """
+    Polar sweep around the main depot, cut into k sectors of roughly equal demand.
+    """
+    stops = request.stops
+    xy = _planar([s.lat for s in stops], [s.lng for s in stops], request.depot.lat)
+    origin = _planar([request.depot.lat], [request.depot.lng], request.depot.lat)[0]
+    angles = np.arctan2(xy[:, 1] - origin[1], xy[:, 0] - origin[0])
+    order = np.argsort(angles, kind="stable")
+    demand = np.array([max(1, s.demand_units) for s in stops], dtype=np.float64)[order]
+    cum = np.cumsum(demand)
+    labels = np.empty(len(stops), dtype=np.int64)
+    labels[order] = np.minimum((cum - demand) * k // cum[-1], k - 1).astype(np.int64)
+    return labels.tolist()
+
+def partition_kmeans(request: OptimizeRequest, k: int, seed: int = 0) -> List[int]:
+    """
+    Lloyd's k-means (k-means++ init, fixed seed for deterministic plans).
+    """
+    stops = request.stops
+    xy = _planar([s.lat for s in stops], [s.lng for s in stops], request.depot.lat)
+    rng = np.random.default_rng(seed)
+    centers = [xy[rng.integers(len(xy))]]
+    for _ in range(1, k):
+        d2 = np.min(((xy[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2), axis=1)
+        total = d2.sum()
+        centers.append(xy[rng.choice(len(xy), p=d2 / total)] if total > 0 else xy[rng.integers(len(xy))])
+    centers = np.array(centers)
+    labels = np.zeros(len(xy), dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmin(((xy[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+        new_centers = np.array([xy[labels == c].mean(axis=0) if np.any(labels == c) else centers[c] for c in range(k)])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    # Compact away empty clusters
+    remap = {c: i for i, c in enumerate(sorted(set(labels.tolist())))}
+    return [remap[c] for c in labels.tolist()]
+
+def assign_vehicles(request: OptimizeRequest, labels: List[int], k: int) -> List[List[int]]:
+    """
+    Greedy capacity matching: largest vehicles first, each to the partition with the most uncovered demand.
+    """
+    trips = 1
+    gs = request.params.global_settings
+    if gs and gs.enable_multi_trip:
+        trips = gs.max_trips_per_vehicle
+    remaining = [0.0] * k
+    for s, label in zip(request.stops, labels):
+        remaining[label] += s.demand_units
+    order = sorted(range(len(request.vehicles)), key=lambda i: -request.vehicles[i].capacity.units)
+    assigned = [[] for _ in range(k)]
+    for v_idx in order:
+        target = max(range(k), key=lambda p: (remaining[p], -p))
+        assigned[target].append(v_idx)
+        remaining[target] -= request.vehicles[v_idx].capacity.units * trips
+    return [sorted(a) for a in assigned]
+
+def _sub_request(request: OptimizeRequest, stops, vehicles, time_limit, depot=None) -> OptimizeRequest:
+    """
+    depot: solve around this depot only (multi-depot split). A supplied matrix is cut down to the sub-plan.
+    """
+    # Shallow: only this partition's stops and vehicles are copied, and params are mutated below
+    sub = request.model_copy(update={
+        "matrix": None, "params": request.params.model_copy(),
+        "stops": [s.model_copy() for s in stops], "vehicles": [v.model_copy() for v in vehicles]})
+    if depot is not None:
+        sub.depot = depot.model_copy()
+        sub.depots = []
+    sub.params.decomposition = None
+    sub.params.portfolio = False
+    sub.params.time_limit_seconds = max(1, round(time_limit))
+    if request.matrix is not None:
+        sub.matrix = subset_matrix_input(request, sub)
+    return sub
+
+def plan_cost(request: OptimizeRequest, routes: List[VehicleRoute]) -> float:
+    """
+    Cost of a set of routes under the request's cost model, from reported route totals.
+    """
+    model = (request.params.cost_model or "DISTANCE").upper()
+    if model == "TIME":
+        return float(sum(r.total_time_min for r in routes))
+    if model == "MONEY":
+        fixed = {v.id: v.fixed_cost or 0.0 for v in request.vehicles}
+        used = {base_vehicle_id(r.vehicle_id) for r in routes if r.steps}
+        return (sum(r.total_dist_km for r in routes) * (request.params.fuel_cost_per_km or 0.0) +
+                sum(r.total_time_min for r in routes) / 60.0 * (request.params.driver_cost_per_hour or 0.0) +
+                sum(fixed.get(v, 0.0) for v in used))
+    return float(sum(r.total_dist_km for r in routes))
+
+def _score(request, routes, unserved):
+    return (len(unserved), round(plan_cost(request, routes), 6))
+
+def merge_responses(responses: List[OptimizeResponse], solver_config: str) -> OptimizeResponse:
+    routes = [r for resp in responses for r in resp.routes]
+    unserved = [u for resp in responses for u in resp.summary.unserved_stop_ids]
+    statuses = {resp.summary.status for resp in responses}
+    status = "optimized" if statuses == {"optimized"} else ("failed" if not routes else "partial")
+    return OptimizeResponse(routes=routes, summary=SolutionSummary(
+        total_dist_km=round(sum(r.total_dist_km for r in routes), 2),
+        total_time_min=sum(r.total_time_min for r in routes),
+        unserved_stop_ids=unserved, status=status,
+        total_ton_km=round(sum(r.total_ton_km for r in routes), 3),
+        total_co2_kg=round(sum(r.co2_kg for r in routes), 3),
+        solver_config=solver_config,
+        solver_nodes=sum(resp.summary.solver_nodes or 0 for resp in responses),
+        split_stops=sum(resp.summary.split_stops or 0 for resp in responses),
+        solver_arcs=sum(resp.summary.solver_arcs for resp in responses if resp.summary.solver_arcs) or None
+    ))
+
+def _run_subproblems(pool: SolverPool, subs: Dict[str, OptimizeRequest]):
+    futures = {name: pool.submit(sub) for name, sub in subs.items()}
+    responses, reports = {}, []
+    for name, future in futures.items():
+        sub = subs[name]
+        try:
+            out = future.result()
+            resp = OptimizeResponse.model_validate(out["response"])
+            wall = out["finished_at"] - out["started_at"]
+        except Exception as e:
+            resp = OptimizeResponse(routes=[], summary=SolutionSummary(
+                total_dist_km=0.0, total_time_min=0, unserved_stop_ids=[s.id for s in sub.stops],
+                status=f"error: {type(e).__name__}"))
+            wall = 0.0
+        responses[name] = resp
+        reports.append(SubproblemReport(
+            name=name, stops=len(sub.stops), vehicles=len(sub.vehicles), status=resp.summary.status,
+            objective_value=resp.summary.objective_value, unserved_count=len(resp.summary.unserved_stop_ids),
+            wall_seconds=round(wall, 3)))
+    return responses, reports
+
+def _repair_set(request, partitions, responses, a, b, centroid, stop_by_id, ref_lat):
+    """
+    Routes, idle vehicles and stops to re-solve for the pair (a, b), or None when there is nothing to repair.
+    """
+    side_routes = {a: responses[a].routes, b: responses[b].routes}
+    chosen = set()
+    for side, other in ((a, b), (b, a)):
+        def route_dist(r):
+            xy = _planar([stop_by_id[base_stop_id(s.stop_id)].lat for s in r.steps],
+                         [stop_by_id[base_stop_id(s.stop_id)].lng for s in r.steps], ref_lat)
+            return float(((xy.mean(axis=0) - centroid[other]) ** 2).sum())
+        ranked = sorted((r for r in side_routes[side] if r.steps), key=route_dist)
+        chosen.update(base_vehicle_id(r.vehicle_id) for r in ranked[:REPAIR_ROUTES_PER_SIDE])
+    routed = {base_vehicle_id(r.vehicle_id) for resp in responses.values() for r in resp.routes if r.steps}
+    idle = {request.vehicles[v_idx].id for side in (a, b) for v_idx in partitions[side][1]} - routed
+    unserved = set(responses[a].summary.unserved_stop_ids) | set(responses[b].summary.unserved_stop_ids)
+
+    # Close over split stops: all pieces of a stop must be inside the repair set
+    all_routes = side_routes[a] + side_routes[b]
+    while True:
+        pieces_in = {base_stop_id(s.stop_id) for r in all_routes if base_vehicle_id(r.vehicle_id) in chosen for s in r.steps}
+        pieces_in |= {base_stop_id(u) for u in unserved}
+        extra = {base_vehicle_id(r.vehicle_id) for r in all_routes
+                 if base_vehicle_id(r.vehicle_id) not in chosen
+                 and any(base_stop_id(s.stop_id) in pieces_in for s in r.steps)}
+        if not extra:
+            break
+        chosen |= extra
+    if not chosen and not unserved:
+        return None
+    old_routes = [r for r in all_routes if base_vehicle_id(r.vehicle_id) in chosen]
+    return chosen, idle, pieces_in, old_routes, unserved
+
+def _repair_boundaries(request, pool, partitions, responses, budget_s):
+    """
+    Re-solves the routes closest to each neighboring partition together with both sides' unserved stops.
+    A repair is kept only if it serves more stops or lowers plan cost.
+    """
+    names = list(partitions.keys())
+    if len(names) < 2 or budget_s < 1:
+        return responses, 0
+
+    stop_by_id = {s.id: s for s in request.stops}
+    veh_by_id = {v.id: v for v in request.vehicles}
+    ref_lat = request.depot.lat
+    centroid = {}
+    for name, (stops, _) in partitions.items():
+        xy = _planar([s.lat for s in stops], [s.lng for s in stops], ref_lat)
+        centroid[name] = xy.mean(axis=0)
+
+    # Each partition paired with its nearest neighbor
+    pairs = []
+    for a in names:
+        b = min((n for n in names if n != a), key=lambda n: float(((centroid[a] - centroid[n]) ** 2).sum()))
+        pair = tuple(sorted((a, b)))
+        if pair not in pairs:
+            pairs.append(pair)
+    pairs = pairs[:int(budget_s)]
+    per_pair_s = max(1, int(budget_s // len(pairs)))
+
+    # Pairs that share a partition go to later rounds; each round's re-solves run on the pool together
+    rounds = []
+    for pair in pairs:
+        for batch in rounds:
+            if not any(set(pair) & set(other) for other in batch):
+                batch.append(pair)
+                break
+        else:
+            rounds.append([pair])
+
+    repaired = 0
+    for batch in rounds:
+        jobs = []
+        for a, b in batch:
+            repair = _repair_set(request, partitions, responses, a, b, centroid, stop_by_id, ref_lat)
+            if repair is None:
+                continue
+            chosen, idle, pieces_in, old_routes, unserved = repair
+            repair_stops = [stop_by_id[sid] for sid in sorted(pieces_in)]
+            repair_vehicles = [veh_by_id[v] for v in sorted(chosen | idle)]
+            if not repair_stops or not repair_vehicles:
+                continue
+            sub = _sub_request(request, repair_stops, repair_vehicles, per_pair_s)
+            jobs.append(((a, b), repair, pool.submit(sub)))
+
+        for (a, b), (chosen, idle, pieces_in, old_routes, unserved), future in jobs:
+            try:
+                new = OptimizeResponse.model_validate(future.result()["response"])
+            except Exception:
+                continue
+            if new.summary.status == "failed":
+                continue
+
+            old_unserved = [u for u in unserved if base_stop_id(u) in pieces_in]
+            if _score(request, new.routes, new.summary.unserved_stop_ids) < _score(request, old_routes, old_unserved):
+                keep = lambda resp: [r for r in resp.routes if base_vehicle_id(r.vehicle_id) not in chosen | idle]
+                responses[a] = OptimizeResponse(routes=keep(responses[a]) + new.routes, summary=responses[a].summary.model_copy(
+                    update={"unserved_stop_ids": [u for u in responses[a].summary.unserved_stop_ids if base_stop_id(u) not in pieces_in]
+                            + new.summary.unserved_stop_ids}))
+                responses[b] = OptimizeResponse(routes=keep(responses[b]), summary=responses[b].summary.model_copy(
+                    update={"unserved_stop_ids": [u for u in responses[b].summary.unserved_stop_ids if base_stop_id(u) not in pieces_in]}))
+                repaired += 1
+    return responses, repaired
+
+def assign_depots(request: OptimizeRequest) -> List[str]:
+    """
+    Depot per stop: the stop's own depot_id when it names a known depot, else the nearest depot.
+    """
+    depots = list({d.id: d for d in [request.depot] + (request.depots or [])}.values())
+    known = {d.id for d in depots}
+    dist = haversine_cross([s.lat for s in request.stops], [s.lng for s in request.stops],
+                           [d.lat for d in depots], [d.lng for d in depots])
+    nearest = np.argmin(dist, axis=1).tolist()
+    return [s.depot_id if s.depot_id in known else depots[nearest[i]].id for i, s in enumerate(request.stops)]
+
+def solve_multi_depot(request: OptimizeRequest, pool: Optional[SolverPool] = None) -> OptimizeResponse:
+    """
+    One independent solve per depot: that depot's stops, its own vehicles (vehicle.depot_id, default
+    main depot) and a matrix over only those nodes. Depots are solved concurrently and merged.
+    PARTITION_TIME_SHARE of the time left is split across the waves of depot solves the pool runs in sequence
+    (more depots than workers); the rest covers assignment, merging and dispatch.
+    """
+    t_start = time.perf_counter()
+    pool = pool or get_subsolve_pool()
+    pool.start()
+    depots = {d.id: d for d in [request.depot] + (request.depots or [])}
+    stop_depots = assign_depots(request)
+    vehicle_depots = [v.depot_id if v.depot_id in depots else request.depot.id for v in request.vehicles]
+
+    groups = {}
+    orphans = {}  # depot_id -> stops of a depot without vehicles
+    for depot_id in depots:
+        stops = [s for s, d in zip(request.stops, stop_depots) if d == depot_id]
+        vehicles = [v for v, d in zip(request.vehicles, vehicle_depots) if d == depot_id]
+        if not stops:
+            continue
+        if not vehicles:
+            orphans[depot_id] = stops
+            continue
+        groups[depot_id] = (stops, vehicles)
+
+    limit = request.params.time_limit_seconds or 30
+    waves = max(1, math.ceil(len(groups) / pool.max_workers))
+    depot_s = max(1, int((limit - (time.perf_counter() - t_start)) * PARTITION_TIME_SHARE / waves))
+    subs = {depot_id: _sub_request(request, stops, vehicles, depot_s, depot=depots[depot_id])
+            for depot_id, (stops, vehicles) in groups.items()}
+
+    responses, reports = _run_subproblems(pool, subs)
+    for depot_id, stops in orphans.items():
+        reports.append(SubproblemReport(name=depot_id, stops=len(stops), vehicles=0, status="no_vehicles",
+                                        unserved_count=len(stops)))
+
+    merged = merge_responses(list(responses.values()), f"DECOMPOSED/DEPOT/{len(subs)}")
+    merged.summary.unserved_stop_ids += [s.id for stops in orphans.values() for s in stops]
+    if orphans and merged.summary.status == "optimized":
+        merged.summary.status = "partial"
+    merged.summary.subproblems = reports
+    return merged
+
+def solve_decomposed(request: OptimizeRequest, pool: Optional[SolverPool] = None) -> OptimizeResponse:
+    """
+    Spatial decomposition for very large plans (DEPOT mode: see solve_multi_depot): partition
+    stops (SWEEP or KMEANS around the main depot), match vehicles to partitions by capacity, solve partitions in parallel
+    processes, merge, then repair partition boundaries.
+    """
+    t_start = time.perf_counter()
+    pool = pool or get_subsolve_pool()
+    pool.start()  # Spawning and warming the pool (first fan-out only) counts against the time limit
+    mode = (request.params.decomposition or "KMEANS").upper()
+    if mode == "DEPOT":
+        return solve_multi_depot(request, pool)
+    per_part = max(1, request.params.decomposition_max_stops)
+    k = max(1, min(math.ceil(len(request.stops) / per_part), len(request.vehicles)))
+
+    if k == 1:
+        sub = _sub_request(request, request.stops, request.vehicles,
+                           (request.params.time_limit_seconds or 30) - (time.perf_counter() - t_start))
+        return OptimizeResponse.model_validate(pool.submit(sub).result()["response"])
+
+    labels = partition_sweep(request, k) if mode == "SWEEP" else partition_kmeans(request, k)
+    k = max(labels) + 1
+    vehicle_groups = assign_vehicles(request, labels, k)
+
+    limit = request.params.time_limit_seconds or 30
+    part_s = max(1, int((limit - (time.perf_counter() - t_start)) * PARTITION_TIME_SHARE))
+    partitions = {}
+    subs = {}
+    for p in range(k):
+        stops = [s for s, label in zip(request.stops, labels) if label == p]
+        if not stops:
+            continue
+        name = f"P{p}"
+        partitions[name] = (stops, vehicle_groups[p])
+        subs[name] = _sub_request(request, stops, [request.vehicles[i] for i in vehicle_groups[p]], part_s)
+
+    responses, reports = _run_subproblems(pool, subs)
+    repair_budget = limit - (time.perf_counter() - t_start)
+    responses, repaired = _repair_boundaries(request, pool, partitions, responses, repair_budget)
+
+    merged = merge_responses(list(responses.values()), f"DECOMPOSED/{mode}/{k}")
+    merged.summary.subproblems = reports
+    merged.summary.boundary_repairs = repaired
+    return merged
@@ -0,0 +1,106 @@
+import time
+import uuid
+import threading
+from typing import Optional
+from .models import OptimizeRequest, OptimizeResponse, JobStatus
+from .pool import SolverPool, solver_pool
+
+# Finished jobs are kept this long for status/result polling
+JOB_RETENTION_SECONDS = 3600
+MAX_RETAINED_JOBS = 1000
+
+class _Job:
+    __slots__ = ("job_id", "future", "submitted_at", "started_at", "finished_at", "error", "response")
+
+    def __init__(self, job_id, future):
+        self.job_id = job_id
+        self.future = future
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.response = None
+
+class JobNotFound(KeyError):
+    pass
+
+class JobNotReady(RuntimeError):
+    pass
+
+class JobFailed(RuntimeError):
+    pass
+
+class JobManager:
+    """
+    Background solves on the shared solver process pool.
+    Each process has its own interpreter, so concurrent plans do not share a GIL.
+    """
+    def __init__(self, pool: Optional[SolverPool] = None):
+        self.pool = pool or solver_pool
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request: OptimizeRequest) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            future = self.pool.submit(request)
+            job = _Job(job_id, future)
+            self._jobs[job_id] = job
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job_id
+
+    def _finish(self, job, future):
+        try:
+            out = future.result()
+            job.started_at = out["started_at"]
+            job.finished_at = out["finished_at"]
+            job.response = out["response"]
+        except Exception as e:
+            job.finished_at = time.time()
+            job.error = f"{type(e).__name__}: {e}"
+
+    def _prune(self):
+        now = time.time()
+        expired = [jid for jid, j in self._jobs.items()
+                   if j.finished_at is not None and now - j.finished_at > JOB_RETENTION_SECONDS]
+        for jid in expired:
+            del self._jobs[jid]
+        if len(self._jobs) >= MAX_RETAINED_JOBS:
+            finished = sorted((j.finished_at, jid) for jid, j in self._jobs.items() if j.finished_at is not None)
+            for _, jid in finished[:len(self._jobs) - MAX_RETAINED_JOBS + 1]:
+                del self._jobs[jid]
+
+    def _get(self, job_id) -> _Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def status(self, job_id: str) -> JobStatus:
+        job = self._get(job_id)
+        if job.finished_at is not None:
+            state = "failed" if job.error else "done"
+        elif job.future.running():
+            state = "running"
+            if job.started_at is None:
+                job.started_at = time.time()  # first seen running; the worker's own start time replaces it on finish
+        else:
+            state = "queued"
+        return JobStatus(job_id=job.job_id, status=state, submitted_at=job.submitted_at,
+                         started_at=job.started_at, finished_at=job.finished_at, error=job.error)
+
+    def result(self, job_id: str) -> OptimizeResponse:
+        job = self._get(job_id)
+        if job.finished_at is None:
+            raise JobNotReady(job_id)
+        if job.error:
+            raise JobFailed(job.error)
+        return OptimizeResponse.model_validate(job.response)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.finished_at is None)
+
+job_manager = JobManager()
@@ -1,7 +1,12 @@
 import math
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+import numpy as np
 from .models import Stop, Depot # Should match your models
 
+EARTH_RADIUS_KM = 6371.0
+# Rows per broadcast block. Bounds the float64 temporaries to BLOCK x N instead of N x N.
+MATRIX_BLOCK_ROWS = 512
+
 # Haversine implementation for MVP v1
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     R = 6371  # Earth radius in km
@@ -14,39 +19,226 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     d = R * c
     return d
 
-def compute_time_matrix(locations: List[Tuple[float, float]], speed_kmh: float = 30.0) -> List[List[int]]:
+def _haversine_km(d_lat, d_lng, cos_lat_a, cos_lat_b) -> np.ndarray:
+    # Elementwise haversine km from radian differences (broadcast), shared so every caller gets identical values
+    h = np.sin(d_lat / 2.0) ** 2 + cos_lat_a * cos_lat_b * np.sin(d_lng / 2.0) ** 2
+    np.clip(h, 0.0, 1.0, out=h)
+    return 2.0 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(h), np.sqrt(1.0 - h))
+
+def haversine_matrix(lats, lngs, dtype=np.float32) -> np.ndarray:
+    """
+    Vectorized all-pairs haversine distance in kilometers.
+    Math is done in float64 over row blocks; only the upper triangle of each block
+    is evaluated and mirrored (haversine is symmetric). Output cast to `dtype`.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    size = lat.shape[0]
+    out = np.zeros((size, size), dtype=dtype)
+    if size == 0:
+        return out
+    cos_lat = np.cos(lat)
+
+    for a in range(0, size, MATRIX_BLOCK_ROWS):
+        b = min(a + MATRIX_BLOCK_ROWS, size)
+        # Block rows [a, b) against columns [a, size)
+        block = _haversine_km(lat[None, a:] - lat[a:b, None], lng[None, a:] - lng[a:b, None],
+                              cos_lat[a:b, None], cos_lat[None, a:])
+        out[a:b, a:] = block
+        out[a:, a:b] = block.T
+
+    np.fill_diagonal(out, 0)
+    return out
+
+def haversine_cross(lats_a, lngs_a, lats_b, lngs_b) -> np.ndarray:
+    """
+    Haversine km between every point of set A (rows) and set B (columns), float64.
+    """
+    lat_a = np.radians(np.asarray(lats_a, dtype=np.float64))[:, None]
+    lng_a = np.radians(np.asarray(lngs_a, dtype=np.float64))[:, None]
+    lat_b = np.radians(np.asarray(lats_b, dtype=np.float64))[None, :]
+    lng_b = np.radians(np.asarray(lngs_b, dtype=np.float64))[None, :]
+    return _haversine_km(lat_b - lat_a, lng_b - lng_a, np.cos(lat_a), np.cos(lat_b))
+
+def unique_locations(points: List[Tuple[float, float]]) -> Tuple[List[Tuple[float, float]], List[int]]:
+    """
+    Collapses repeated coordinates (split chunks, co-located depots).
+    Returns (locations, node_location) where node_location[i] indexes locations for points[i].
+    Locations keep first-seen order so depots stay at the front.
+    """
+    loc_index = {}
+    locations = []
+    node_location = []
+    for p in points:
+        idx = loc_index.get(p)
+        if idx is None:
+            idx = len(locations)
+            loc_index[p] = idx
+            locations.append(p)
+        node_location.append(idx)
+    return locations, node_location
+
+def travel_time_matrix(distance_km: np.ndarray, speed_kmh: float = 30.0) -> np.ndarray:
+    """
+    Travel time in whole minutes (int32) derived from a km matrix.
     """
-    Returns time matrix in minutes.
+    minutes = np.rint(np.asarray(distance_km, dtype=np.float64) * (60.0 / speed_kmh))
+    return minutes.astype(np.int32)
+
+def compute_time_matrix(locations: List[Tuple[float, float]], speed_kmh: float = 30.0) -> np.ndarray:
+    """
+    Returns time matrix in minutes (int32 ndarray, indexable as matrix[i][j]).
     locations[0] should be depot if implied, but here we pass all points.
     """
-    size = len(locations)
-    matrix = [[0] * size for _ in range(size)]
-    
-    for i in range(size):
-        for j in range(size):
-            if i == j:
-                matrix[i][j] = 0
-            else:
-                dist = haversine_distance(locations[i][0], locations[i][1], 
-                                          locations[j][0], locations[j][1])
-                # Time = (dist / speed) * 60
-                time_min = int(round((dist / speed_kmh) * 60))
-                matrix[i][j] = time_min
-    return matrix
-
-def compute_distance_matrix(locations: List[Tuple[float, float]]) -> List[List[float]]:
-    """
-    Returns distance matrix in kilometers.
-    """
-    size = len(locations)
-    matrix = [[0.0] * size for _ in range(size)]
-    
-    for i in range(size):
-        for j in range(size):
-            if i == j:
-                matrix[i][j] = 0.0
-            else:
-                dist = haversine_distance(locations[i][0], locations[i][1], 
-                                          locations[j][0], locations[j][1])
-                matrix[i][j] = dist
-    return matrix
+    return travel_time_matrix(compute_distance_matrix(locations, dtype=np.float64), speed_kmh)
+
+def compute_distance_matrix(locations: List[Tuple[float, float]], dtype=np.float32) -> np.ndarray:
+    """
+    Returns distance matrix in kilometers (float32 ndarray by default).
+    """
+    coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    return haversine_matrix(coords[:, 0], coords[:, 1], dtype=dtype)
+
+def haversine_pairs(lats_a, lngs_a, lats_b, lngs_b) -> np.ndarray:
+    """
+    Haversine km between point pairs (a[k], b[k]), float64. Same arithmetic as haversine_matrix.
+    """
+    lat_a = np.radians(np.asarray(lats_a, dtype=np.float64))
+    lng_a = np.radians(np.asarray(lngs_a, dtype=np.float64))
+    lat_b = np.radians(np.asarray(lats_b, dtype=np.float64))
+    lng_b = np.radians(np.asarray(lngs_b, dtype=np.float64))
+    return _haversine_km(lat_b - lat_a, lng_b - lng_a, np.cos(lat_a), np.cos(lat_b))
+
+# Solver-facing integer arc values. The arc_* functions work elementwise on gathered km (and supplied
+# minutes/meters), so dense node x node matrices and sparse arc lists get identical values.
+
+def arc_distance_m(km: np.ndarray, meters: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Arc distance in whole meters (truncated), int64. `meters`: exact meters (supplied matrix) if known.
+    """
+    if meters is not None:
+        return np.asarray(meters, dtype=np.float64).astype(np.int64)
+    return (np.asarray(km, dtype=np.float64) * 1000.0).astype(np.int64)
+
+def _travel_cmin(km: np.ndarray, speed_kmh: float, minutes: Optional[np.ndarray]) -> np.ndarray:
+    # Supplied durations replace distance / speed
+    if minutes is not None:
+        return np.asarray(minutes, dtype=np.float64) * 100.0
+    return (km / speed_kmh) * 6000.0
+
+def arc_transit_time_cmin(km: np.ndarray, speed_kmh: float, service_min: np.ndarray,
+                          minutes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Arc transit in centiminutes: travel at `speed_kmh` (or `minutes`) plus `service_min` at the origin, int64.
+    """
+    km = np.asarray(km, dtype=np.float64)
+    service_cmin = np.asarray(service_min, dtype=np.float64) * 100.0
+    return np.rint(_travel_cmin(km, speed_kmh, minutes) + service_cmin).astype(np.int64)
+
+def arc_money_cost_cents(km: np.ndarray, speed_kmh: float, service_min: np.ndarray, fuel_cost_per_km: float,
+                         driver_cost_per_hour: float, minutes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    MONEY arc cost in cents (truncated), int64:
+    dist_km * fuel + (travel_cmin + service_cmin) / 6000 * driver, x100.
+    """
+    km = np.asarray(km, dtype=np.float64)
+    service_cmin = np.asarray(service_min, dtype=np.float64) * 100.0
+    cmin_total = _travel_cmin(km, speed_kmh, minutes) + service_cmin
+    cents = (km * fuel_cost_per_km * 100) + (cmin_total / 6000.0 * driver_cost_per_hour * 100)
+    return cents.astype(np.int64)
+
+# Dense node x node versions. OR-Tools evaluates these natively, so they are expanded from the
+# location matrix through node_location.
+
+def _gather(location_values: Optional[np.ndarray], loc: np.ndarray) -> Optional[np.ndarray]:
+    if location_values is None:
+        return None
+    return np.asarray(location_values, dtype=np.float64)[np.ix_(loc, loc)]
+
+def node_distance_matrix_m(location_km: np.ndarray, node_location: List[int],
+                           location_m: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Arc distance in whole meters (truncated), int64. `location_m`: exact meters (supplied matrix) if known.
+    """
+    loc = np.asarray(node_location, dtype=np.intp)
+    if location_m is not None:
+        return arc_distance_m(None, _gather(location_m, loc))
+    return arc_distance_m(_gather(location_km, loc))
+
+def node_transit_time_cmin(location_km: np.ndarray, node_location: List[int], speed_kmh: float,
+                           service_min: List[int], location_minutes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Arc transit in centiminutes: travel at `speed_kmh` (or `location_minutes`) plus service time
+    at the origin node, int64.
+    """
+    loc = np.asarray(node_location, dtype=np.intp)
+    return arc_transit_time_cmin(_gather(location_km, loc), speed_kmh, np.asarray(service_min)[:, None],
+                                 _gather(location_minutes, loc))
+
+def node_money_cost_cents(location_km: np.ndarray, node_location: List[int], speed_kmh: float,
+                          service_min: List[int], fuel_cost_per_km: float, driver_cost_per_hour: float,
+                          location_minutes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    MONEY arc cost in cents (truncated), int64 (see arc_money_cost_cents).
+    """
+    loc = np.asarray(node_location, dtype=np.intp)
+    return arc_money_cost_cents(_gather(location_km, loc), speed_kmh, np.asarray(service_min)[:, None],
+                                fuel_cost_per_km, driver_cost_per_hour, _gather(location_minutes, loc))
+
+class LocationTransits:
+    """
+    Transit callbacks computed from the location matrices instead of node x node ones: a node reads row and
+    column node_location[node] of the km (or supplied minutes/meters) matrix, so every speed class shares the
+    one location matrix and chunks of a split stop add nothing. Same float arithmetic, so the same values,
+    as the arc_* functions.
+    """
+    def __init__(self, routing, manager, node_location: List[int], service_min: np.ndarray, location_km: np.ndarray,
+                 location_minutes: Optional[np.ndarray] = None, location_m: Optional[np.ndarray] = None):
+        loc = np.asarray(node_location, dtype=np.int64)
+        index_node = np.asarray([manager.IndexToNode(i) for i in range(routing.Size() + routing.vehicles())])
+        self._row = (loc[index_node] * location_km.shape[0]).tolist()
+        self._col = loc[index_node].tolist()
+        self._service_cmin = (np.asarray(service_min, dtype=np.float64)[index_node] * 100.0).tolist()
+        self._km = self._flat(location_km)
+        self._minutes = None if location_minutes is None else self._flat(location_minutes)
+        self._meters = None if location_m is None else self._flat(location_m)
+        self._routing = routing
+        self._callbacks = [] # Keep the Python callables alive as long as the model
+
+    @staticmethod
+    def _flat(values: np.ndarray) -> memoryview:
+        # Indexing a memoryview yields Python numbers; float32 km widen to float64 exactly, as in arc_*
+        values = np.ascontiguousarray(values)
+        if values.dtype.kind not in "fi":
+            values = values.astype(np.float64)
+        return memoryview(values.reshape(-1))
+
+    def _register(self, transit) -> int:
+        self._callbacks.append(transit)
+        return self._routing.RegisterTransitCallback(transit)
+
+    def distance_m(self) -> int:
+        row, col = self._row, self._col
+        if self._meters is not None:
+            meters = self._meters
+            return self._register(lambda i, j: int(meters[row[i] + col[j]]))
+        km = self._km
+        return self._register(lambda i, j: int(km[row[i] + col[j]] * 1000.0))
+
+    def transit_time_cmin(self, speed_kmh: float) -> int:
+        row, col, service = self._row, self._col, self._service_cmin
+        if self._minutes is not None:
+            minutes = self._minutes
+            return self._register(lambda i, j: round(minutes[row[i] + col[j]] * 100.0 + service[i]))
+        km = self._km
+        return self._register(lambda i, j: round(km[row[i] + col[j]] / speed_kmh * 6000.0 + service[i]))
+
+    def money_cost_cents(self, speed_kmh: float, fuel_cost_per_km: float, driver_cost_per_hour: float) -> int:
+        row, col, service, km, minutes = self._row, self._col, self._service_cmin, self._km, self._minutes
+
+        def cost(i, j):
+            d = km[row[i] + col[j]]
+            travel = minutes[row[i] + col[j]] * 100.0 if minutes is not None else d / speed_kmh * 6000.0
+            return int(d * fuel_cost_per_km * 100 + (travel + service[i]) / 6000.0 * driver_cost_per_hour * 100)
+
+        return self._register(cost)
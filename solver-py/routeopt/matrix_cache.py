@@ -0,0 +1,234 @@
+import os
+import hashlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+# Bump when the matrix engine changes output so stale disk entries are not reused.
+MATRIX_CACHE_VERSION = "haversine-km-f32-v1"
+
+def matrix_key(locations: List[Tuple[float, float]]) -> str:
+    """
+    Content address of an ordered coordinate list.
+    """
+    coords = np.ascontiguousarray(np.asarray(locations, dtype=np.float64).reshape(-1, 2))
+    h = hashlib.sha256(MATRIX_CACHE_VERSION.encode())
+    h.update(coords.shape[0].to_bytes(8, "little"))
+    h.update(coords.tobytes())
+    return h.hexdigest()
+
+class MatrixCache:
+    """
+    Two-tier cache for distance matrices.
+    Tier 1: in-process LRU bounded by bytes.
+    Tier 2: .npy files opened memory-mapped, bounded by total bytes (oldest-used evicted first).
+    """
+    def __init__(self, max_memory_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._lru = OrderedDict()  # key -> (matrix, build_seconds)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._workers = {}  # pid -> (memory_entries, memory_bytes) of pool workers reporting to this cache
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        disk_dir = os.environ.get("ROUTEOPT_MATRIX_CACHE_DIR",
+                                  os.path.join(tempfile.gettempdir(), "routeopt-matrix-cache"))
+        if disk_dir.lower() in ("", "off", "none"):
+            disk_dir = None
+        mem_mb = int(os.environ.get("ROUTEOPT_MATRIX_CACHE_MEM_MB", "256"))
+        disk_mb = int(os.environ.get("ROUTEOPT_MATRIX_CACHE_DISK_MB", "1024"))
+        return cls(max_memory_bytes=mem_mb * 1024 * 1024, disk_dir=disk_dir,
+                   max_disk_bytes=disk_mb * 1024 * 1024)
+
+    def get_or_compute(self, locations: List[Tuple[float, float]],
+                       builder: Callable[[List[Tuple[float, float]]], np.ndarray]) -> Tuple[np.ndarray, str]:
+        """
+        Returns (matrix, source) where source is "memory", "disk" or "miss".
+        """
+        key = matrix_key(locations)
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                self.hits_memory += 1
+                self.seconds_saved += entry[1]
+                return entry[0], "memory"
+
+        matrix, build_s = self._load_disk(key, len(locations))
+        if matrix is not None:
+            with self._lock:
+                self.hits_disk += 1
+                self.seconds_saved += build_s
+                self._remember(key, matrix, build_s)
+            return matrix, "disk"
+
+        t0 = time.perf_counter()
+        matrix = builder(locations)
+        build_s = time.perf_counter() - t0
+        with self._lock:
+            self.misses += 1
+            self._remember(key, matrix, build_s)
+        self._store_disk(key, matrix, build_s)
+        return matrix, "miss"
+
+    def _remember(self, key, matrix, build_s):
+        # mmap-backed entries are counted at full size to keep the bound conservative
+        if matrix.nbytes > self.max_memory_bytes:
+            return
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[0].nbytes
+        self._lru[key] = (matrix, build_s)
+        self._memory_bytes += matrix.nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._lru:
+            _, (evicted, _) = self._lru.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _load_disk(self, key, size) -> Tuple[Optional[np.ndarray], float]:
+        if not self.disk_dir:
+            return None, 0.0
+        path = self._path(key)
+        try:
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None, 0.0
+        if matrix.shape != (size, size):
+            return None, 0.0
+        build_s = 0.0
+        try:
+            with open(f"{path}.meta") as f:
+                build_s = float(f.read().strip() or 0.0)
+        except (OSError, ValueError):
+            pass
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return matrix, build_s
+
+    def _store_disk(self, key, matrix, build_s):
+        if not self.disk_dir or matrix.nbytes > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(f"{path}.meta", "w") as f:
+                f.write(f"{build_s:.6f}")
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(matrix))
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".npy"):
+                continue
+            p = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        entries.sort()
+        for _, size, p in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                continue
+            try:
+                os.remove(f"{p}.meta")
+            except OSError:
+                pass
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {"hits_memory": self.hits_memory, "hits_disk": self.hits_disk, "misses": self.misses,
+                    "seconds_saved": self.seconds_saved}
+
+    def worker_report(self, before: dict) -> dict:
+        """
+        What a pool worker sends back with a solve: counter changes since `before` (counters()) and its memory use.
+        """
+        after = self.counters()
+        with self._lock:
+            memory = (len(self._lru), self._memory_bytes)
+        return {"pid": os.getpid(), **{k: after[k] - before[k] for k in after},
+                "memory_entries": memory[0], "memory_bytes": memory[1]}
+
+    def absorb(self, report: dict):
+        """
+        Adds a worker_report to this cache's stats: pooled solves look up the cache of their worker process.
+        """
+        with self._lock:
+            self.hits_memory += report["hits_memory"]
+            self.hits_disk += report["hits_disk"]
+            self.misses += report["misses"]
+            self.seconds_saved += report["seconds_saved"]
+            self._workers[report["pid"]] = (report["memory_entries"], report["memory_bytes"])
+
+    def stats(self) -> dict:
+        """
+        Lookups of this process and of the pool workers reporting to it; memory_* is this process's tier,
+        worker_memory_* the workers' tiers (as of their last solve).
+        """
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+                "build_seconds_saved": round(self.seconds_saved, 4),
+                "memory_entries": len(self._lru),
+                "memory_bytes": self._memory_bytes,
+                "workers": len(self._workers),
+                "worker_memory_entries": sum(w[0] for w in self._workers.values()),
+                "worker_memory_bytes": sum(w[1] for w in self._workers.values()),
+                "disk_dir": self.disk_dir,
+            }
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._lru.clear()
+            self._memory_bytes = 0
+            self.hits_memory = self.hits_disk = self.misses = 0
+            self.seconds_saved = 0.0
+            self._workers.clear()
+        if disk and self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".npy") or name.endswith(".npy.meta"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+default_matrix_cache = MatrixCache.from_env()
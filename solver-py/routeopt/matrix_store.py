@@ -0,0 +1,242 @@
+import os
+import json
+import base64
+import hashlib
+import tempfile
+from typing import List, Optional
+import numpy as np
+from .models import OptimizeRequest, MatrixInput
+
+MATRIX_DTYPES = {"float32": "<f4", "int32": "<i4"}
+DISTANCE_UNITS = ("m", "km")
+
+class MatrixNotFound(KeyError):
+    pass
+
+class SuppliedMatrix:
+    """
+    Decoded client matrices in their original dtype and units.
+    """
+    __slots__ = ("distances", "durations", "distance_unit")
+
+    def __init__(self, distances: np.ndarray, durations: Optional[np.ndarray], distance_unit: str):
+        self.distances = distances
+        self.durations = durations
+        self.distance_unit = distance_unit
+
+    @property
+    def size(self) -> int:
+        return self.distances.shape[0]
+
+    def distance_km(self) -> np.ndarray:
+        if self.distance_unit == "km":
+            return self.distances
+        return np.asarray(self.distances, dtype=np.float64) / 1000.0
+
+    def distance_m(self) -> Optional[np.ndarray]:
+        """
+        Exact meters when supplied in meters (m -> km -> m is not exact in floating point).
+        """
+        return np.asarray(self.distances, dtype=np.float64) if self.distance_unit == "m" else None
+
+    def duration_min(self) -> Optional[np.ndarray]:
+        return None if self.durations is None else np.asarray(self.durations, dtype=np.float64) / 60.0
+
+def matrix_size(request: OptimizeRequest, num_stops: Optional[int] = None) -> int:
+    """
+    Rows a supplied matrix must have: unique depots, then stops (`num_stops` when they are held as columns).
+    """
+    return len({d.id for d in [request.depot] + (request.depots or [])}) + \
+        (len(request.stops) if num_stops is None else num_stops)
+
+def matrix_rows(request: OptimizeRequest) -> List[str]:
+    """
+    Row keys in matrix order: depot ids, then stop ids.
+    """
+    depots = list({d.id: d for d in [request.depot] + (request.depots or [])})
+    return [f"depot:{d}" for d in depots] + [f"stop:{s.id}" for s in request.stops]
+
+def _encoded_size(data: str) -> int:
+    data = data.strip()
+    return len(data) * 3 // 4 - (len(data) - len(data.rstrip("=")))
+
+def _check_format(matrix: MatrixInput):
+    if matrix.dtype not in MATRIX_DTYPES:
+        raise ValueError(f"matrix.dtype must be one of {sorted(MATRIX_DTYPES)}")
+    if matrix.distance_unit not in DISTANCE_UNITS:
+        raise ValueError(f"matrix.distance_unit must be one of {list(DISTANCE_UNITS)}")
+
+def check_matrix_input(matrix: MatrixInput, size: int, store: Optional["MatrixStore"] = None):
+    """
+    Cheap request-time check (no decoding): format, and dimensions against the plan's `size` rows.
+    Raises ValueError (or MatrixNotFound for an unknown matrix_id).
+    """
+    if matrix.matrix_id is not None:
+        stored = (store or default_matrix_store).size(matrix.matrix_id)
+        if stored != size:
+            raise ValueError(f"matrix {matrix.matrix_id} is {stored}x{stored}, plan has {size} depots + stops")
+        return
+    _check_format(matrix)
+    if matrix.distances is None:
+        raise ValueError("matrix needs distances or a matrix_id")
+    if matrix.size is not None and matrix.size != size:
+        raise ValueError(f"matrix.size is {matrix.size}, plan has {size} depots + stops")
+    expected = size * size * np.dtype(MATRIX_DTYPES[matrix.dtype]).itemsize
+    for name in ("distances", "durations"):
+        data = getattr(matrix, name)
+        if data is not None and _encoded_size(data) != expected:
+            raise ValueError(f"matrix.{name}: expected {size}x{size} {matrix.dtype} ({expected} bytes), "
+                             f"got {_encoded_size(data)} bytes")
+
+def _decode(data: str, dtype: str, size: int, name: str) -> np.ndarray:
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except ValueError:
+        raise ValueError(f"matrix.{name} is not valid base64")
+    dt = np.dtype(MATRIX_DTYPES[dtype])
+    if len(raw) != size * size * dt.itemsize:
+        raise ValueError(f"matrix.{name}: expected {size}x{size} {dtype}, got {len(raw)} bytes")
+    values = np.frombuffer(raw, dtype=dt).reshape(size, size)
+    if not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError(f"matrix.{name} must be finite and non-negative")
+    return values
+
+def load_matrix_input(matrix: MatrixInput, size: int, store: Optional["MatrixStore"] = None) -> SuppliedMatrix:
+    """
+    Decodes (or loads by id) and validates a supplied matrix for a plan with `size` rows.
+    """
+    check_matrix_input(matrix, size, store)
+    if matrix.matrix_id is not None:
+        return (store or default_matrix_store).get(matrix.matrix_id)
+    return SuppliedMatrix(_decode(matrix.distances, matrix.dtype, size, "distances"),
+                          None if matrix.durations is None else _decode(matrix.durations, matrix.dtype, size, "durations"),
+                          matrix.distance_unit)
+
+def encode_matrix_input(supplied: SuppliedMatrix) -> MatrixInput:
+    dtype = "int32" if supplied.distances.dtype.kind == "i" else "float32"
+    dt = MATRIX_DTYPES[dtype]
+
+    def encode(values):
+        return base64.b64encode(np.ascontiguousarray(values, dtype=dt).tobytes()).decode("ascii")
+
+    return MatrixInput(size=supplied.size, dtype=dtype, distances=encode(supplied.distances),
+                       durations=None if supplied.durations is None else encode(supplied.durations),
+                       distance_unit=supplied.distance_unit)
+
+def subset_matrix_input(parent: OptimizeRequest, sub: OptimizeRequest) -> MatrixInput:
+    """
+    The parent's supplied matrix restricted to the depots and stops of `sub` (decomposition subproblems).
+    """
+    supplied = load_matrix_input(parent.matrix, matrix_size(parent))
+    row_of = {key: i for i, key in enumerate(matrix_rows(parent))}
+    rows = np.asarray([row_of[key] for key in matrix_rows(sub)], dtype=np.intp)
+    idx = np.ix_(rows, rows)
+    return encode_matrix_input(SuppliedMatrix(supplied.distances[idx],
+                                              None if supplied.durations is None else supplied.durations[idx],
+                                              supplied.distance_unit))
+
+class MatrixStore:
+    """
+    Uploaded matrices by content id, as .npy files (opened memory-mapped), so solver processes
+    resolve a matrix_id without the matrix travelling with every request.
+    Bounded by max_bytes: least recently used matrices are evicted first (their ids then read as unknown).
+    """
+    def __init__(self, store_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("ROUTEOPT_MATRIX_STORE_DIR",
+                                  os.path.join(tempfile.gettempdir(), "routeopt-matrix-store")),
+                   max_bytes=int(os.environ.get("ROUTEOPT_MATRIX_STORE_MB", "1024")) * 1024 * 1024)
+
+    def _path(self, matrix_id: str, part: str) -> str:
+        if not matrix_id.isalnum():
+            raise MatrixNotFound(matrix_id)
+        return os.path.join(self.store_dir, f"{matrix_id}.{part}")
+
+    def put(self, supplied: SuppliedMatrix) -> str:
+        h = hashlib.sha256(supplied.distance_unit.encode())
+        for values in (supplied.distances, supplied.durations):
+            if values is not None:
+                h.update(values.dtype.str.encode())
+                h.update(np.ascontiguousarray(values).tobytes())
+            else:
+                h.update(b"none")
+        matrix_id = h.hexdigest()[:32]
+        nbytes = sum(v.nbytes for v in (supplied.distances, supplied.durations) if v is not None)
+        if nbytes > self.max_bytes:
+            raise ValueError(f"matrix is {nbytes} bytes, the matrix store holds at most {self.max_bytes}")
+        meta = {"size": supplied.size, "distance_unit": supplied.distance_unit,
+                "durations": supplied.durations is not None}
+        for part, values in (("distances", supplied.distances), ("durations", supplied.durations)):
+            if values is None:
+                continue
+            path = self._path(matrix_id, f"{part}.npy")
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.replace(tmp, path)
+        # Meta last: a matrix is visible only once its arrays are in place
+        with open(self._path(matrix_id, "json"), "w") as f:
+            json.dump(meta, f)
+        self._evict(keep=matrix_id)
+        return matrix_id
+
+    def _evict(self, keep: str):
+        """
+        Drops least recently used matrices (by meta mtime) until the store fits in max_bytes.
+        """
+        sizes, used = {}, {}
+        for name in os.listdir(self.store_dir):
+            matrix_id, _, part = name.partition(".")
+            try:
+                st = os.stat(os.path.join(self.store_dir, name))
+            except OSError:
+                continue
+            sizes[matrix_id] = sizes.get(matrix_id, 0) + st.st_size
+            if part == "json":
+                used[matrix_id] = st.st_mtime
+        total = sum(sizes.values())
+        # Arrays without meta are uploads still being written: counted, never evicted here
+        for _, matrix_id in sorted((mtime, mid) for mid, mtime in used.items() if mid != keep):
+            if total <= self.max_bytes:
+                break
+            if self.delete(matrix_id):
+                total -= sizes[matrix_id]
+
+    def meta(self, matrix_id: str) -> dict:
+        path = self._path(matrix_id, "json")
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            raise MatrixNotFound(matrix_id)
+        return meta
+
+    def size(self, matrix_id: str) -> int:
+        return self.meta(matrix_id)["size"]
+
+    def get(self, matrix_id: str) -> SuppliedMatrix:
+        meta = self.meta(matrix_id)
+        try:
+            distances = np.load(self._path(matrix_id, "distances.npy"), mmap_mode="r")
+            durations = np.load(self._path(matrix_id, "durations.npy"), mmap_mode="r") if meta["durations"] else None
+        except (OSError, ValueError):
+            raise MatrixNotFound(matrix_id)
+        return SuppliedMatrix(distances, durations, meta["distance_unit"])
+
+    def delete(self, matrix_id: str) -> bool:
+        found = False
+        for part in ("json", "distances.npy", "durations.npy"):
+            try:
+                os.remove(self._path(matrix_id, part))
+                found = True
+            except OSError:
+                pass
+        return found
+
+default_matrix_store = MatrixStore.from_env()
@@ -0,0 +1,139 @@
+import math
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Prometheus text exposition (format 0.0.4) without a client library: /metrics is scraped directly.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+NODE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[tuple, list] = {} # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = labels + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._series: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    """
+    Read at scrape time from `read` (e.g. a queue length), so it is never stale.
+    """
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.read())}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name not in self._names:
+                self._names.add(metric.name)
+                self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.register(Histogram(
+    "routeopt_http_request_seconds", "HTTP request latency by route.", LATENCY_BUCKETS))
+solve_phase_seconds = registry.register(Histogram(
+    "routeopt_solve_phase_seconds", "Solve time per phase (summary.timings).", LATENCY_BUCKETS))
+solve_nodes = registry.register(Histogram(
+    "routeopt_solve_nodes", "Solver nodes (depots + stops/chunks) per solve.", NODE_BUCKETS))
+solve_vehicles = registry.register(Histogram(
+    "routeopt_solve_vehicles", "Solver vehicles (incl. multi-trip clones) per solve.", NODE_BUCKETS))
+solves_total = registry.register(Counter(
+    "routeopt_solves_total", "Finished solves by status and stop reason."))
+
+_PHASES = ("validation", "queue_wait", "data_model", "matrix", "model_build", "search", "extraction", "total")
+
+def observe_response(response: dict):
+    """
+    Records one finished solve (OptimizeResponse as a dict, as returned by the solver pool).
+    """
+    summary = response.get("summary") or {}
+    solves_total.inc(status=summary.get("status") or "unknown", stop_reason=summary.get("stop_reason") or "none")
+    timings = summary.get("timings") or {}
+    for phase in _PHASES:
+        value = timings.get(f"{phase}_seconds")
+        if value is not None:
+            solve_phase_seconds.observe(value, phase=phase)
+    stats = summary.get("search_stats")
+    if stats:
+        solve_nodes.observe(stats["nodes"])
+        solve_vehicles.observe(stats["vehicles"])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class Depot(BaseModel):
     id: str
@@ -63,14 +63,27 @@ class GlobalSettings(BaseModel):
     reload_time_min: int = 30
     enable_multi_trip: bool = False
     max_trips_per_vehicle: int = 2
+    # CLONES: one solver vehicle per trip, chained in time; RELOADS: one vehicle per truck with
+    # optional depot reload visits that reset its load
+    multi_trip_model: str = "CLONES"
+
+# OR-Tools first-solution strategies this model can start from. Left out: SWEEP and EVALUATOR_STRATEGY (need
+# setup the solver does not do), BEST_INSERTION (leaves capacity/time-window plans unserved) and
+# FIRST_UNBOUND_MIN_VALUE (slow to find a first plan at all).
+FIRST_SOLUTION_STRATEGIES = ("AUTOMATIC", "PATH_CHEAPEST_ARC", "PATH_MOST_CONSTRAINED_ARC", "SAVINGS", "PARALLEL_SAVINGS",
+                             "CHRISTOFIDES", "PARALLEL_CHEAPEST_INSERTION", "SEQUENTIAL_CHEAPEST_INSERTION",
+                             "LOCAL_CHEAPEST_INSERTION", "LOCAL_CHEAPEST_COST_INSERTION", "GLOBAL_CHEAPEST_ARC",
+                             "LOCAL_CHEAPEST_ARC", "ALL_UNPERFORMED")
 
 class SolverParams(BaseModel):
     time_limit_seconds: int = 30
     use_matrix_cache: bool = True
+    use_result_cache: bool = False # Opt-in: /optimize answers a re-submitted plan from the result cache
     allow_unserved: bool = True
     penalty_base: int = 100000
     avg_speed_kmph: float = 30.0 # Fallback
-    local_search_metaheuristic: Optional[str] = None
+    local_search_metaheuristic: Optional[str] = None # GUIDED_LOCAL_SEARCH, TABU_SEARCH, SIMULATED_ANNEALING, ...
+    first_solution_strategy: Optional[str] = None # One of FIRST_SOLUTION_STRATEGIES; default PATH_CHEAPEST_ARC
     span_cost_coeff: int = 0
     
     # Cost Model Params (P0)
@@ -82,6 +95,56 @@ class SolverParams(BaseModel):
     # P1/P2 Settings (Optional override)
     global_settings: Optional[GlobalSettings] = None
 
+    # Portfolio: race strategy/metaheuristic configs in parallel processes, keep the best
+    portfolio: bool = False
+    portfolio_size: Optional[int] = None # Configs to run (default: one per portfolio worker)
+
+    # Decomposition for very large plans: SWEEP or KMEANS partitions solved in parallel, or DEPOT: one solve
+    # per depot (its own stops and vehicles; decomposition_max_stops does not apply)
+    decomposition: Optional[str] = None
+    decomposition_max_stops: int = 400 # Target stops per partition (SWEEP, KMEANS)
+
+    # Early stopping (any rule ends the search before time_limit_seconds; summary.stop_reason says which)
+    stop_no_improvement_seconds: Optional[float] = None # No better solution for this long
+    stop_improvement_window_seconds: Optional[float] = None # With stop_min_improvement_ratio:
+    stop_min_improvement_ratio: Optional[float] = None # e.g. 0.001 -> <0.1% better over the window
+    stop_solution_limit: Optional[int] = None # Solutions reported by the search
+    # Reproducible search: no wall-clock rule ends it (a metaheuristic stops after stop_solution_limit,
+    # default 250, solutions), so the same request gives the same plan. time_limit_seconds stays a safety net
+    deterministic: bool = False
+
+    # Demand splitting: orders above this become chunks of this size (default: split only orders no vehicle
+    # can carry, into chunks most of the fleet can carry; 15 reproduces the old fixed split)
+    split_chunk_size: Optional[int] = None
+
+    # Sparse arcs for very large plans: a stop may only be followed by its K nearest stops (or a route end);
+    # no dense matrix is built. None = dense (every arc allowed)
+    sparse_neighbors: Optional[int] = None
+    # Memory (MB) for native OR-Tools transit matrices; tables past it are Python callbacks over the location
+    # matrix (same values, slower search). None = ROUTEOPT_NATIVE_MATRIX_MB, else a share of physical memory
+    native_matrix_max_mb: Optional[int] = None
+
+    # Identical trucks (same vehicle class): USAGE uses them in request order, START_TIME also
+    # orders their departures. None = no symmetry-breaking constraints
+    symmetry_breaking: Optional[str] = None
+
+    # Streaming (/optimize/stream, /optimize/ws): at most one progress event per interval
+    stream_interval_seconds: float = 0.5
+    stream_routes: bool = False # Include stop id sequences per vehicle in each event
+
+class MatrixInput(BaseModel):
+    """
+    Client-supplied travel matrices (e.g. road network) replacing the haversine matrix.
+    Rows/columns: the unique depots (depot, then depots, by first id), then stops in request order.
+    Inline data is base64 of little-endian row-major size x size values; or reference a stored matrix_id.
+    """
+    size: Optional[int] = None
+    dtype: str = "float32" # float32 or int32
+    distances: Optional[str] = None # base64, in distance_unit
+    durations: Optional[str] = None # base64, seconds (default: distance / vehicle speed)
+    distance_unit: str = "m" # m or km
+    matrix_id: Optional[str] = None # Returned by POST /matrices
+
 class OptimizeRequest(BaseModel):
     depot: Depot # Main depot (legacy/fallback)
     depots: List[Depot] = [] # All available depots
@@ -91,6 +154,10 @@ class OptimizeRequest(BaseModel):
     approach: Optional[str] = "BALANCED"
     # P1 Physics
     cylinder_types: List[CylinderType] = []
+    # Warm start: previous plan's routes, re-used as the initial solution
+    initial_routes: Optional[List["VehicleRoute"]] = None
+    # Precomputed distance/duration matrices; no matrix is computed when present
+    matrix: Optional[MatrixInput] = None
 
 class RouteStep(BaseModel):
     stop_id: str
@@ -120,6 +187,54 @@ class VehicleRoute(BaseModel):
     avg_onboard_mass_kg: float = 0.0
     co2_kg: float = 0.0 # P2
 
+class PortfolioRun(BaseModel):
+    solver_config: str
+    status: str
+    objective_value: Optional[int] = None
+    total_dist_km: float = 0.0
+    unserved_count: int = 0
+    wall_seconds: float = 0.0
+
+class SubproblemReport(BaseModel):
+    name: str
+    stops: int
+    vehicles: int
+    status: str
+    objective_value: Optional[int] = None
+    unserved_count: int = 0
+    wall_seconds: float = 0.0
+
+class SolutionProgress(BaseModel):
+    solution_index: int # Improving solutions found so far
+    objective_value: int
+    elapsed_seconds: float
+    unserved_count: int
+    routes: Optional[Dict[str, List[str]]] = None # vehicle_id -> stop/chunk ids, when stream_routes
+
+class PhaseTimings(BaseModel):
+    # Seconds. validation: API request parsing/checks (sync /optimize only);
+    # queue_wait: submitted to the solver pool until a worker picked it up.
+    validation_seconds: Optional[float] = None
+    queue_wait_seconds: Optional[float] = None
+    data_model_seconds: float = 0.0 # create_data_model, excluding the matrix
+    matrix_seconds: float = 0.0
+    model_build_seconds: float = 0.0 # Routing model, dimensions, cost matrices
+    search_seconds: float = 0.0
+    extraction_seconds: float = 0.0
+    total_seconds: float = 0.0 # solve_vrp wall time
+
+class SearchStats(BaseModel):
+    nodes: int # Solver nodes (depots + stops/chunks)
+    vehicles: int # Solver vehicles (incl. multi-trip clones)
+    vehicle_classes: Optional[int] = None # Groups of interchangeable vehicles
+    solutions: int
+    branches: int
+    failures: int
+    wall_seconds: float # OR-Tools solver wall time
+    native_transits: Optional[int] = None # Transit tables registered as native node x node matrices
+    callback_transits: Optional[int] = None # Transit tables evaluated by Python callbacks (sparse arcs, or past the
+                                            # native matrix memory budget)
+
 class SolutionSummary(BaseModel):
     total_dist_km: float
     total_time_min: int
@@ -128,7 +243,35 @@ class SolutionSummary(BaseModel):
     # P2 Metric
     total_ton_km: float = 0.0
     total_co2_kg: float = 0.0
+    # Matrix cache tier that served this solve: memory, disk, miss (None = cache disabled)
+    matrix_cache: Optional[str] = None
+    # Result cache: memory, disk, coalesced (shared a concurrent identical solve), miss (None = not consulted)
+    result_cache: Optional[str] = None
+    objective_value: Optional[int] = None
+    solver_config: Optional[str] = None # FIRST_SOLUTION/METAHEURISTIC that produced the routes
+    portfolio_runs: Optional[List[PortfolioRun]] = None
+    subproblems: Optional[List[SubproblemReport]] = None # Decomposed solves only
+    boundary_repairs: Optional[int] = None
+    warm_started: Optional[bool] = None # None: no initial_routes given; False: they did not fit the model
+    # Why the search ended: time_limit, completed (local optimum), no_improvement, converged,
+    # solution_limit, accepted (streaming client took the plan early)
+    stop_reason: Optional[str] = None
+    timings: Optional[PhaseTimings] = None
+    search_stats: Optional[SearchStats] = None
+    solver_nodes: Optional[int] = None # Depots + stops + chunks of split stops (summed over subproblems)
+    split_stops: Optional[int] = None # Stops split into several nodes
+    solver_arcs: Optional[int] = None # Node arcs kept in sparse mode (params.sparse_neighbors)
 
 class OptimizeResponse(BaseModel):
     routes: List[VehicleRoute]
     summary: SolutionSummary
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str # queued, running, done, failed
+    submitted_at: float # Unix seconds
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+OptimizeRequest.model_rebuild()
@@ -0,0 +1,229 @@
+import math
+from typing import Callable, Optional, Sequence, Tuple
+import numpy as np
+from .matrix import EARTH_RADIUS_KM, haversine_pairs
+
+def nearest_neighbors(lats, lngs, k: int) -> np.ndarray:
+    """
+    The k nearest other points of every point (rows of indices, -1 padded when there are fewer),
+    via a uniform grid over an equirectangular projection (~k points per cell). A cell's candidate
+    ring grows until it covers the k-th distance of every point in the cell, so the result is exact
+    in the projected plane; cost ~ n log n instead of the n^2 of a full matrix.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    n = lat.shape[0]
+    k = min(k, n - 1)
+    out = np.full((n, max(k, 0)), -1, dtype=np.int64)
+    if k <= 0:
+        return out
+    x = EARTH_RADIUS_KM * lng * math.cos(float(lat.mean()))
+    y = EARTH_RADIUS_KM * lat
+    width, height = max(float(np.ptp(x)), 1e-6), max(float(np.ptp(y)), 1e-6)
+    cell = max(math.sqrt(width * height * k / n), 1e-6)
+    cx = ((x - x.min()) / cell).astype(np.int64)
+    cy = ((y - y.min()) / cell).astype(np.int64)
+    span = int(max(cx.max(), cy.max())) + 1
+
+    order = np.lexsort((cy, cx))
+    keys = cx[order] * span + cy[order]
+    occupied, first = np.unique(keys, return_index=True)
+    last = np.append(first[1:], n)
+    occ_x, occ_y = occupied // span, occupied % span
+
+    for c in range(occupied.shape[0]):
+        members = order[first[c]:last[c]]
+        ring = 1
+        while True:
+            near = np.flatnonzero((np.abs(occ_x - occ_x[c]) <= ring) & (np.abs(occ_y - occ_y[c]) <= ring))
+            candidates = np.concatenate([order[first[o]:last[o]] for o in near])
+            if candidates.shape[0] <= k and near.shape[0] < occupied.shape[0]:
+                ring += 1
+                continue
+            d2 = (x[members, None] - x[None, candidates]) ** 2 + (y[members, None] - y[None, candidates]) ** 2
+            d2[members[:, None] == candidates[None, :]] = np.inf
+            nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            kth = math.sqrt(float(np.take_along_axis(d2, nearest, axis=1).max()))
+            # Anything outside the ring is at least ring * cell away from every member
+            if kth > ring * cell and near.shape[0] < occupied.shape[0]:
+                ring = max(ring + 1, math.ceil(kth / cell))
+                continue
+            by_distance = np.argsort(np.take_along_axis(d2, nearest, axis=1), axis=1, kind="stable")
+            out[members] = candidates[np.take_along_axis(nearest, by_distance, axis=1)]
+            break
+    return out
+
+class SparseArcs:
+    """
+    Allowed arcs between distinct locations: each location's k nearest (both directions, so the graph is
+    symmetric), itself, and every arc to or from a depot location. Stored as sorted from*n+to keys with
+    km (and supplied minutes/meters) per arc; memory grows with n * k instead of n^2.
+    Indexing [rows, cols] returns km like a dense matrix (arcs not kept are computed on demand).
+    """
+    __slots__ = ("size", "keys", "km", "minutes", "meters", "locations", "dense")
+
+    @classmethod
+    def build(cls, locations: Sequence[Tuple[float, float]], depot_locations: Sequence[int], k: int) -> "SparseArcs":
+        """
+        Haversine arcs over `locations` (km rounded through float32, as compute_distance_matrix).
+        """
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        neighbors = nearest_neighbors(coords[:, 0], coords[:, 1], k)
+        arcs = cls()
+        arcs.locations = coords
+        arcs.dense = None
+        arcs._set_keys(neighbors, depot_locations)
+        frm, to = divmod(arcs.keys, arcs.size)
+        arcs.km = arcs._haversine(frm, to)
+        arcs.minutes = arcs.meters = None
+        return arcs
+
+    @classmethod
+    def from_matrix(cls, distance_km: np.ndarray, depot_locations: Sequence[int], k: int,
+                    minutes: Optional[np.ndarray] = None, meters: Optional[np.ndarray] = None) -> "SparseArcs":
+        """
+        Arcs picked from a supplied (dense) matrix: k smallest distances per row.
+        """
+        km = np.asarray(distance_km, dtype=np.float64)
+        n = km.shape[0]
+        k = min(k, n - 1)
+        ranked = km.copy()
+        np.fill_diagonal(ranked, np.inf)
+        neighbors = np.argpartition(ranked, k - 1, axis=1)[:, :k] if k > 0 else np.zeros((n, 0), dtype=np.int64)
+        arcs = cls()
+        arcs.locations = None
+        arcs.dense = (km, minutes, meters)
+        arcs._set_keys(neighbors, depot_locations)
+        frm, to = divmod(arcs.keys, arcs.size)
+        arcs.km = km[frm, to]
+        arcs.minutes = None if minutes is None else np.asarray(minutes, dtype=np.float64)[frm, to]
+        arcs.meters = None if meters is None else np.asarray(meters, dtype=np.float64)[frm, to]
+        return arcs
+
+    def _set_keys(self, neighbors: np.ndarray, depot_locations: Sequence[int]):
+        n = neighbors.shape[0]
+        self.size = n
+        rows = np.repeat(np.arange(n, dtype=np.int64), neighbors.shape[1])
+        cols = neighbors.reshape(-1).astype(np.int64)
+        rows, cols = rows[cols >= 0], cols[cols >= 0]
+        depots = np.unique(np.asarray(depot_locations, dtype=np.int64))
+        every = np.arange(n, dtype=np.int64)
+        depot_rows = np.repeat(depots, n)
+        depot_cols = np.tile(every, depots.shape[0])
+        self.keys = np.unique(np.concatenate([rows * n + cols, cols * n + rows, every * n + every,
+                                              depot_rows * n + depot_cols, depot_cols * n + depot_rows]))
+
+    def _haversine(self, frm: np.ndarray, to: np.ndarray) -> np.ndarray:
+        lat, lng = self.locations[:, 0], self.locations[:, 1]
+        return haversine_pairs(lat[frm], lng[frm], lat[to], lng[to]).astype(np.float32).astype(np.float64)
+
+    def __len__(self) -> int:
+        return self.keys.shape[0]
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.keys, self.km, self.minutes, self.meters) if a is not None)
+
+    def lookup(self, rows, cols) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        (km, minutes, meters) for location pairs; pairs without a kept arc come from the dense
+        supplied matrix or haversine.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        wanted = rows * self.size + cols
+        pos = np.minimum(np.searchsorted(self.keys, wanted), len(self) - 1)
+        found = self.keys[pos] == wanted
+        if found.all():
+            return (self.km[pos], None if self.minutes is None else self.minutes[pos],
+                    None if self.meters is None else self.meters[pos])
+        if self.dense is not None:
+            km, minutes, meters = self.dense
+            return (np.asarray(km, dtype=np.float64)[rows, cols],
+                    None if minutes is None else np.asarray(minutes, dtype=np.float64)[rows, cols],
+                    None if meters is None else np.asarray(meters, dtype=np.float64)[rows, cols])
+        km = np.where(found, self.km[pos], 0.0)
+        missing = ~found
+        km[missing] = self._haversine(rows[missing], cols[missing])
+        return km, None, None
+
+    def __getitem__(self, item):
+        rows, cols = item
+        km = self.lookup(np.atleast_1d(rows), np.atleast_1d(cols))[0]
+        return km if np.ndim(rows) or np.ndim(cols) else km[0]
+
+    def node_arcs(self, node_location: Sequence[int]) -> "NodeArcs":
+        return NodeArcs(self, node_location)
+
+class NodeArcs:
+    """
+    SparseArcs expanded to solver nodes (chunks of a stop share their location's arcs), sorted by
+    (from_node, to_node). Registers Python transit callbacks backed by per-arc value lists.
+    """
+    def __init__(self, arcs: SparseArcs, node_location: Sequence[int]):
+        loc = np.asarray(node_location, dtype=np.int64)
+        self.arcs = arcs
+        self.node_location = loc
+        self.num_nodes = loc.shape[0]
+        # Nodes grouped by location
+        order = np.argsort(loc, kind="stable")
+        count = np.bincount(loc, minlength=arcs.size)
+        start = np.cumsum(count) - count
+        src, dst = divmod(arcs.keys, arcs.size)
+        pairs = count[src] * count[dst]
+        arc = np.repeat(np.arange(len(arcs)), pairs)
+        offset = np.arange(arc.shape[0]) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+        frm = order[start[src[arc]] + offset // count[dst[arc]]]
+        to = order[start[dst[arc]] + offset % count[dst[arc]]]
+        by_node = np.lexsort((to, frm))
+        self.from_node = frm[by_node]
+        self.to_node = to[by_node]
+        self.km = arcs.km[arc[by_node]]
+        self.minutes = None if arcs.minutes is None else arcs.minutes[arc[by_node]]
+        self.meters = None if arcs.meters is None else arcs.meters[arc[by_node]]
+        self.position = {key: p for p, key in enumerate((self.from_node * self.num_nodes + self.to_node).tolist())}
+        self._index_node = None
+        self._callbacks = [] # Keep the Python callables alive as long as the model
+
+    def __len__(self) -> int:
+        return self.from_node.shape[0]
+
+    def successors(self, node: int) -> np.ndarray:
+        lo, hi = np.searchsorted(self.from_node, [node, node + 1])
+        return self.to_node[lo:hi]
+
+    def register(self, routing, manager, values: Callable[["NodeArcs"], np.ndarray]) -> int:
+        """
+        RegisterTransitCallback over `values(arcs)` (int64 per arc, e.g. arc_transit_time_cmin of
+        arcs.km and the service time of arcs.from_node). Arcs that were not kept can never be in a
+        solution (restrict_successors), but heuristics still price them: they get a prohibitive value
+        so they are discarded without computing a distance.
+        """
+        if self._index_node is None:
+            self._index_node = [manager.IndexToNode(i) for i in range(routing.Size() + routing.vehicles())]
+        index_node, position, n = self._index_node, self.position, self.num_nodes
+        table = values(self).tolist()
+        prohibitive = 10 * max(table, default=0) + 1
+
+        def transit(from_index, to_index):
+            p = position.get(index_node[from_index] * n + index_node[to_index])
+            return prohibitive if p is None else table[p]
+
+        self._callbacks.append(transit)
+        return routing.RegisterTransitCallback(transit)
+
+    def restrict_successors(self, routing, manager, num_depots: int) -> int:
+        """
+        NextVar domain of every stop node: its kept successors, any route end, or itself (unperformed).
+        Returns the largest domain size.
+        """
+        node_index = [manager.NodeToIndex(i) for i in range(self.num_nodes)]
+        ends = [routing.End(v) for v in range(routing.vehicles())]
+        widest = 0
+        for node in range(num_depots, self.num_nodes):
+            index = node_index[node]
+            allowed = {node_index[j] for j in self.successors(node).tolist() if node_index[j] >= 0}
+            allowed.update(ends)
+            allowed.add(index)
+            routing.NextVar(index).SetValues(sorted(allowed))
+            widest = max(widest, len(allowed))
+        return widest
@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from .models import Depot, Stop, DemandItem
+
+SPLIT_CHUNK_SIZE = 15 # Legacy fixed chunk size (params.split_chunk_size=15 reproduces the old node layout)
+# Numeric stop fields as columns, one float64 row each (the solver pool's shared-memory layout).
+# Optional windows are NaN.
+STOP_COLUMNS = ("lat", "lng", "demand_units", "service_time_min", "time_window_start", "time_window_end", "priority")
+_INT_COLUMNS = {"demand_units", "service_time_min", "time_window_start", "time_window_end", "priority"}
+
+def fleet_split(capacities: Sequence[int], override: Optional[int] = None) -> Tuple[Optional[int], int]:
+    """
+    (split_above, chunk_size) for NodeTable.build. With `override`, orders above it become chunks of that size.
+    Otherwise an order is split only if no vehicle can carry it, into chunks of the largest load that at
+    least half of the fleet can carry. split_above None: nothing is split (no vehicle has capacity).
+    """
+    if override:
+        size = max(1, int(override))
+        return size, size
+    loads = sorted((c for c in capacities if c > 0), reverse=True)
+    if not loads:
+        return None, SPLIT_CHUNK_SIZE
+    return loads[0], loads[(len(loads) - 1) // 2]
+
+class StopColumns:
+    """
+    The stops as columns: `values` (STOP_COLUMNS x stops, float64), ids, depot ids and the items of the stops
+    that carry any ({stop index: [DemandItem dict]}). All the solver reads of the stops, without a Stop per stop.
+    """
+    __slots__ = ("values", "ids", "depot_ids", "items")
+
+    def __init__(self, values: np.ndarray, ids: Sequence[str], depot_ids: Sequence[Optional[str]],
+                 items: Dict[int, List[dict]]):
+        self.values = values
+        self.ids = ids
+        self.depot_ids = depot_ids
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_stops(cls, stops: Sequence[Stop]) -> "StopColumns":
+        values = np.empty((len(STOP_COLUMNS), len(stops)), dtype=np.float64)
+        for r, name in enumerate(STOP_COLUMNS):
+            values[r] = [np.nan if getattr(s, name) is None else getattr(s, name) for s in stops]
+        # Only stops that carry cylinder items; most plans have none
+        items = {i: [it.model_dump() for it in s.items] for i, s in enumerate(stops) if s.items}
+        return cls(values, [s.id for s in stops], [s.depot_id for s in stops], items)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[STOP_COLUMNS.index(name)]
+
+    def to_stops(self) -> List[Stop]:
+        """
+        Stop objects, built with model_construct (the columns come from validated requests).
+        """
+        values = {name: self.values[r].tolist() for r, name in enumerate(STOP_COLUMNS)}
+        for name in _INT_COLUMNS:
+            values[name] = [None if v != v else int(v) for v in values[name]]
+        return [Stop.model_construct(
+            id=stop_id, depot_id=self.depot_ids[i],
+            items=[DemandItem.model_construct(**it) for it in self.items.get(i, [])],
+            **{name: values[name][i] for name in STOP_COLUMNS}) for i, stop_id in enumerate(self.ids)]
+
+class NodeTable:
+    """
+    Solver nodes as parallel NumPy columns (struct of arrays): depots first (rows 0..num_depots-1),
+    then one row per stop, or per chunk of a split stop, then depot reload visits (add_reloads).
+    Rows point back to `stops` (StopColumns) by index; node ids are derived on demand instead of stored.
+    """
+    __slots__ = ("lat", "lng", "demand", "service_min", "window_start_cmin", "window_end_cmin",
+                 "stop_index", "chunk_index", "num_depots", "depot_ids", "stops", "num_reloads", "reload_depot")
+
+    def __len__(self) -> int:
+        return self.lat.shape[0]
+
+    @classmethod
+    def build(cls, depots: Sequence[Depot], stops: Union[Sequence[Stop], StopColumns], default_window: Tuple[int, int],
+              split_above: Optional[int] = SPLIT_CHUNK_SIZE, split_chunk_size: int = SPLIT_CHUNK_SIZE) -> "NodeTable":
+        """
+        depots: unique, in node order. Stops above `split_above` units (None: never) become
+        ceil(demand / split_chunk_size) chunks; service time is shared pro rata.
+        Windows default to `default_window` (minutes) and are stored in cmin.
+        """
+        if not isinstance(stops, StopColumns):
+            stops = StopColumns.from_stops(stops)
+        table = cls()
+        table.stops = stops
+        table.depot_ids = [d.id for d in depots]
+        table.num_depots = len(depots)
+        num_stops = len(stops)
+
+        stop_demand = stops.column("demand_units").astype(np.int64)
+        stop_service = stops.column("service_time_min").astype(np.int64)
+        split = stop_demand > split_above if split_above is not None else np.zeros(num_stops, dtype=bool)
+        chunks = np.where(split, -(-stop_demand // split_chunk_size), 1)
+
+        stop_index = np.repeat(np.arange(num_stops, dtype=np.int32), chunks)
+        first_row = np.cumsum(chunks) - chunks
+        chunk_index = (np.arange(stop_index.shape[0]) - np.repeat(first_row, chunks)).astype(np.int32)
+        chunk_split = split[stop_index]
+
+        # Chunk k of a split stop takes min(size, remaining) units and that share of the service time
+        demand = stop_demand[stop_index].copy()
+        taken = np.minimum(split_chunk_size, demand - chunk_index.astype(np.int64) * split_chunk_size)
+        demand[chunk_split] = taken[chunk_split]
+        service = stop_service[stop_index].copy()
+        per_unit = stop_service[stop_index][chunk_split] / stop_demand[stop_index][chunk_split]
+        service[chunk_split] = np.rint(per_unit * taken[chunk_split]).astype(np.int64)
+        chunk_index[~chunk_split] = -1
+
+        default_start, default_end = default_window
+        start = stops.column("time_window_start")
+        start = np.where(np.isnan(start), default_start, start).astype(np.int64)
+        end = stops.column("time_window_end")
+        end = np.where(np.isnan(end), default_end, end).astype(np.int64)
+        lat = stops.column("lat")
+        lng = stops.column("lng")
+
+        def with_depots(depot_values, stop_values, dtype):
+            return np.concatenate([np.asarray(depot_values, dtype=dtype), stop_values[stop_index].astype(dtype)])
+
+        table.lat = with_depots([d.lat for d in depots], lat, np.float64)
+        table.lng = with_depots([d.lng for d in depots], lng, np.float64)
+        table.demand = np.concatenate([np.zeros(len(depots), dtype=np.int64), demand])
+        table.service_min = np.concatenate([np.zeros(len(depots), dtype=np.int64), service])
+        table.window_start_cmin = with_depots([d.shift_start_min for d in depots], start, np.int64) * 100
+        table.window_end_cmin = with_depots([d.shift_end_min for d in depots], end, np.int64) * 100
+        table.stop_index = np.concatenate([np.full(len(depots), -1, dtype=np.int32), stop_index])
+        table.chunk_index = np.concatenate([np.full(len(depots), -1, dtype=np.int32), chunk_index])
+        table.num_reloads = 0
+        table.reload_depot = np.zeros(0, dtype=np.int32)
+        return table
+
+    def add_reloads(self, depot_nodes: Sequence[int], service_min: int):
+        """
+        Appends one reload visit per entry of `depot_nodes`: a row at that depot, with its window and
+        `service_min` of loading time. Reload rows carry no demand (the solver resets the load there).
+        """
+        depot_nodes = np.asarray(depot_nodes, dtype=np.int32)
+        count = depot_nodes.shape[0]
+
+        def extend(col, values):
+            setattr(self, col, np.concatenate([getattr(self, col), values.astype(getattr(self, col).dtype)]))
+
+        for col in ("lat", "lng", "window_start_cmin", "window_end_cmin"):
+            extend(col, getattr(self, col)[depot_nodes])
+        extend("demand", np.zeros(count))
+        extend("service_min", np.full(count, service_min))
+        extend("stop_index", np.full(count, -1))
+        extend("chunk_index", np.full(count, -1))
+        self.reload_depot = np.concatenate([self.reload_depot, depot_nodes])
+        self.num_reloads += count
+
+    def location_rows(self) -> np.ndarray:
+        """
+        Row of every node in a depots-then-stops matrix (chunks share their stop's row, reloads their depot's).
+        """
+        rows = np.where(self.stop_index < 0, np.arange(len(self)), self.num_depots + self.stop_index)
+        if self.num_reloads:
+            rows[len(self) - self.num_reloads:] = self.reload_depot
+        return rows
+
+    def trip_bounds(self, route: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        [lo, hi) positions of each trip in a vehicle's visit order (start node first): a trip starts at
+        the start or at a reload visit. Trips without a stop are left out.
+        """
+        first_reload = len(self) - self.num_reloads
+        heads = [k for k, node in enumerate(route) if k == 0 or node >= first_reload] + [len(route)]
+        return [(lo, hi) for lo, hi in zip(heads, heads[1:]) if hi - lo > 1]
+
+    def split_stops(self) -> int:
+        """
+        Stops that became more than one node.
+        """
+        return int(np.count_nonzero(self.chunk_index == 0))
+
+    def is_depot(self, node: int) -> bool:
+        """
+        Depot or reload visit (any row that is not a stop).
+        """
+        return node < self.num_depots or self.stop_index[node] < 0
+
+    def is_reload(self, node: int) -> bool:
+        return node >= len(self) - self.num_reloads
+
+    def node_id(self, node: int) -> str:
+        """
+        Depot id, stop id, "<stop id>#chunk_<k>" for a chunk of a split stop, or "<depot id>#reload_<k>".
+        """
+        if node < self.num_depots:
+            return self.depot_ids[node]
+        if self.is_reload(node):
+            k = node - (len(self) - self.num_reloads)
+            return f"{self.depot_ids[self.reload_depot[k]]}#reload_{k}"
+        stop_id = self.stops.ids[self.stop_index[node]]
+        chunk = self.chunk_index[node]
+        return stop_id if chunk < 0 else f"{stop_id}#chunk_{chunk}"
+
+    def node_ids(self) -> List[str]:
+        return [self.node_id(i) for i in range(len(self))]
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, col).nbytes for col in ("lat", "lng", "demand", "service_min", "window_start_cmin",
+                                                         "window_end_cmin", "stop_index", "chunk_index",
+                                                         "reload_depot"))
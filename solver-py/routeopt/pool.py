@@ -0,0 +1,362 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait
+from multiprocessing import shared_memory
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
+from .models import OptimizeRequest, OptimizeResponse, Stop, MatrixInput
+from .nodes import STOP_COLUMNS, StopColumns
+from .matrix_store import SuppliedMatrix, load_matrix_input, encode_matrix_input
+from .matrix_cache import default_matrix_cache
+from . import metrics
+
+# Shared-memory arrays start on 8-byte boundaries
+_ALIGN = 8
+# Blocks still referenced by views of a failed solve (its traceback); closed after a later solve
+_unclosed = []
+
+def pack_request(request: OptimizeRequest):
+    """
+    Splits a request into a shared-memory block and a small envelope (ids, items, vehicles, params) that is
+    pickled to the worker. The block holds the stop columns and an inline supplied matrix, decoded: the worker
+    solves from them without building Stop objects or decoding base64 (a matrix_id travels as is; workers
+    memory-map the stored matrix). The response still comes back as a dict (OptimizeResponse.model_dump()).
+    Caller owns the returned SharedMemory and must close/unlink it.
+    """
+    stops = StopColumns.from_stops(request.stops)
+    return pack_columns(stops.values, stops.ids, stops.depot_ids, stops.items, request.model_dump(exclude={"stops"}))
+
+def _inline_matrix(request_fields: dict, num_stops: int) -> Optional[SuppliedMatrix]:
+    # Single solves only: fan-out plans are coordinated in this process from the request itself.
+    # Data that does not decode stays in the request, for the worker to report as a failed solve.
+    matrix = request_fields.get("matrix")
+    if not matrix or matrix.get("matrix_id") is not None or fans_out(request_fields["params"]):
+        return None
+    depots = {d["id"] for d in [request_fields["depot"]] + (request_fields.get("depots") or [])}
+    try:
+        return load_matrix_input(MatrixInput.model_validate(matrix), len(depots) + num_stops)
+    except ValueError:
+        return None
+
+def pack_columns(cols: np.ndarray, stop_ids, stop_depot_ids, stop_items, request_fields: dict):
+    """
+    pack_request for stops that are already columns (STOP_COLUMNS x stops, float64), e.g. a columnar request body.
+    """
+    arrays = {"columns": cols}
+    supplied = _inline_matrix(request_fields, cols.shape[1])
+    if supplied is not None:
+        arrays["distances"] = supplied.distances
+        if supplied.durations is not None:
+            arrays["durations"] = supplied.durations
+        request_fields = {**request_fields, "matrix": None}
+    layout = {}
+    size = 0
+    for name, values in arrays.items():
+        size = -(-size // _ALIGN) * _ALIGN
+        layout[name] = (size, values.dtype.str, values.shape)
+        size += values.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, values in arrays.items():
+        offset, dtype, shape = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[:] = values
+
+    envelope = {
+        "shm_name": shm.name,
+        "arrays": layout,
+        "distance_unit": supplied.distance_unit if supplied is not None else None,
+        "stop_ids": stop_ids,
+        "stop_depot_ids": stop_depot_ids,
+        "stop_items": stop_items,
+        "request": request_fields,
+        "submitted_at": time.time(),
+    }
+    return shm, envelope
+
+@contextmanager
+def unpacked(envelope):
+    """
+    Worker side: (request without stops, StopColumns, SuppliedMatrix or None) of a packed request.
+    The columns are copied out of the block (one array copy, no object per stop); the matrix is a view
+    of it, valid until the block is closed on exit.
+    """
+    # Workers inherit the parent's resource tracker (spawn), so attaching does not take ownership;
+    # the parent unlinks once the future completes.
+    shm = shared_memory.SharedMemory(name=envelope["shm_name"])
+    supplied = None
+    try:
+        views = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+                 for name, (offset, dtype, shape) in envelope["arrays"].items()}
+        stops = StopColumns(views.pop("columns").copy(), envelope["stop_ids"], envelope["stop_depot_ids"],
+                            envelope["stop_items"])
+        if "distances" in views:
+            supplied = SuppliedMatrix(views.pop("distances"), views.pop("durations", None), envelope["distance_unit"])
+        del views
+        request = OptimizeRequest.model_validate({**envelope["request"], "stops": []})
+        yield request, stops, supplied
+    finally:
+        # Callers may still hold the SuppliedMatrix: drop its views so the block can close
+        if supplied is not None:
+            supplied.distances = supplied.durations = None
+        _unclosed.append(shm)
+        for block in list(_unclosed):
+            try:
+                block.close()
+                _unclosed.remove(block)
+            except BufferError:
+                pass
+
+def unpack_request(envelope) -> OptimizeRequest:
+    """
+    The full request of a packed envelope, Stop objects included (model_construct: they were validated
+    by the API process). For solves coordinated in this process; workers use unpacked().
+    """
+    with unpacked(envelope) as (request, stops, supplied):
+        request.stops = stops.to_stops()
+        if supplied is not None:
+            request.matrix = encode_matrix_input(supplied)
+    return request
+
+_in_worker = False
+
+def _warm_worker(workers: int = 1):
+    """
+    Process initializer: pay the OR-Tools import and first-model cost before any request arrives.
+    The matrix cache and native matrix memory budgets are shared by the pool's `workers` (each process has its own).
+    """
+    global _in_worker
+    _in_worker = True
+    default_matrix_cache.max_memory_bytes //= max(1, workers)
+    from . import solver
+    from .solver import solve_vrp
+    solver.native_matrix_budget_bytes //= max(1, workers)
+    from .models import Depot, Vehicle, Capacity, SolverParams
+    depot = Depot(id="warm", lat=0.0, lng=0.0, shift_start_min=0, shift_end_min=600)
+    solve_vrp(OptimizeRequest(
+        depot=depot,
+        vehicles=[Vehicle(id="warm", capacity=Capacity(units=1), shift_start_min=0, shift_end_min=600)],
+        stops=[Stop(id="warm", lat=0.001, lng=0.001, demand_units=1, service_time_min=1)],
+        params=SolverParams(time_limit_seconds=1, use_matrix_cache=False)
+    ))
+
+def _ping():
+    return os.getpid()
+
+def fans_out(params) -> bool:
+    """
+    Whether a request (its params, model or dict) is split into sub-solves: portfolio or decomposition.
+    """
+    if isinstance(params, dict):
+        return bool(params.get("decomposition")) or bool(params.get("portfolio"))
+    return bool(params.decomposition) or params.portfolio
+
+def _solve_fan_out(request: OptimizeRequest, pool: "SolverPool") -> dict:
+    from .decompose import solve_decomposed
+    from .portfolio import solve_portfolio
+    started_at = time.time()
+    if request.params.decomposition:
+        response = solve_decomposed(request, pool)
+    else:
+        response = solve_portfolio(request, pool)
+    return {"started_at": started_at, "finished_at": time.time(), "response": response.model_dump()}
+
+def _solve_packed(envelope, events=None, stop=None) -> dict:
+    from .solver import solve_vrp
+    from .batch import shared_matrix_builder
+    from .matrix import compute_distance_matrix
+    started_at = time.time()
+    cache_before = default_matrix_cache.counters()
+    shared_matrix = envelope.get("shared_matrix")
+    with unpacked(envelope) as (request, stops, supplied):
+        # events/stop: manager Queue/Event proxies of a streamed solve
+        response = solve_vrp(request, on_progress=events.put if events is not None else None,
+                             stop_requested=stop.is_set if stop is not None else None,
+                             matrix_builder=shared_matrix_builder(shared_matrix) if shared_matrix else compute_distance_matrix,
+                             stops=stops, supplied_matrix=supplied)
+    if response.summary.timings is not None:
+        response.summary.timings.queue_wait_seconds = round(max(0.0, started_at - envelope["submitted_at"]), 4)
+    return {"started_at": started_at, "finished_at": time.time(), "response": response.model_dump(),
+            "matrix_cache": default_matrix_cache.worker_report(cache_before)}
+
+class _PooledFuture(Future):
+    """
+    Future handed to callers: resolved once the pool has recorded the solve (metrics, worker matrix cache counts),
+    so stats read right after result() include it. cancel() and running() follow the executor's future.
+    """
+    def __init__(self, inner: Future):
+        super().__init__()
+        self._inner = inner
+
+    def cancel(self) -> bool:
+        return self._inner.cancel()  # a cancelled inner future cancels this one from _done
+
+    def running(self) -> bool:
+        return self._inner.running()
+
+class SolverPool:
+    """
+    Long-lived solver processes (pre-imported OR-Tools, warmed on start).
+    The API process only packs, dispatches and collects.
+    Portfolio and decomposed plans are coordinated by a thread of this process, which fans their sub-solves
+    out to one subsolve pool owned by this pool (workers never start pools of their own).
+    record_metrics: observe finished solves in the metrics registry (off for sub-solves).
+    """
+    def __init__(self, max_workers: Optional[int] = None, record_metrics: bool = True):
+        self.max_workers = max_workers or int(os.environ.get("ROUTEOPT_SOLVER_WORKERS", "0")) or os.cpu_count() or 1
+        self.record_metrics = record_metrics
+        self._executor = None
+        self._manager = None
+        self._coordinators = None
+        self._subsolve = None
+        self._started = False
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the API process runs threads (uvicorn), forking it is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_warm_worker, initargs=(self.max_workers,))
+            return self._executor
+
+    def start(self):
+        """
+        Spawns and warms every worker now instead of on the first requests (no-op once started).
+        """
+        if self._started:
+            return
+        pool = self._pool()
+        wait([pool.submit(_ping) for _ in range(self.max_workers)])
+        self._started = True
+
+    def subsolve_pool(self) -> "SolverPool":
+        """
+        Pool for fan-out inside one solve (portfolio runs, decomposition partitions), shut down with this one.
+        Separate from this pool so sub-solves start together instead of queueing behind other plans.
+        """
+        if _in_worker:
+            raise RuntimeError("Fan-out solves are coordinated by the process that owns the solver pool")
+        with self._lock:
+            if self._subsolve is None:
+                workers = int(os.environ.get("ROUTEOPT_SUBSOLVE_WORKERS", "0")) or min(os.cpu_count() or 1, 8)
+                self._subsolve = SolverPool(max_workers=workers, record_metrics=False)
+            return self._subsolve
+
+    def manager(self):
+        """
+        Lazily started multiprocessing manager; its Queue/Event proxies carry streaming
+        progress out of, and stop requests into, a running solve.
+        """
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager
+
+    def submit(self, request: OptimizeRequest, events=None, stop=None, shared_matrix=None) -> Future:
+        """
+        Future resolves to {"started_at", "finished_at", "response": OptimizeResponse dict}.
+        shared_matrix: SharedMatrix.handle of a batch group; the caller keeps it alive until the future is done.
+        events, stop and shared_matrix apply to single solves only (fan-out plans only produce the final result).
+        """
+        if fans_out(request.params):
+            return self._submit_fan_out(request)
+        shm, envelope = pack_request(request)
+        envelope["shared_matrix"] = shared_matrix
+        return self.submit_packed(shm, envelope, events, stop)
+
+    def submit_packed(self, shm, envelope, events=None, stop=None) -> Future:
+        """
+        submit() for an already packed request; the pool owns `shm` from here on.
+        """
+        if fans_out(envelope["request"]["params"]):
+            try:
+                request = unpack_request(envelope)
+            finally:
+                shm.close()
+                shm.unlink()
+            return self._submit_fan_out(request)
+        try:
+            future = self._pool().submit(_solve_packed, envelope, events, stop)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+        with self._lock:
+            self._pending += 1
+        outer = _PooledFuture(future)
+        future.add_done_callback(lambda f, shm=shm: self._done(f, shm, outer))
+        return outer
+
+    def _submit_fan_out(self, request: OptimizeRequest) -> Future:
+        subsolve = self.subsolve_pool()
+        with self._lock:
+            if self._coordinators is None:
+                self._coordinators = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="routeopt-fan-out")
+            future = self._coordinators.submit(_solve_fan_out, request, subsolve)
+            self._pending += 1
+        outer = _PooledFuture(future)
+        future.add_done_callback(lambda f: self._done(f, None, outer))
+        return outer
+
+    def _done(self, future, shm, outer: _PooledFuture):
+        try:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            with self._lock:
+                self._pending -= 1
+            if not future.cancelled() and future.exception() is None:
+                out = future.result()
+                if self.record_metrics:
+                    metrics.observe_response(out["response"])
+                # Workers look up their own matrix cache; their counts are reported here (GET /api/cache/matrix).
+                # Fan-out results carry none: their sub-solves were reported by the subsolve pool.
+                if "matrix_cache" in out:
+                    default_matrix_cache.absorb(out["matrix_cache"])
+        finally:
+            if future.cancelled():
+                Future.cancel(outer)
+            elif future.exception() is not None:
+                outer.set_exception(future.exception())
+            else:
+                outer.set_result(future.result())
+
+    def pending(self) -> int:
+        """
+        Submitted solves not finished yet (queued or running).
+        """
+        with self._lock:
+            return self._pending
+
+    def solve(self, request: OptimizeRequest) -> OptimizeResponse:
+        out = self.submit(request).result()
+        return OptimizeResponse.model_validate(out["response"])
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+            if self._coordinators is not None:
+                self._coordinators.shutdown(wait=False, cancel_futures=True)
+                self._coordinators = None
+            subsolve, self._subsolve = self._subsolve, None
+            self._started = False
+        if subsolve is not None:
+            subsolve.shutdown()
+
+solver_pool = SolverPool()
+
+def get_subsolve_pool() -> SolverPool:
+    """
+    solver_pool's subsolve pool (fan-out of portfolio and decomposed solves run outside solver_pool).
+    """
+    return solver_pool.subsolve_pool()
@@ -0,0 +1,71 @@
+import time
+from typing import List, Optional, Tuple
+from .models import OptimizeRequest, OptimizeResponse, SolutionSummary, PortfolioRun
+from .pool import SolverPool, get_subsolve_pool
+
+# (first_solution_strategy, local_search_metaheuristic), most promising first.
+# OR-Tools routing exposes no random seed, so diversity comes from the strategy mix.
+PORTFOLIO_CONFIGS: List[Tuple[str, str]] = [
+    ("PATH_CHEAPEST_ARC", "GUIDED_LOCAL_SEARCH"),
+    ("SAVINGS", "GUIDED_LOCAL_SEARCH"),
+    ("PARALLEL_CHEAPEST_INSERTION", "GUIDED_LOCAL_SEARCH"),
+    ("PATH_CHEAPEST_ARC", "TABU_SEARCH"),
+    ("SAVINGS", "SIMULATED_ANNEALING"),
+    ("PARALLEL_CHEAPEST_INSERTION", "TABU_SEARCH"),
+    ("GLOBAL_CHEAPEST_ARC", "GUIDED_LOCAL_SEARCH"),
+    ("PATH_CHEAPEST_ARC", "SIMULATED_ANNEALING"),
+]
+
+def _ranking_key(response: OptimizeResponse):
+    # Objective already carries drop penalties, so it ranks unserved vs. served consistently
+    failed = response.summary.status == "failed" or response.summary.objective_value is None
+    return (failed, response.summary.objective_value or 0)
+
+def solve_portfolio(request: OptimizeRequest, pool: Optional[SolverPool] = None) -> OptimizeResponse:
+    """
+    Runs the request under several search configurations in parallel (each with the time limit left
+    once the pool is up) and returns the best response, annotated with every run's outcome.
+    """
+    t_start = time.perf_counter()
+    pool = pool or get_subsolve_pool()
+    pool.start()  # Spawning and warming the pool (first fan-out only) counts against the time limit
+    run_s = max(1, round((request.params.time_limit_seconds or 30) - (time.perf_counter() - t_start)))
+    size = min(request.params.portfolio_size or pool.max_workers, pool.max_workers, len(PORTFOLIO_CONFIGS))
+    configs = PORTFOLIO_CONFIGS[:max(1, size)]
+
+    futures = []
+    for fs, ls in configs:
+        sub = request.model_copy(deep=True)
+        sub.params.portfolio = False
+        sub.params.first_solution_strategy = fs
+        sub.params.local_search_metaheuristic = ls
+        sub.params.time_limit_seconds = run_s
+        futures.append(((fs, ls), pool.submit(sub)))
+
+    best = None
+    runs = []
+    for (fs, ls), future in futures:
+        config = f"{fs}/{ls}"
+        try:
+            out = future.result()
+            response = OptimizeResponse.model_validate(out["response"])
+        except Exception as e:
+            runs.append(PortfolioRun(solver_config=config, status=f"error: {type(e).__name__}"))
+            continue
+        summary = response.summary
+        runs.append(PortfolioRun(
+            solver_config=summary.solver_config or config, status=summary.status,
+            objective_value=summary.objective_value, total_dist_km=summary.total_dist_km,
+            unserved_count=len(summary.unserved_stop_ids), wall_seconds=round(out["finished_at"] - out["started_at"], 3)
+        ))
+        # Strict improvement only: ties keep the earlier (preferred) config, so the pick is deterministic
+        if best is None or _ranking_key(response) < _ranking_key(best):
+            best = response
+
+    if best is None:
+        return OptimizeResponse(routes=[], summary=SolutionSummary(
+            total_dist_km=0.0, total_time_min=0, unserved_stop_ids=[s.id for s in request.stops],
+            status="failed", portfolio_runs=runs))
+
+    best.summary.portfolio_runs = runs
+    return best
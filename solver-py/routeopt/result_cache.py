@@ -0,0 +1,273 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple
+from .models import OptimizeRequest, OptimizeResponse, PhaseTimings
+
+# Bump when solver output or the key changes so stale disk entries are not reused.
+RESULT_CACHE_VERSION = "routeopt-result-v2"
+
+# Params that do not change the plan
+NON_RESULT_PARAMS = ("use_result_cache", "use_matrix_cache", "native_matrix_max_mb", "stream_interval_seconds",
+                     "stream_routes")
+# Request lists whose order does not change the plan (items are sorted within each stop)
+UNORDERED_FIELDS = ("stops", "vehicles", "depots", "cylinder_types")
+# Lists that give the rows of a supplied matrix: their order is part of the plan when `matrix` is set
+MATRIX_ORDERED_FIELDS = ("stops", "depots")
+# Stop reasons a re-solve reproduces: the clock played no part in ending the search
+REPRODUCIBLE_STOP_REASONS = ("completed", "solution_limit")
+
+def _canonical(value):
+    # Floats to 12 significant digits (and -0.0 to 0.0): equal values hash equally however they were written
+    if isinstance(value, float):
+        return float(f"{value:.12g}") + 0.0
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+def _dumps(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+def request_key(request: OptimizeRequest) -> str:
+    """
+    Content address of a request: the same plan gives the same key regardless of field, stop, vehicle or
+    depot order, float formatting and params that only affect delivery (streaming, caching).
+    Stops and depots keep their order when a matrix is supplied (it indexes them by position).
+    """
+    fields = _canonical(request.model_dump(mode="json"))
+    fields["params"] = {k: v for k, v in fields["params"].items() if k not in NON_RESULT_PARAMS}
+    for stop in fields["stops"]:
+        stop["items"] = sorted(stop["items"], key=_dumps)
+    for name in UNORDERED_FIELDS:
+        if fields.get("matrix") is not None and name in MATRIX_ORDERED_FIELDS:
+            continue
+        if fields.get(name):
+            fields[name] = sorted(fields[name], key=_dumps)
+    h = hashlib.sha256(RESULT_CACHE_VERSION.encode())
+    h.update(_dumps(fields).encode())
+    return h.hexdigest()
+
+def reproducible(response: OptimizeResponse) -> bool:
+    """
+    Whether solving the same request again gives this response's plan (deterministic search end, no failure).
+    """
+    summary = response.summary
+    return summary.status != "failed" and summary.stop_reason in REPRODUCIBLE_STOP_REASONS
+
+class ResultCache:
+    """
+    Solve responses by request_key, for plans submitted again (double clicks, retries, re-run baselines).
+    Tier 1: in-process LRU of `max_entries`, each valid for `ttl_seconds`.
+    Tier 2 (optional): JSON files in `disk_dir`, bounded by total bytes (oldest-used evicted first).
+    Only reproducible responses are stored. Identical requests in flight share one solve.
+    """
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._lru = OrderedDict()  # key -> (response, stored_at)
+        self._inflight = {}  # key -> Future of the leading solve
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.not_stored = 0
+        self.seconds_saved = 0.0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        # No disk tier unless ROUTEOPT_RESULT_CACHE_DIR is set
+        disk_dir = os.environ.get("ROUTEOPT_RESULT_CACHE_DIR", "")
+        if disk_dir.lower() in ("", "off", "none"):
+            disk_dir = None
+        return cls(max_entries=int(os.environ.get("ROUTEOPT_RESULT_CACHE_ENTRIES", "256")),
+                   ttl_seconds=float(os.environ.get("ROUTEOPT_RESULT_CACHE_TTL_SECONDS", "3600")),
+                   disk_dir=disk_dir,
+                   max_disk_bytes=int(os.environ.get("ROUTEOPT_RESULT_CACHE_DISK_MB", "256")) * 1024 * 1024)
+
+    def get_or_solve(self, request: OptimizeRequest,
+                     solve: Callable[[OptimizeRequest], OptimizeResponse]) -> OptimizeResponse:
+        """
+        The cached response for `request`, or solve(request). A request identical to one being solved waits
+        for that solve. summary.result_cache says which: memory, disk, coalesced or miss.
+        """
+        started = time.perf_counter()
+        key = request_key(request)
+        inflight = None
+        with self._lock:
+            response = self._get_memory(key)
+            if response is not None:
+                self.hits_memory += 1
+            else:
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    leader = self._inflight[key] = Future()
+        if response is not None:
+            return self._served(response, "memory", started)
+        if inflight is not None:
+            response = inflight.result()
+            with self._lock:
+                self.coalesced += 1
+            return self._served(response, "coalesced", started)
+
+        try:
+            response, stored_at = self._load_disk(key)
+            source = "disk"
+            if response is None:
+                response, source = solve(request), "miss"
+            with self._lock:
+                if source == "disk":
+                    self.hits_disk += 1
+                    self._remember(key, response, stored_at)
+                elif reproducible(response):
+                    self.misses += 1
+                    self._remember(key, response, time.time())
+                else:
+                    self.misses += 1
+                    self.not_stored += 1
+            if source == "miss" and reproducible(response):
+                self._store_disk(key, response)
+            leader.set_result(response)
+        except BaseException as e:
+            leader.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return self._served(response, source, started)
+
+    def _served(self, response: OptimizeResponse, source: str, started: float) -> OptimizeResponse:
+        # Callers get their own copy. A response that was not solved for this request reports this request's
+        # timings (the cache lookup or the wait for the shared solve), not those of the solve it reuses.
+        out = response.model_copy(deep=True)
+        out.summary.result_cache = source
+        if source != "miss":
+            if out.summary.timings is not None:
+                with self._lock:
+                    self.seconds_saved += out.summary.timings.total_seconds
+            out.summary.timings = PhaseTimings(total_seconds=round(time.perf_counter() - started, 4))
+        return out
+
+    def _get_memory(self, key) -> Optional[OptimizeResponse]:
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl_seconds:
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return entry[0]
+
+    def _remember(self, key, response, stored_at):
+        self._lru[key] = (response.model_copy(deep=True), stored_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _load_disk(self, key) -> Tuple[Optional[OptimizeResponse], float]:
+        """
+        (response, stored_at), or (None, 0.0) when there is no live entry.
+        """
+        if not self.disk_dir:
+            return None, 0.0
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            stored_at = float(entry["stored_at"])
+            if time.time() - stored_at > self.ttl_seconds:
+                os.remove(path)
+                return None, 0.0
+            response = OptimizeResponse.model_validate(entry["response"])
+        except (OSError, ValueError, KeyError):
+            return None, 0.0
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return response, stored_at
+
+    def _store_disk(self, key, response: OptimizeResponse):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"stored_at": time.time(), "response": response.model_dump(mode="json")}, f)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            p = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        entries.sort()
+        for _, size, p in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                continue
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.coalesced + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "not_stored": self.not_stored,
+                "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+                "solve_seconds_saved": round(self.seconds_saved, 4),
+                "memory_entries": len(self._lru),
+                "in_flight": len(self._inflight),
+                "disk_dir": self.disk_dir,
+            }
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._lru.clear()
+            self.hits_memory = self.hits_disk = self.coalesced = self.misses = self.not_stored = 0
+            self.seconds_saved = 0.0
+        if disk and self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+default_result_cache = ResultCache.from_env()
@@ -1,82 +1,148 @@
 # Phase 0 Objective Truth Contract: fixed costs apply only to MONEY; DISTANCE/TIME must not include fixed costs; certify_phase0 must remain deterministic.
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
-from typing import List, Tuple
-from .models import OptimizeRequest, OptimizeResponse, VehicleRoute, SolutionSummary, RouteStep, Stop, Vehicle, Depot
-from .matrix import compute_time_matrix, compute_distance_matrix
+from typing import Callable, List, Optional, Tuple
+from .models import (OptimizeRequest, OptimizeResponse, VehicleRoute, SolutionSummary, RouteStep, Stop, Vehicle, Depot,
+                     PhaseTimings, SearchStats, FIRST_SOLUTION_STRATEGIES)
+from .matrix import (compute_distance_matrix, unique_locations, node_distance_matrix_m, node_transit_time_cmin,
+                     node_money_cost_cents, arc_distance_m, arc_transit_time_cmin, arc_money_cost_cents, LocationTransits)
+from .matrix_cache import default_matrix_cache
+from .matrix_store import load_matrix_input, SuppliedMatrix
+from .streaming import SolutionStreamer
+from .search_monitor import ConvergenceMonitor
+from .nodes import NodeTable, StopColumns, fleet_split
+from .neighbors import SparseArcs
+import os
 import traceback
+import time
+import numpy as np
 
-def create_data_model(request: OptimizeRequest):
+# Metaheuristic solutions before a deterministic search ends (params.deterministic without stop_solution_limit)
+DETERMINISTIC_SOLUTION_LIMIT = 250
+# Native OR-Tools transit matrices hold an int64 per node pair; registering one also builds it as nested Python lists
+# (about 48 bytes per entry, released once registered). Tables that do not fit the memory budget register callbacks
+# over the location matrices (LocationTransits) instead.
+NATIVE_ENTRY_BYTES = 8
+NATIVE_REGISTER_ENTRY_BYTES = 48
+# Share of physical memory for native matrices when neither params.native_matrix_max_mb nor ROUTEOPT_NATIVE_MATRIX_MB
+# is set
+NATIVE_MATRIX_MEMORY_SHARE = 0.25
+
+def _default_native_matrix_bytes() -> int:
+    env = os.environ.get("ROUTEOPT_NATIVE_MATRIX_MB")
+    if env:
+        return int(env) * 1024 * 1024
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError): # Windows
+        physical = 8 * 1024 ** 3
+    return int(physical * NATIVE_MATRIX_MEMORY_SHARE)
+
+# This process's budget; pool workers each take an equal part (pool._warm_worker)
+native_matrix_budget_bytes = _default_native_matrix_bytes()
+
+def _speed(kmph: Optional[float]) -> float:
+    # Travel speed of a vehicle (km/h): unset is 30, non-positive 1
+    speed = float(kmph or 30.0)
+    return speed if speed > 0 else 1.0
+
+def native_tables(tables: List, num_nodes: int, budget_bytes: int) -> set:
+    """
+    The tables (most evaluated first) registered as native matrices: each while it fits the budget
+    next to those already registered, counting its Python lists while it is registered.
+    """
+    used, native = 0, set()
+    for table in tables:
+        if used + num_nodes ** 2 * (NATIVE_ENTRY_BYTES + NATIVE_REGISTER_ENTRY_BYTES) > budget_bytes:
+            break
+        used += num_nodes ** 2 * NATIVE_ENTRY_BYTES
+        native.add(table)
+    return native
+# First-solution strategies that build routes starting from the last vehicle
+LAST_VEHICLE_FIRST_STRATEGIES = ("PATH_CHEAPEST_ARC", "PATH_MOST_CONSTRAINED_ARC", "AUTOMATIC")
+
+def create_data_model(request: OptimizeRequest,
+                      matrix_builder: Callable[[List[Tuple[float, float]]], np.ndarray] = compute_distance_matrix,
+                      stops: Optional[StopColumns] = None, supplied_matrix: Optional[SuppliedMatrix] = None):
+    """
+    matrix_builder: km matrix over the distinct locations (e.g. gathered from a batch's shared matrix).
+    stops: the stops as columns, in place of request.stops (a pool worker reads them from shared memory).
+    supplied_matrix: request.matrix already decoded (likewise).
+    """
     data = {}
-    SPLIT_CHUNK_SIZE = 15 
-    solver_nodes = []
+    if stops is None:
+        stops = StopColumns.from_stops(request.stops)
     
     all_depots = [request.depot] + (request.depots or [])
-    unique_depots = {d.id: d for d in all_depots}.values()
-    depot_id_to_node_index = {}
-    
-    for i, depot in enumerate(unique_depots):
-        solver_nodes.append({
-            'lat': depot.lat, 'lng': depot.lng, 'demand': 0, 'service': 0, 'stop_ref': None,
-            'start': depot.shift_start_min, 'end': depot.shift_end_min, 'type': 'depot', 'id': depot.id
-        })
-        depot_id_to_node_index[depot.id] = len(solver_nodes) - 1
-
-    stops_start_index = len(solver_nodes)
-    node_map = {}
-    for i in range(stops_start_index): node_map[i] = None
-
-    for stop in request.stops:
-        demand = stop.demand_units
-        if demand > SPLIT_CHUNK_SIZE:
-             import math
-             remaining = demand
-             chunk_idx = 0
-             service_per_unit = stop.service_time_min / demand if demand > 0 else 0
-             while remaining > 0:
-                 take = min(remaining, SPLIT_CHUNK_SIZE)
-                 chunk_service = service_per_unit * take
-                 chunk_id = f"{stop.id}#chunk_{chunk_idx}"
-                 chunk_idx += 1
-                 solver_nodes.append({
-                    'lat': stop.lat, 'lng': stop.lng, 'demand': take, 'service': int(round(chunk_service)), 
-                    'stop_ref': stop, 'chunk_id': chunk_id, 'start': stop.time_window_start, 'end': stop.time_window_end,
-                    'type': 'stop', 'id': chunk_id
-                 })
-                 remaining -= take
-        else:
-            solver_nodes.append({
-                'lat': stop.lat, 'lng': stop.lng, 'demand': demand, 'service': int(round(stop.service_time_min)),
-                'stop_ref': stop, 'chunk_id': stop.id, 'start': stop.time_window_start, 'end': stop.time_window_end,
-                'type': 'stop', 'id': stop.id 
-            })
+    unique_depots = list({d.id: d for d in all_depots}.values())
+    depot_id_to_node_index = {d.id: i for i, d in enumerate(unique_depots)}
 
-    for i in range(stops_start_index, len(solver_nodes)):
-        node_map[i] = solver_nodes[i]
+    # Node columns (lat/lng, demand, service, windows in cmin, originating stop); depots first.
+    # Orders are split only when no vehicle can carry them (or above params.split_chunk_size).
+    split_above, chunk_size = fleet_split([v.capacity.units for v in request.vehicles], request.params.split_chunk_size)
+    nodes = NodeTable.build(unique_depots, stops,
+                            default_window=(request.depot.shift_start_min, request.depot.shift_end_min),
+                            split_above=split_above, split_chunk_size=chunk_size)
+    # Multi-trip: CLONES makes one solver vehicle per (truck, trip); RELOADS keeps one per truck and gives
+    # it trips - 1 optional reload visits at its depot (rows after the stops)
+    multi_trip_n = 1
+    reload_trips = False
+    gs = request.params.global_settings
+    if gs and gs.enable_multi_trip:
+        multi_trip_n = gs.max_trips_per_vehicle
+        reload_trips = (gs.multi_trip_model or "CLONES").upper() == "RELOADS"
+    data['vehicle_reloads'] = None
+    if reload_trips:
+        per_truck = max(0, multi_trip_n - 1)
+        first_reload = len(nodes)
+        nodes.add_reloads([depot_id_to_node_index.get(v.depot_id or request.depot.id, 0)
+                           for v in request.vehicles for _ in range(per_truck)], gs.reload_time_min)
+        data['vehicle_reloads'] = [list(range(first_reload + v * per_truck, first_reload + (v + 1) * per_truck))
+                                   for v in range(len(request.vehicles))]
+        multi_trip_n = 1
 
-    data['node_map'] = node_map
+    data['nodes'] = nodes
     data['depot_map'] = depot_id_to_node_index
     
-    locations = [(n['lat'], n['lng']) for n in solver_nodes]
-    data['distance_matrix_km'] = compute_distance_matrix(locations)
-    data['time_matrix_min'] = compute_time_matrix(locations, speed_kmh=1.0) 
-    
-    data['time_windows'] = []
-    data['service_times'] = []
-    data['demands'] = []
-    
-    default_start = request.depot.shift_start_min
-    default_end = request.depot.shift_end_min
-    
-    for n in solver_nodes:
-        s = n['start'] if n['start'] is not None else default_start
-        e = n['end'] if n['end'] is not None else default_end
-        # Convert Time Window to Centiminutes if needed?
-        # If we scale Dimension, we must scale Windows too.
-        # Yes.
-        data['time_windows'].append((int(s * 100), int(e * 100)))
-        data['service_times'].append(n['service'])
-        data['demands'].append(n['demand'])
+    data['num_nodes'] = len(nodes)
+    data['location_distance_m'] = None
+    data['location_duration_min'] = None
+    data['sparse_arcs'] = None
+    sparse_k = request.params.sparse_neighbors
+    matrix_started = time.perf_counter()
+    if request.matrix is not None or supplied_matrix is not None:
+        # Client matrix rows: depots, then stops; chunks of a stop share its row. Nothing is computed.
+        supplied = supplied_matrix or load_matrix_input(request.matrix, len(unique_depots) + len(stops))
+        data['node_location'] = nodes.location_rows().tolist()
+        data['locations'] = [(d.lat, d.lng) for d in unique_depots] + \
+            list(zip(stops.column("lat").tolist(), stops.column("lng").tolist()))
+        data['location_distance_km'] = supplied.distance_km()
+        data['location_distance_m'] = supplied.distance_m()
+        data['location_duration_min'] = supplied.duration_min()
+        data['matrix_cache'] = None
+        if sparse_k:
+            data['sparse_arcs'] = SparseArcs.from_matrix(
+                data['location_distance_km'], data['node_location'][:nodes.num_depots], sparse_k,
+                data['location_duration_min'], data['location_distance_m'])
+    else:
+        # Matrices are built over distinct sites; chunks of one stop share a row.
+        # Every node lookup goes through node_location.
+        locations, node_location = unique_locations(list(zip(nodes.lat.tolist(), nodes.lng.tolist())))
+        data['node_location'] = node_location
+        data['locations'] = locations
+        # Only the km matrix is consumed; travel times are derived per vehicle speed below.
+        if sparse_k:
+            # No dense matrix: km of the kept arcs only (indexable like the matrix for extraction)
+            data['sparse_arcs'] = SparseArcs.build(locations, node_location[:nodes.num_depots], sparse_k)
+            data['location_distance_km'] = data['sparse_arcs']
+            data['matrix_cache'] = None
+        elif request.params.use_matrix_cache:
+            data['location_distance_km'], data['matrix_cache'] = default_matrix_cache.get_or_compute(
+                locations, matrix_builder)
+        else:
+            data['location_distance_km'] = matrix_builder(locations)
+            data['matrix_cache'] = None
+    data['matrix_seconds'] = time.perf_counter() - matrix_started
 
     # P3: Config via Feature Flags
     data['vehicle_capacities'] = []
@@ -85,12 +151,17 @@ def create_data_model(request: OptimizeRequest):
     data['vehicle_speeds'] = []
     data['vehicle_fixed_costs'] = []
     data['vehicle_map'] = [] 
-    
-    multi_trip_n = 1 
-    if request.params.global_settings and request.params.global_settings.enable_multi_trip:
-         multi_trip_n = request.params.global_settings.max_trips_per_vehicle
-    
+    # Vehicle classes: trucks the solver cannot tell apart (capacity, speed, depot, fixed cost, shift, weights).
+    # Members share evaluators, and params.symmetry_breaking may order them.
+    data['vehicle_class'] = []
+    class_index = {}
+
     for v_idx, v in enumerate(request.vehicles):
+        v_class = class_index.setdefault(
+            (v.capacity.units, v.speed_kmph or 30.0, depot_id_to_node_index.get(v.depot_id or request.depot.id, 0),
+             v.fixed_cost or 0.0, v.shift_start_min, v.shift_end_min, v.tare_weight_kg, v.max_weight_capacity_kg,
+             tuple((b.start_min, b.end_min, b.duration_min) for b in v.breaks or []),
+             (v.start_lat, v.start_lng, v.end_lat, v.end_lng)), len(class_index))
         for t in range(multi_trip_n):
              data['vehicle_capacities'].append(v.capacity.units)
              data['vehicle_speeds'].append(v.speed_kmph or 30.0)
@@ -101,56 +172,184 @@ def create_data_model(request: OptimizeRequest):
              fc = v.fixed_cost or 0.0
              data['vehicle_fixed_costs'].append(fc)
              data['vehicle_map'].append({'orig_v': v, 'trip_idx': t, 'orig_idx': v_idx})
+             data['vehicle_class'].append(v_class)
     
     data['num_vehicles'] = len(data['vehicle_capacities'])
+    data['num_vehicle_classes'] = len(class_index)
     data['multi_trip_n'] = multi_trip_n
 
     return data
 
-def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
+def initial_solver_routes(request: OptimizeRequest, data) -> List[List[int]]:
+    """
+    Maps a previous plan (request.initial_routes) onto this model's vehicles and nodes.
+    Steps whose stop/chunk no longer exists are dropped; new stops stay unassigned for insertion.
+    """
+    nodes = data['nodes']
+    node_by_id = {nodes.node_id(i): i for i in range(nodes.num_depots, len(nodes))}
+    vehicle_by_trip = {}
+    for v_idx, v_map in enumerate(data['vehicle_map']):
+        vehicle_by_trip[(v_map['orig_v'].id, v_map['trip_idx'])] = v_idx
+
+    # Reload model: one vehicle per truck, trip k > 0 is entered through the truck's k-th reload visit
+    vehicle_reloads = data['vehicle_reloads']
+    trips = [{} for _ in range(data['num_vehicles'])]
+    used = set()
+    for prev in request.initial_routes or []:
+        orig_id, _, trip = prev.vehicle_id.partition("#trip")
+        trip_idx = int(trip) - 1 if trip.isdigit() else 0
+        v_idx = vehicle_by_trip.get((orig_id, 0 if vehicle_reloads else trip_idx))
+        if v_idx is None or (vehicle_reloads and trip_idx > len(vehicle_reloads[v_idx])):
+            continue
+        visits = trips[v_idx].setdefault(trip_idx, [])
+        for step in prev.steps:
+            node_idx = node_by_id.get(step.stop_id)
+            if node_idx is None or node_idx in used:
+                continue
+            used.add(node_idx)
+            visits.append(node_idx)
+
+    routes = [[] for _ in range(data['num_vehicles'])]
+    for v_idx, by_trip in enumerate(trips):
+        for trip_idx in sorted(by_trip):
+            if vehicle_reloads and trip_idx > 0 and by_trip[trip_idx]:
+                routes[v_idx].append(vehicle_reloads[v_idx][trip_idx - 1])
+            routes[v_idx].extend(by_trip[trip_idx])
+    return routes
+
+def cylinder_flows(request: OptimizeRequest, data):
+    """
+    Per-node cylinder movements for route extraction: (full_kg, empty_kg, deliver, pickup).
+    deliver/pickup are int64 (num_nodes x cylinder types); chunks carry their share of the stop's items.
+    Columns follow request.cylinder_types; items of unknown types carry no weight and are left out.
+    """
+    weights = {ct.id: ct for ct in request.cylinder_types}
+    type_col = {type_id: col for col, type_id in enumerate(weights)}
+    deliver = np.zeros((data['num_nodes'], len(type_col)), dtype=np.int64)
+    pickup = np.zeros((data['num_nodes'], len(type_col)), dtype=np.int64)
+    nodes = data['nodes']
+    node_demand = nodes.demand.tolist()
+    stop_items = nodes.stops.items
+    stop_demand = nodes.stops.column("demand_units")
+    for node_idx, stop_idx in enumerate(nodes.stop_index.tolist()):
+        items = stop_items.get(stop_idx) if stop_idx >= 0 else None
+        if not items:
+            continue
+        ratio = 1.0
+        if stop_demand[stop_idx] > 0: ratio = node_demand[node_idx] / int(stop_demand[stop_idx])
+        for item in items:
+            col = type_col.get(item["cylinder_type_id"])
+            if col is None:
+                continue
+            deliver[node_idx, col] += int(round(item["deliver_units"] * ratio))
+            pickup[node_idx, col] += int(round(item["pickup_units"] * ratio))
+    full_kg = np.array([ct.full_weight_kg for ct in weights.values()], dtype=np.float64)
+    empty_kg = np.array([ct.empty_weight_kg for ct in weights.values()], dtype=np.float64)
+    return full_kg, empty_kg, deliver, pickup
+
+def onboard_mass(tare_kg: float, full: np.ndarray, empty: np.ndarray, full_kg: np.ndarray, empty_kg: np.ndarray) -> np.ndarray:
+    """
+    Vehicle mass per row of (steps x types) onboard counts: tare, then each full type, then each empty type.
+    Vectorized over steps; the summation order per step is fixed, so values do not depend on array layout.
+    """
+    mass = np.full(full.shape[0], float(tare_kg))
+    for col in range(full.shape[1]):
+        mass += full[:, col] * full_kg[col]
+    for col in range(empty.shape[1]):
+        mass += empty[:, col] * empty_kg[col]
+    return mass
+
+def solve_vrp(request: OptimizeRequest, on_progress: Optional[Callable[[dict], None]] = None,
+              stop_requested: Optional[Callable[[], bool]] = None,
+              matrix_builder: Callable[[List[Tuple[float, float]]], np.ndarray] = compute_distance_matrix,
+              stops: Optional[StopColumns] = None, supplied_matrix: Optional[SuppliedMatrix] = None
+              ) -> OptimizeResponse:
+    """
+    on_progress receives a SolutionProgress dict per (throttled) improving solution;
+    once stop_requested() returns True the search ends and the best plan so far is returned.
+    matrix_builder replaces the km matrix computation; stops and supplied_matrix stand in for request.stops
+    and request.matrix (see create_data_model).
+    All of these apply to single solves only (not portfolio/decomposition fan-out).
+    """
+    if request.params.decomposition:
+        from .decompose import solve_decomposed
+        return solve_decomposed(request)
+    if request.params.portfolio:
+        from .portfolio import solve_portfolio
+        return solve_portfolio(request)
+
     try:
-        data = create_data_model(request)
+        solve_started = time.perf_counter()
+        data = create_data_model(request, matrix_builder, stops, supplied_matrix)
+        data_model_done = time.perf_counter()
         
         c_model = (request.params.cost_model or "DISTANCE").upper()
         if c_model not in ["DISTANCE", "TIME", "MONEY"]: c_model = "DISTANCE" 
         request.params.cost_model = c_model
         
+        dist_km_matrix = data['location_distance_km']
+        duration_min = data['location_duration_min']
+        node_loc = data['node_location']
+        nodes = data['nodes']
+        # Sparse mode: Python transit callbacks over the kept arcs instead of native dense matrices
+        arcs = data['sparse_arcs'].node_arcs(node_loc) if data['sparse_arcs'] is not None else None
+
         manager = pywrapcp.RoutingIndexManager(
-            len(data['time_matrix_min']),
+            data['num_nodes'],
             data['num_vehicles'],
             data['vehicle_starts'],
             data['vehicle_ends']
         )
         routing = pywrapcp.RoutingModel(manager)
 
-        transit_callback_indices_for_time = []
-        
-        # Factory to prevent closure/GC issues
-        def make_time_callback(manager, data, speed):
-            s_val = speed
-            # Return CENTIMINUTES (x100)
-            def cb(from_index, to_index):
-                from_node = manager.IndexToNode(from_index)
-                to_node = manager.IndexToNode(to_index)
-                dist_km = data['distance_matrix_km'][from_node][to_node]
-                # (dist / speed) * 60 = Minutes
-                # * 100 = Centiminutes
-                travel_time_cmin = (dist_km / s_val) * 6000.0
-                return int(round(travel_time_cmin + (data['service_times'][from_node] * 100)))
-            return cb
-
-        data['callbacks_keep_alive'] = []
-
-        for vehicle_id in range(data['num_vehicles']):
-            speed = float(data['vehicle_speeds'][vehicle_id] or 30.0)
-            if speed <= 0: speed = 1.0
-            
-            cb = make_time_callback(manager, data, speed)
-            data['callbacks_keep_alive'].append(cb)
-            
-            callback_index = routing.RegisterTransitCallback(cb)
-            transit_callback_indices_for_time.append(callback_index)
-            
+        # One vehicle of each class stands for all of them (and their trip clones)
+        vehicle_class = data['vehicle_class']
+        class_vehicle = {}
+        for vehicle_id, v_class in enumerate(vehicle_class):
+            class_vehicle.setdefault(v_class, vehicle_id)
+
+        # Native node x node matrices are evaluated without calling into Python, but each costs nodes^2 int64 (and
+        # Python lists while registering). Tables are native while they fit the memory budget, the arc cost first;
+        # the rest are callbacks reading the location matrices.
+        speed_keys = list(dict.fromkeys(_speed(data['vehicle_speeds'][v]) if duration_min is None else None
+                                        for v in class_vehicle.values()))
+        tables = [("distance", None)] if c_model == "DISTANCE" else []
+        tables += [("money", key) for key in speed_keys] if c_model == "MONEY" else []
+        tables += [("time", key) for key in speed_keys]
+        site, native = None, set()
+        if arcs is None:
+            budget = native_matrix_budget_bytes if request.params.native_matrix_max_mb is None \
+                else request.params.native_matrix_max_mb * 1024 * 1024
+            native = native_tables(tables, data['num_nodes'], budget)
+            if len(native) < len(tables):
+                site = LocationTransits(routing, manager, node_loc, nodes.service_min, dist_km_matrix, duration_min,
+                                        data['location_distance_m'])
+        data['native_transits'], data['callback_transits'] = len(native), len(tables) - len(native)
+
+        # One transit matrix per speed (CENTIMINUTES, x100), shared by every vehicle class with that speed.
+        time_callback_by_speed = {}
+        time_callback_by_class = {}
+        for v_class, vehicle_id in class_vehicle.items():
+            speed = _speed(data['vehicle_speeds'][vehicle_id])
+
+            # Supplied durations do not depend on speed: one matrix for the whole fleet
+            speed_key = speed if duration_min is None else None
+            callback_index = time_callback_by_speed.get(speed_key)
+            if callback_index is None and arcs is not None:
+                callback_index = arcs.register(routing, manager, lambda a, speed=speed: arc_transit_time_cmin(
+                    a.km, speed, nodes.service_min[a.from_node], a.minutes))
+                time_callback_by_speed[speed_key] = callback_index
+            elif callback_index is None and ("time", speed_key) not in native:
+                callback_index = site.transit_time_cmin(speed)
+                time_callback_by_speed[speed_key] = callback_index
+            elif callback_index is None:
+                time_cmin = node_transit_time_cmin(dist_km_matrix, node_loc, speed, nodes.service_min, duration_min)
+                callback_index = routing.RegisterTransitMatrix(time_cmin.tolist())
+                time_callback_by_speed[speed_key] = callback_index
+            time_callback_by_class[v_class] = callback_index
+        transit_callback_indices_for_time = [time_callback_by_class[c] for c in vehicle_class]
+        data['speed_classes'] = len(time_callback_by_speed)
+
         time_dimension_name = 'Time'
         # Slack 30 min -> 3000 cmin
         # Capacity 30 days -> 30 * 24 * 60 * 100 = 4320000 cmin
@@ -158,7 +357,7 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
             transit_callback_indices_for_time, 30 * 60 * 100, 30 * 24 * 60 * 100, False, time_dimension_name)
         time_dimension = routing.GetDimensionOrDie(time_dimension_name)
         
-        for location_idx, (start, end) in enumerate(data['time_windows']):
+        for location_idx, (start, end) in enumerate(zip(nodes.window_start_cmin.tolist(), nodes.window_end_cmin.tolist())):
             index = manager.NodeToIndex(location_idx)
             if index != -1: time_dimension.CumulVar(index).SetRange(start, end)
 
@@ -180,18 +379,26 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
                     solver.Add(time_dimension.CumulVar(start_node_t2) >= time_dimension.CumulVar(end_node_t1) + reload_time)
 
         # Capacity Dimension (Demand)
-        def make_demand_callback(manager, data):
-             def cb(from_index):
-                 from_node = manager.IndexToNode(from_index)
-                 return data['demands'][from_node]
-             return cb
-             
-        demand_cb = make_demand_callback(manager, data)
-        data['callbacks_keep_alive'].append(demand_cb)
-        
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_cb)
-        routing.AddDimensionWithVehicleCapacity(
-            demand_callback_index, 0, data['vehicle_capacities'], True, 'Capacity')
+        if nodes.num_reloads:
+            # A reload visit takes off a full truckload, and slack tops the load back up to anywhere
+            # between empty and what is on board (slack is only free at reload visits)
+            reload_units = max(data['vehicle_capacities'])
+            demand = nodes.demand.copy()
+            demand[len(nodes) - nodes.num_reloads:] = -reload_units
+            demand_callback_index = routing.RegisterUnaryTransitVector(demand.tolist())
+            routing.AddDimensionWithVehicleCapacity(
+                demand_callback_index, reload_units, data['vehicle_capacities'], True, 'Capacity')
+            capacity_dimension = routing.GetDimensionOrDie('Capacity')
+            for index in range(routing.Size()):
+                if not nodes.is_reload(manager.IndexToNode(index)):
+                    capacity_dimension.SlackVar(index).SetValue(0)
+            for v_idx, reloads in enumerate(data['vehicle_reloads']):
+                for node in reloads:
+                    routing.VehicleVar(manager.NodeToIndex(node)).SetValues([-1, v_idx]) # Unused, or its truck
+        else:
+            demand_callback_index = routing.RegisterUnaryTransitVector(nodes.demand.tolist())
+            routing.AddDimensionWithVehicleCapacity(
+                demand_callback_index, 0, data['vehicle_capacities'], True, 'Capacity')
 
         cost_model = request.params.cost_model or "DISTANCE"
         
@@ -211,18 +418,17 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
         fuel_cost = request.params.fuel_cost_per_km
         driver_cost = request.params.driver_cost_per_hour
         
-        dist_callback_indices = []
-        for vehicle_id in range(data['num_vehicles']):
-             def dist_callback(from_index, to_index):
-                 from_node = manager.IndexToNode(from_index)
-                 to_node = manager.IndexToNode(to_index)
-                 return int(data['distance_matrix_km'][from_node][to_node] * 1000)
-             idx = routing.RegisterTransitCallback(dist_callback)
-             dist_callback_indices.append(idx)
-
         if cost_model == "DISTANCE":
+            # Distance does not depend on the vehicle: one matrix (meters) for all. Only DISTANCE plans use it.
+            if arcs is not None:
+                dist_callback_index = arcs.register(routing, manager, lambda a: arc_distance_m(a.km, a.meters))
+            elif ("distance", None) not in native:
+                dist_callback_index = site.distance_m()
+            else:
+                dist_callback_index = routing.RegisterTransitMatrix(
+                    node_distance_matrix_m(dist_km_matrix, node_loc, data['location_distance_m']).tolist())
             for v in range(data['num_vehicles']):
-                routing.SetArcCostEvaluatorOfVehicle(dist_callback_indices[v], v)
+                routing.SetArcCostEvaluatorOfVehicle(dist_callback_index, v)
         elif cost_model == "TIME":
             # Reuse Dimension Callbacks for Objective (Stability Test)
             for v in range(data['num_vehicles']):
@@ -234,29 +440,35 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
         elif cost_model == "MONEY":
              safe_fuel = fuel_cost or 0.0
              safe_driver = driver_cost or 0.0
-             # Driver Cost per Hour -> Per CMin?
-             # cost = dist * fuel + time_hr * driver
-             # time_hr = cmin / 6000
-             # cost = dist * fuel + cmin * (driver / 6000)
-             # Multiplier 100 -> Cents
-             for v in range(data['num_vehicles']):
-                 speed = float(data['vehicle_speeds'][v] or 30.0)
-                 def cost_callback(from_index, to_index, v_idx=v, s_val=speed):
-                      from_node = manager.IndexToNode(from_index)
-                      to_node = manager.IndexToNode(to_index)
-                      dist_km = data['distance_matrix_km'][from_node][to_node]
-                      
-                      travel_cmin = (dist_km / s_val) * 6000.0
-                      cmin_total = travel_cmin + (data['service_times'][from_node] * 100)
-                      
-                      cost_cents = (dist_km * safe_fuel * 100) + (cmin_total / 6000.0 * safe_driver * 100)
-                      return int(cost_cents)
-                 c_idx = routing.RegisterTransitCallback(cost_callback)
-                 routing.SetArcCostEvaluatorOfVehicle(c_idx, v)
-        else:
+             # cost = dist * fuel + time_hr * driver, time_hr = cmin / 6000, x100 -> Cents.
+             # Precomputed once per (speed, fuel, driver) and shared by vehicles with that tuple.
+             cost_callback_by_key = {}
+             cost_callback_by_class = {}
+             for v_class, v in class_vehicle.items():
+                 speed = _speed(data['vehicle_speeds'][v])
+                 key = (speed if duration_min is None else None, safe_fuel, safe_driver)
+                 c_idx = cost_callback_by_key.get(key)
+                 if c_idx is None and arcs is not None:
+                     c_idx = arcs.register(routing, manager, lambda a, speed=speed: arc_money_cost_cents(
+                         a.km, speed, nodes.service_min[a.from_node], safe_fuel, safe_driver, a.minutes))
+                     cost_callback_by_key[key] = c_idx
+                 elif c_idx is None and ("money", key[0]) not in native:
+                     c_idx = site.money_cost_cents(speed, safe_fuel, safe_driver)
+                     cost_callback_by_key[key] = c_idx
+                 elif c_idx is None:
+                     cost_cents = node_money_cost_cents(dist_km_matrix, node_loc, speed, nodes.service_min,
+                                                        safe_fuel, safe_driver, duration_min)
+                     c_idx = routing.RegisterTransitMatrix(cost_cents.tolist())
+                     cost_callback_by_key[key] = c_idx
+                 cost_callback_by_class[v_class] = c_idx
              for v in range(data['num_vehicles']):
-                routing.SetArcCostEvaluatorOfVehicle(dist_callback_indices[v], v)
+                 routing.SetArcCostEvaluatorOfVehicle(cost_callback_by_class[vehicle_class[v]], v)
+        # (cost_model is DISTANCE, TIME or MONEY: unknown names were mapped to DISTANCE above)
         
+        if arcs is not None:
+            # Stops may only be followed by a kept neighbor or a route end
+            arcs.restrict_successors(routing, manager, nodes.num_depots)
+
         def get_drop_penalty(base_val, c_model):
             val = base_val or 1000000 
             if c_model == "DISTANCE": return int(val * 1000)
@@ -265,212 +477,243 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
             return int(val)
             
         penalty = get_drop_penalty(request.params.penalty_base, cost_model)
-        for i in range(len(data['depot_map']), manager.GetNumberOfNodes()):
-             if request.params.allow_unserved:
+        for i in range(nodes.num_depots, manager.GetNumberOfNodes()):
+             if nodes.is_reload(i):
+                 routing.AddDisjunction([manager.NodeToIndex(i)], 0) # Reload visits are always optional
+             elif request.params.allow_unserved:
                  routing.AddDisjunction([manager.NodeToIndex(i)], penalty)
 
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        # Unknown or unsupported names fall back to the defaults (PATH_CHEAPEST_ARC, no metaheuristic)
+        # Sparse arcs: PATH_CHEAPEST_ARC runs out of allowed successors and drops stops, SAVINGS does not.
+        # Reload visits: PATH_CHEAPEST_ARC places them poorly (much longer plans), SAVINGS builds whole trips
+        default_fs = "SAVINGS" if arcs is not None or nodes.num_reloads else "PATH_CHEAPEST_ARC"
+        fs_name = (request.params.first_solution_strategy or default_fs).upper()
+        if fs_name not in FIRST_SOLUTION_STRATEGIES: fs_name = default_fs
+        search_parameters.first_solution_strategy = getattr(routing_enums_pb2.FirstSolutionStrategy, fs_name)
         if request.params.time_limit_seconds:
              search_parameters.time_limit.seconds = request.params.time_limit_seconds
         
-        if request.params.local_search_metaheuristic == "GUIDED_LOCAL_SEARCH":
-             search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        ls_name = (request.params.local_search_metaheuristic or "").upper()
+        if ls_name in routing_enums_pb2.LocalSearchMetaheuristic.Value.keys() and ls_name != "UNSET":
+             search_parameters.local_search_metaheuristic = getattr(routing_enums_pb2.LocalSearchMetaheuristic, ls_name)
+        else:
+             ls_name = None
+        solver_config = f"{fs_name}/{ls_name or 'NONE'}"
+
+        # Symmetry breaking between interchangeable trucks (same class, same trip): they are used in a fixed
+        # order (USAGE), and also leave in that order (START_TIME). The order follows the first-solution
+        # heuristic, which would otherwise fail: path builders open vehicles from the last index, the rest
+        # from the first.
+        symmetry = (request.params.symmetry_breaking or "").upper()
+        if symmetry in ("USAGE", "START_TIME"):
+            members = {}
+            for vehicle_id, v_class in enumerate(vehicle_class):
+                members.setdefault((v_class, data['vehicle_map'][vehicle_id]['trip_idx']), []).append(vehicle_id)
+            for group in members.values():
+                if fs_name in LAST_VEHICLE_FIRST_STRATEGIES:
+                    group.reverse()
+                for a, b in zip(group, group[1:]):
+                    solver.Add(routing.ActiveVehicleVar(a) >= routing.ActiveVehicleVar(b))
+                    if symmetry == "START_TIME":
+                        solver.Add(time_dimension.CumulVar(routing.Start(a)) <= time_dimension.CumulVar(routing.Start(b)))
+        if arcs is not None:
+            # Savings pairs each stop with as many neighbors as it may be followed by (the default, all
+            # pairs, is quadratic in memory). Local search keeps its defaults: moves off the kept arcs
+            # are rejected by the NextVar domains.
+            search_parameters.savings_parameters.neighbors_ratio = min(
+                1.0, request.params.sparse_neighbors / max(1, data['num_nodes']))
+
+        streamer = None
+        if on_progress is not None or stop_requested is not None:
+            streamer = SolutionStreamer(routing, manager, data, on_progress, stop_requested,
+                                        request.params.stream_interval_seconds, request.params.stream_routes)
+            streamer.attach()
+        stop_params = request.params
+        if stop_params.deterministic:
+            # Clock-based rules would make the plan depend on machine load: count solutions instead
+            stop_params = stop_params.model_copy(update={
+                "stop_no_improvement_seconds": None, "stop_improvement_window_seconds": None,
+                "stop_solution_limit": stop_params.stop_solution_limit or (DETERMINISTIC_SOLUTION_LIMIT if ls_name else None)})
+        convergence = None
+        if ConvergenceMonitor.enabled(stop_params):
+            convergence = ConvergenceMonitor(routing, stop_params)
+            convergence.attach()
+
+        solution = None
+        warm_started = None
+        search_started = time.perf_counter()
+        if request.initial_routes:
+            routing.CloseModelWithParameters(search_parameters)
+            initial_routes = initial_solver_routes(request, data)
+            # Nothing mapped (new vehicles/stops): a cold start is the better first solution
+            initial = routing.ReadAssignmentFromRoutes(initial_routes, True) if any(initial_routes) else None
+            warm_started = initial is not None
+            if initial is not None:
+                solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+        if solution is None:
+            solution = routing.SolveWithParameters(search_parameters)
+        search_done = time.perf_counter()
 
-        solution = routing.SolveWithParameters(search_parameters)
+        if convergence and convergence.reason:
+            stop_reason = convergence.reason
+        elif streamer and streamer.accepted:
+            stop_reason = "accepted"
+        elif request.params.time_limit_seconds and search_done - search_started >= request.params.time_limit_seconds * 0.99:
+            stop_reason = "time_limit"
+        else:
+            stop_reason = "completed"
         
         routes = []
         unserved_ids = []
         status_str = "failed"
+        objective_value = None
         
         if solution:
             status_str = "optimized" 
+            objective_value = solution.ObjectiveValue()
             for i in range(routing.Size()):
                 if not routing.IsStart(i) and not routing.IsEnd(i):
                      next_val = solution.Value(routing.NextVar(i))
                      if next_val == i:
                          node_idx = manager.IndexToNode(i)
-                         n_data = data['node_map'].get(node_idx)
-                         # Debug T4/T5
-                         # print(f"DEBUG: Unserved Check Idx {i} Node {node_idx} Data {n_data}")
-                         if n_data and n_data.get('type') == 'stop':
-                             unserved_ids.append(n_data.get('id', str(node_idx)))
+                         if not nodes.is_depot(node_idx):
+                             unserved_ids.append(nodes.node_id(node_idx))
 
         total_dist = 0.0
         total_time = 0
         
         if solution:
-             served_indices = []
+             # Per-route work below is array arithmetic over the visit order. Accumulations keep the
+             # per-step order (left to right over steps and cylinder types), so results are bit-identical.
+             node_loc_arr = np.asarray(node_loc, dtype=np.intp)
+             service_arr = nodes.service_min.astype(np.float64)
+             full_kg, empty_kg, deliver, pickup = cylinder_flows(request, data)
+             co2_factor = 0.1
+             if request.params.global_settings:
+                 co2_factor = request.params.global_settings.co2_factor_kg_per_ton_km
+
              for vehicle_id in range(data['num_vehicles']):
-                if solution.Value(routing.NextVar(routing.Start(vehicle_id))) == routing.End(vehicle_id): continue
+              if solution.Value(routing.NextVar(routing.Start(vehicle_id))) == routing.End(vehicle_id): continue
+
+              v_map = data['vehicle_map'][vehicle_id]
+              orig_v = v_map['orig_v']
+
+              # Single pass over the assignment: visit order and service start (cmin)
+              vehicle_nodes = []
+              vehicle_cmin = []
+              index = routing.Start(vehicle_id)
+              while not routing.IsEnd(index):
+                   vehicle_nodes.append(manager.IndexToNode(index))
+                   vehicle_cmin.append(solution.Min(time_dimension.CumulVar(index)))
+                   index = solution.Value(routing.NextVar(index))
+              vehicle_nodes.append(manager.IndexToNode(index))
+              vehicle_cmin.append(solution.Min(time_dimension.CumulVar(index)))
 
-                v_map = data['vehicle_map'][vehicle_id]
-                orig_v = v_map['orig_v']
-                (trip_idx, veh_ref) = (v_map['trip_idx'], orig_v)
+              # One route per trip: a clone's whole route, or the legs between reload visits. A trip
+              # ends on arrival back at the depot (the next reload visit or the vehicle end).
+              for trip_k, (lo, hi) in enumerate(nodes.trip_bounds(vehicle_nodes[:-1])):
+                route_nodes = vehicle_nodes[lo:hi]
+                start_cmin = vehicle_cmin[lo:hi]
+                end_node = vehicle_nodes[hi]
+                r_end_arrival_cmin = vehicle_cmin[hi]
+                # Trips from a reload visit leave once loading is done
+                r_start_cmin = start_cmin[0] + int(nodes.service_min[route_nodes[0]]) * 100
+
+                (trip_idx, veh_ref) = (v_map['trip_idx'] + trip_k, orig_v)
                 final_v_id = f"{orig_v.id}"
                 if trip_idx > 0: final_v_id = f"{orig_v.id}#trip{trip_idx+1}"
-                
-                index = routing.Start(vehicle_id)
-                r_start_cmin = solution.Min(time_dimension.CumulVar(index))
-                
+
+                nodes_arr = np.asarray(route_nodes, dtype=np.intp)
+                locs = node_loc_arr[nodes_arr]
+                dist = np.zeros(len(route_nodes), dtype=np.float64)
+                dist[1:] = dist_km_matrix[locs[:-1], locs[1:]]
+                dist_to_end = float(dist_km_matrix[locs[-1], node_loc[end_node]])
+
+                # Times in minutes; arrival is recomputed from the previous departure at this vehicle's speed
+                # (or from supplied durations)
+                speed = float(data['vehicle_speeds'][vehicle_id] or 30.0)
+                start_min = np.asarray(start_cmin, dtype=np.float64) / 100.0
+                departure = start_min + service_arr[nodes_arr]
+                arrival_calc = start_min.copy()
+                if duration_min is None:
+                    arrival_calc[1:] = departure[:-1] + (dist[1:] / speed) * 60.0
+                else:
+                    arrival_calc[1:] = departure[:-1] + duration_min[locs[:-1], locs[1:]]
+                arrival = np.rint(arrival_calc).astype(np.int64)
+                waiting = np.maximum(start_min - arrival_calc, 0.0).astype(np.int64)
+
+                # Onboard cylinders before each visit: everything routed is loaded at the start,
+                # deliveries drop off and pickups accumulate (depot rows are zero)
+                route_deliver = deliver[nodes_arr]
+                route_pickup = pickup[nodes_arr]
+                loaded = route_deliver.sum(axis=0)
+                delivered_before = np.cumsum(route_deliver, axis=0) - route_deliver
+                full = loaded - delivered_before
+                empty = np.cumsum(route_pickup, axis=0) - route_pickup
+                mass = onboard_mass(veh_ref.tare_weight_kg, full, empty, full_kg, empty_kg)
+                final_mass = float(onboard_mass(veh_ref.tare_weight_kg, (loaded - route_deliver.sum(axis=0))[None, :],
+                                                route_pickup.sum(axis=0)[None, :], full_kg, empty_kg)[0])
+
+                route_dist = float(np.cumsum(dist)[-1]) + dist_to_end
+                route_ton_km = float(np.cumsum(dist * (mass / 1000.0))[-1]) + dist_to_end * (final_mass / 1000.0)
+                max_mass_kg = max(0.0, float(mass.max()))
+                avg_mass_kg = float(np.cumsum(mass)[-1]) / max(1, len(route_nodes))
+
                 steps = []
-                route_dist = 0
-                route_ton_km = 0.0
-                max_mass_kg = 0.0
-                sum_mass_kg = 0.0
-                step_count_for_avg = 0
                 total_demand = 0
-                
-                route_nodes = []
-                chk_index = index
-                while not routing.IsEnd(chk_index):
-                     n_idx = manager.IndexToNode(chk_index)
-                     route_nodes.append(n_idx)
-                     chk_index = solution.Value(routing.NextVar(chk_index))
-                     
-                current_full = {}
-                current_empty = {}
-                for ct in request.cylinder_types:
-                    current_full[ct.id] = 0
-                    current_empty[ct.id] = 0
-                    
-                for n_idx in route_nodes:
-                    if n_idx not in data['depot_map'].values():
-                        n_data = data['node_map'].get(n_idx)
-                        stop_ref = n_data.get('stop_ref')
-                        if stop_ref and stop_ref.items:
-                            ratio = 1.0
-                            if stop_ref.demand_units > 0: ratio = n_data['demand'] / stop_ref.demand_units 
-                            for item in stop_ref.items:
-                                 qty = int(round(item.deliver_units * ratio))
-                                 current_full[item.cylinder_type_id] = current_full.get(item.cylinder_type_id, 0) + qty
-                
-                cyl_weights = {ct.id: ct for ct in request.cylinder_types}
-                co2_factor = 0.1
-                if request.params.global_settings:
-                    co2_factor = request.params.global_settings.co2_factor_kg_per_ton_km
-                
-                prev_node_val = None
-                prev_departure_val = 0.0 
-                index = routing.Start(vehicle_id)
-                
-                while not routing.IsEnd(index):
-                     node_index = manager.IndexToNode(index)
-                     time_var = time_dimension.CumulVar(index)
-                     service_start_cmin = solution.Min(time_var)
-                     
-                     # Convert back to minutes for report logic
-                     service_start_min = service_start_cmin / 100.0
-                     
-                     # Robust Wait Calculation (using Manual Logic steps for consistency)
-                     speed = float(data['vehicle_speeds'][vehicle_id] or 30.0)
-                     arrival_calculated = service_start_min 
-                     
-                     if prev_node_val is not None:
-                         dist_km_segment = data['distance_matrix_km'][prev_node_val][node_index]
-                         transit_min = (dist_km_segment / speed) * 60.0
-                         arrival_calculated = prev_departure_val + transit_min
-                     
-                     arrival_time = arrival_calculated
-                     arrival = int(round(arrival_time)) 
-                     
-                     waiting_time = int(max(0, service_start_min - arrival_calculated))
-                     
-                     service = data['service_times'][node_index]
-                     departure = service_start_min + service
-                     prev_departure_val = departure 
-                     
-                     win_start_cmin, win_end_cmin = data['time_windows'][node_index]
-                     win_start = win_start_cmin / 100.0
+                arrival_l, departure_l, waiting_l = arrival.tolist(), departure.tolist(), waiting.tolist()
+                dist_l, mass_l = dist.tolist(), mass.tolist()
+                total_f_l, total_e_l = full.sum(axis=1).tolist(), empty.sum(axis=1).tolist()
+                delivered_l, service_l = nodes.demand[nodes_arr].tolist(), nodes.service_min[nodes_arr].tolist()
+                win_start_l = nodes.window_start_cmin[nodes_arr].tolist()
+                win_end_l = nodes.window_end_cmin[nodes_arr].tolist()
+                for k, node_index in enumerate(route_nodes):
+                     if nodes.is_depot(node_index): continue
+                     stop_id_val = nodes.node_id(node_index)
+                     delivered = delivered_l[k]
+                     win_start_cmin, win_end_cmin = win_start_l[k], win_end_l[k]
                      win_end = win_end_cmin / 100.0
-                     
-                     dist_km = 0.0
-                     if prev_node_val is not None:
-                         dist_km = data['distance_matrix_km'][prev_node_val][node_index]
-                         route_dist += dist_km
-                         
-                     current_mass = veh_ref.tare_weight_kg
-                     total_f = 0
-                     total_e = 0
-                     for c_id, qty in current_full.items():
-                         w = cyl_weights.get(c_id)
-                         if w: 
-                             current_mass += qty * w.full_weight_kg
-                             total_f += qty
-                     for c_id, qty in current_empty.items():
-                         w = cyl_weights.get(c_id)
-                         if w: 
-                             current_mass += qty * w.empty_weight_kg
-                             total_e += qty
-                             
-                     if current_mass > max_mass_kg: max_mass_kg = current_mass
-                     sum_mass_kg += current_mass
-                     step_count_for_avg += 1
-                     route_ton_km += dist_km * (current_mass / 1000.0)
-                     
-                     is_depot = (node_index in data['depot_map'].values())
                      late_min = 0
-                     if not is_depot and arrival > win_end: late_min = arrival - win_end
-                     
-                     if not is_depot:
-                         node_data = data['node_map'].get(node_index)
-                         stop_id_val = node_data['chunk_id'] if node_data else "UNKNOWN"
-                         delivered = data['demands'][node_index]
-                         
-                         steps.append(RouteStep(
-                             stop_id=stop_id_val, arrival_time=arrival, departure_time=int(round(departure)), service_time=service,
-                             waiting_time=waiting_time, dist_from_prev_km=round(dist_km, 2), delivered_units=delivered,
-                             late_minutes=late_min, window_start=int(win_start), window_end=int(win_end),
-                             onboard_mass_kg=round(current_mass, 2), full_units_onboard=total_f, empty_units_onboard=total_e
-                         ))
-                         if stop_id_val == "S2_Wait":
-                             print(f"DEBUG: S2_Wait Arr {arrival} Start {service_start_min} Win {win_start} Wait {waiting_time}")
-                         total_demand += delivered
-                         
-                         stop_ref = node_data.get('stop_ref')
-                         if stop_ref and stop_ref.items:
-                            ratio = 1.0
-                            if stop_ref.demand_units > 0: ratio = node_data['demand'] / stop_ref.demand_units
-                            for item in stop_ref.items:
-                                 del_qty = int(round(item.deliver_units * ratio))
-                                 pick_qty = int(round(item.pickup_units * ratio))
-                                 current_full[item.cylinder_type_id] = max(0, current_full.get(item.cylinder_type_id, 0) - del_qty)
-                                 current_empty[item.cylinder_type_id] = current_empty.get(item.cylinder_type_id, 0) + pick_qty
-                     
-                     prev_node_val = node_index
-                     index = solution.Value(routing.NextVar(index))
-                
-                end_index = routing.End(vehicle_id)
-                dist_to_end = 0.0
-                if prev_node_val is not None:
-                     end_node = manager.IndexToNode(end_index)
-                     dist_to_end = data['distance_matrix_km'][prev_node_val][end_node]
-                route_dist += dist_to_end
-                
-                final_mass = veh_ref.tare_weight_kg
-                for c_id, qty in current_full.items():
-                     w = cyl_weights.get(c_id)
-                     if w: final_mass += qty * w.full_weight_kg
-                for c_id, qty in current_empty.items():
-                     w = cyl_weights.get(c_id)
-                     if w: final_mass += qty * w.empty_weight_kg
-                
-                route_ton_km += dist_to_end * (final_mass / 1000.0)
-                r_end_arrival_cmin = solution.Min(time_dimension.CumulVar(end_index))
+                     if arrival_l[k] > win_end: late_min = arrival_l[k] - win_end
+
+                     steps.append(RouteStep(
+                         stop_id=stop_id_val, arrival_time=arrival_l[k], departure_time=int(round(departure_l[k])),
+                         service_time=service_l[k], waiting_time=waiting_l[k],
+                         dist_from_prev_km=round(dist_l[k], 2), delivered_units=delivered, late_minutes=late_min,
+                         window_start=int(win_start_cmin / 100.0), window_end=int(win_end),
+                         onboard_mass_kg=round(mass_l[k], 2), full_units_onboard=total_f_l[k],
+                         empty_units_onboard=total_e_l[k]
+                     ))
+                     total_demand += delivered
+
                 r_co2 = route_ton_km * co2_factor
                 
                 routes.append(VehicleRoute(
                     vehicle_id=final_v_id, steps=steps, total_dist_km=round(route_dist, 2),
                     total_time_min=round((r_end_arrival_cmin - r_start_cmin) / 100.0), total_demand_units=total_demand,
                     total_ton_km=round(route_ton_km, 3), max_onboard_mass_kg=round(max_mass_kg, 2),
-                    avg_onboard_mass_kg=round(sum_mass_kg/max(1, step_count_for_avg), 2), co2_kg=round(r_co2, 3)
+                    avg_onboard_mass_kg=round(avg_mass_kg, 2), co2_kg=round(r_co2, 3)
                 ))
-                if c_model == "TIME":
-                     # print(f"DEBUG: TIME CUMUL START {r_start_cmin} END {r_end_arrival_cmin} Diff {r_end_arrival_cmin - r_start_cmin}")
-                     pass
                 total_time += round((r_end_arrival_cmin - r_start_cmin) / 100.0)
                 total_dist += route_dist
 
+        solve_done = time.perf_counter()
+        timings = PhaseTimings(
+            data_model_seconds=round(data_model_done - solve_started - data['matrix_seconds'], 4),
+            matrix_seconds=round(data['matrix_seconds'], 4),
+            model_build_seconds=round(search_started - data_model_done, 4),
+            search_seconds=round(search_done - search_started, 4),
+            extraction_seconds=round(solve_done - search_done, 4),
+            total_seconds=round(solve_done - solve_started, 4)
+        )
+        search_stats = SearchStats(
+            nodes=data['num_nodes'], vehicles=data['num_vehicles'], vehicle_classes=data['num_vehicle_classes'],
+            solutions=solver.Solutions(),
+            branches=solver.Branches(), failures=solver.Failures(), wall_seconds=round(solver.WallTime() / 1000.0, 3),
+            native_transits=data['native_transits'], callback_transits=data['callback_transits']
+        )
+
     except Exception as e:
         traceback.print_exc()
         with open("solver_error.log", "w") as f:
@@ -484,6 +727,10 @@ def solve_vrp(request: OptimizeRequest) -> OptimizeResponse:
         routes=routes,
         summary=SolutionSummary(
             total_dist_km=round(total_dist, 2), total_time_min=total_time, unserved_stop_ids=unserved_ids,
-            status=status_str, total_ton_km=round(sum_ton_km, 3), total_co2_kg=round(sum_co2, 3)
+            status=status_str, total_ton_km=round(sum_ton_km, 3), total_co2_kg=round(sum_co2, 3),
+            matrix_cache=data.get('matrix_cache'), objective_value=objective_value, solver_config=solver_config,
+            warm_started=warm_started, stop_reason=stop_reason, timings=timings, search_stats=search_stats,
+            solver_nodes=data['num_nodes'], split_stops=data['nodes'].split_stops(),
+            solver_arcs=len(arcs) if arcs is not None else None
         )
     )
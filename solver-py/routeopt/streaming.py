@@ -0,0 +1,191 @@
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from typing import Callable, Dict, Optional
+from .models import OptimizeRequest, SolutionProgress
+
+# The stop flag lives in another process; the solver checks its limits on every search node,
+# so the flag is polled at most this often.
+STOP_POLL_SECONDS = 0.05
+# API side: how often a stream drains the worker's event queue
+EVENT_POLL_SECONDS = 0.05
+
+class SolutionStreamer:
+    """
+    Worker side. Bound to one routing search as an at-solution callback plus a custom limit:
+    records each improving solution, pushes at most one every `interval` seconds through
+    `on_progress`, and ends the search (keeping the best solution) once `stop_requested()` is True.
+    An improvement only stores its objective, time and successor values (one native Assignment.Store());
+    unserved count and routes are read from the stored values when it is pushed.
+    """
+    def __init__(self, routing, manager, data, on_progress: Optional[Callable[[dict], None]] = None,
+                 stop_requested: Optional[Callable[[], bool]] = None, interval: float = 0.5,
+                 include_routes: bool = False):
+        self.routing = routing
+        self.manager = manager
+        self.data = data
+        self.on_progress = on_progress
+        self.stop_requested = stop_requested
+        self.interval = interval
+        self.include_routes = include_routes
+        self.started_at = time.time()
+        self.best_objective = None
+        self.improvements = 0
+        self.accepted = False
+        self._pending = None # (solution_index, objective, elapsed_seconds) of an improvement not pushed yet
+        self._solution = None # Successor values of the last improvement
+        self._last_push = None
+        self._last_poll = 0.0
+
+    def attach(self):
+        self.routing.AddAtSolutionCallback(self.on_solution)
+        self.routing.AddSearchMonitor(self.routing.solver().CustomLimit(self.check_limit))
+        if self.on_progress is not None:
+            self._solution = self.routing.solver().Assignment()
+            self._solution.Add([self.routing.NextVar(i) for i in range(self.routing.Size())])
+
+    def on_solution(self):
+        # Metaheuristics also report accepted non-improving moves; only improvements are streamed
+        objective = self.routing.CostVar().Value()
+        if self.best_objective is not None and objective >= self.best_objective:
+            return
+        self.best_objective = objective
+        self.improvements += 1
+        if self.on_progress is None:
+            return
+        self._solution.Store()
+        self._pending = (self.improvements, objective, round(time.time() - self.started_at, 3))
+        self._flush()
+
+    def check_limit(self) -> bool:
+        if self.accepted:
+            return True
+        now = time.time()
+        if now - self._last_poll < STOP_POLL_SECONDS:
+            return False
+        self._last_poll = now
+        # A throttled improvement is pushed once its interval has passed, even if no better one follows
+        self._flush()
+        if self.stop_requested is not None and self.stop_requested():
+            self.accepted = True
+        return self.accepted
+
+    def _flush(self):
+        if self._pending is None or self.on_progress is None:
+            return
+        now = time.time()
+        if self._last_push is not None and now - self._last_push < self.interval:
+            return
+        solution_index, objective, elapsed = self._pending
+        progress = SolutionProgress(
+            solution_index=solution_index, objective_value=objective, elapsed_seconds=elapsed,
+            unserved_count=self._unserved_count(), routes=self._routes() if self.include_routes else None
+        )
+        self.on_progress(progress.model_dump())
+        self._pending = None
+        self._last_push = now
+
+    def _next(self, index: int) -> int:
+        return self._solution.Value(self.routing.NextVar(index))
+
+    def _unserved_count(self) -> int:
+        routing, manager, nodes = self.routing, self.manager, self.data['nodes']
+        count = 0
+        for i in range(routing.Size()):
+            # Unused reload visits are not unserved stops
+            if not routing.IsStart(i) and self._next(i) == i and not nodes.is_reload(manager.IndexToNode(i)):
+                count += 1
+        return count
+
+    def _routes(self) -> Dict[str, list]:
+        routing, manager, nodes = self.routing, self.manager, self.data['nodes']
+        routes = {}
+        for vehicle_id, v_map in enumerate(self.data['vehicle_map']):
+            index = routing.Start(vehicle_id)
+            if routing.IsEnd(self._next(index)):
+                continue
+            route = []
+            while not routing.IsEnd(index):
+                route.append(manager.IndexToNode(index))
+                index = self._next(index)
+            # Reload visits split a vehicle's route into trips, as in the final plan
+            for trip_k, (lo, hi) in enumerate(nodes.trip_bounds(route)):
+                trip_idx = v_map['trip_idx'] + trip_k
+                v_id = v_map['orig_v'].id
+                if trip_idx > 0: v_id = f"{v_id}#trip{trip_idx + 1}"
+                routes[v_id] = [nodes.node_id(node) for node in route[lo + 1:hi]]
+        return routes
+
+class SolveStream:
+    """
+    API side of one streamed solve: the pool future plus the worker's event queue and stop flag.
+    """
+    def __init__(self, pool, request: OptimizeRequest):
+        self.stream_id = uuid.uuid4().hex
+        mp_manager = pool.manager()
+        self._events = mp_manager.Queue()
+        self._stop = mp_manager.Event()
+        self.future = pool.submit(request, events=self._events, stop=self._stop)
+
+    def stop(self):
+        """
+        Accepts the best plan so far: the worker ends its search and returns it as the result.
+        """
+        if not self.future.done():
+            self._stop.set()
+
+    def _drain(self):
+        progress = []
+        while True:
+            try:
+                progress.append(self._events.get_nowait())
+            except queue.Empty:
+                return progress
+
+    async def events(self):
+        """
+        Yields (event, payload): "solution" per pushed improvement, then one "result" or "error".
+        """
+        while True:
+            done = self.future.done()
+            for progress in await asyncio.to_thread(self._drain):
+                yield "solution", progress
+            if done:
+                break
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+        try:
+            yield "result", self.future.result()["response"]
+        except Exception as e:
+            yield "error", {"detail": f"{type(e).__name__}: {e}"}
+
+class StreamRegistry:
+    """
+    Open streams by id, so a stream can be accepted from a separate request.
+    """
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def open(self, pool, request: OptimizeRequest) -> SolveStream:
+        stream = SolveStream(pool, request)
+        with self._lock:
+            self._streams[stream.stream_id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> Optional[SolveStream]:
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def active(self):
+        with self._lock:
+            return list(self._streams)
+
+    def close(self, stream: SolveStream):
+        # Client gone or result sent: never leave a worker searching for nobody
+        stream.stop()
+        with self._lock:
+            self._streams.pop(stream.stream_id, None)
+
+stream_registry = StreamRegistry()
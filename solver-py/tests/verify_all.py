@@ -55,7 +55,26 @@ def main():
         "verify_p0.py",
         "verify_p1_p2.py",
         "verify_p3.py",
-        "certify_phase0.py"
+        "certify_phase0.py",
+        "verify_matrix.py",
+        "verify_matrix_cache.py",
+        "verify_jobs.py",
+        "verify_pool.py",
+        "verify_portfolio.py",
+        "verify_decompose.py",
+        "verify_warm_start.py",
+        "verify_streaming.py",
+        "verify_early_stop.py",
+        "verify_metrics.py",
+        "verify_extraction.py",
+        "verify_splitting.py",
+        "verify_batch.py",
+        "verify_supplied_matrix.py",
+        "verify_columnar.py",
+        "verify_sparse.py",
+        "verify_symmetry.py",
+        "verify_reloads.py",
+        "verify_result_cache.py"
     ]
     
     results = {}
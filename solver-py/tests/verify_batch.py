@@ -0,0 +1,107 @@
+import sys
+import os
+import json
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from routeopt.api import app, batch_scheduler
+from routeopt.pool import solver_pool
+from routeopt.batch import group_plans, plan_locations, SharedMatrix, shared_matrix_builder
+from routeopt.matrix import compute_distance_matrix, unique_locations
+from routeopt.models import OptimizeRequest
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_plan(depot_id, lat, lng, sites, day, stop_count):
+    # One depot/day: a different subset of the depot's customer sites each day
+    rng = random.Random(f"{depot_id}-{day}")
+    return {
+        "depot": {"id": depot_id, "lat": lat, "lng": lng, "shift_start_min": 0, "shift_end_min": 1000},
+        "vehicles": [{"id": f"{depot_id}-V{v}", "capacity": {"units": 60}, "shift_start_min": 0, "shift_end_min": 1000}
+                     for v in range(3)],
+        "stops": [{"id": f"{depot_id}-S{k}", "lat": sites[k][0], "lng": sites[k][1], "demand_units": 3,
+                   "service_time_min": 5} for k in sorted(rng.sample(range(len(sites)), stop_count))],
+        "params": {"time_limit_seconds": 1, "use_matrix_cache": False}
+    }
+
+def depot_sites(lat, lng, n, seed):
+    rng = random.Random(seed)
+    return [(lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05)) for _ in range(n)]
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def run_verify_batch():
+    print("\n--- Starting Batch Optimize Verification ---")
+    north = depot_sites(12.97, 77.59, 50, seed=1)
+    south = depot_sites(12.80, 77.60, 40, seed=2)
+    payloads = [make_plan("N", 12.97, 77.59, north, day, 35) for day in range(3)]
+    payloads += [make_plan("S", 12.80, 77.60, south, day, 30) for day in range(2)]
+    payloads.append(make_plan("E", 13.20, 77.90, depot_sites(13.20, 77.90, 20, seed=3), 0, 15))
+    invalid = make_plan("X", 13.0, 77.0, north, 0, 5)
+    invalid["stops"] = []
+    payloads.append(invalid)
+    requests = [OptimizeRequest.model_validate(p) for p in payloads[:6]]
+
+    groups = sorted(sorted(g) for g in group_plans([plan_locations(r) for r in requests]))
+    print(f"Groups: {groups}")
+    if groups != [[0, 1, 2], [3, 4], [5]]:
+        fail("Same-depot days should share a matrix, the unrelated plan should not")
+
+    locations, _ = unique_locations([(12.97, 77.59)] + [(s.lat, s.lng) for s in requests[0].stops])
+    shared = SharedMatrix(sorted(plan_locations(requests[0]) | plan_locations(requests[1])))
+    try:
+        gathered = shared_matrix_builder(shared.handle)(locations)
+    finally:
+        shared.release()
+    if not np.array_equal(gathered, compute_distance_matrix(locations)):
+        fail("Gathered matrix differs from a per-plan matrix")
+    print("PASS: Overlapping plans grouped; gathered matrix identical to per-plan computation.")
+
+    solver_pool.max_workers = 2
+    batch_scheduler.max_concurrency = 2
+    with TestClient(app) as client:
+        r = client.post("/optimize/batch", json=payloads)
+        if r.status_code != 200:
+            fail(f"/optimize/batch returned {r.status_code}")
+        events = parse_sse(r.text)
+        if client.post("/optimize/batch", json=[]).status_code != 400:
+            fail("Empty batch should be rejected")
+
+    names = [e for e, _ in events]
+    print(f"Events: {names}")
+    if names[0] != "start" or names[-1] != "done" or names.count("plan") != len(payloads):
+        fail("Expected start, one plan event per request, done")
+    if events[0][1]["shared_matrices"] != 2:
+        fail("Two shared matrices expected")
+    plans = {p["index"]: p for e, p in events if e == "plan"}
+    if plans[6]["status"] != "error" or "No stops" not in plans[6]["detail"]:
+        fail("Invalid plan should be reported as an error event")
+    for i, request in enumerate(requests):
+        if plans[i]["status"] != "done":
+            fail(f"Plan {i} failed: {plans[i].get('detail')}")
+        direct = solve_vrp(request).model_dump()
+        batched = plans[i]["response"]
+        if batched["routes"] != json.loads(json.dumps(direct["routes"])):
+            fail(f"Plan {i}: batched routes differ from a direct solve")
+    done = events[-1][1]
+    print(f"Done: {done}, peak running {batch_scheduler.peak_running}")
+    if done["failed"] != 1 or done["plans"] != len(payloads):
+        fail("Done event should count plans and failures")
+    if batch_scheduler.peak_running > 2 or batch_scheduler.running() != 0:
+        fail("Batch concurrency limit not respected")
+    print("PASS: Plans streamed as they finish, same routes as direct solves, concurrency capped.")
+
+    print("\nPASS: Batch optimize verified.")
+
+if __name__ == "__main__":
+    run_verify_batch()
@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from routeopt import columnar
+from routeopt.api import app
+from routeopt.pool import solver_pool, _solve_packed
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, DemandItem
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(n=25, seed=11):
+    rng = random.Random(seed)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=40), shift_start_min=0, shift_end_min=1200)
+                for i in range(4)]
+    stops = []
+    for i in range(n):
+        windowed = i % 3 == 0
+        stops.append(Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.05, 0.05), lng=77.5946 + rng.uniform(-0.05, 0.05),
+                          demand_units=rng.randint(1, 5), service_time_min=5, priority=rng.choice([1, 2]),
+                          time_window_start=60 if windowed else None, time_window_end=900 if windowed else None,
+                          items=[DemandItem(cylinder_type_id="14kg", deliver_units=2, pickup_units=1)] if i % 4 == 0 else []))
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=1, use_matrix_cache=False))
+
+def expect_error(payload, needle):
+    try:
+        columnar.decode_request(payload)
+    except ValueError as e:
+        if needle not in str(e):
+            fail(f"Expected '{needle}' in '{e}'")
+        return str(e)
+    fail(f"Payload should be rejected ({needle})")
+
+def run_verify_columnar():
+    print("\n--- Starting Columnar Encoding Verification ---")
+    request = make_request()
+    payload = columnar.encode_request(request)
+    decoded = columnar.decode_request(payload)
+    if decoded.num_stops != len(request.stops) or decoded.request.stops:
+        fail("Decoded request should hold stops as columns only")
+    rebuilt = decoded.to_request()
+    if [s.model_dump() for s in rebuilt.stops] != [s.model_dump() for s in request.stops]:
+        fail("Columns should round-trip every stop field and item")
+    print("PASS: Stop columns (optional windows, items) round-trip.")
+
+    shm, envelope = decoded.pack()
+    try:
+        packed = _solve_packed(envelope)["response"]
+    finally:
+        shm.close()
+        shm.unlink()
+    direct = solve_vrp(request).model_dump()
+    if packed["routes"] != direct["routes"]:
+        fail("Solving the packed columns should match solving the JSON request")
+    print("PASS: Packed columns solve to the same routes as the object request.")
+
+    encoded = columnar.encode_response(direct)
+    if columnar.response_routes(columnar.decode_response(encoded)) != direct["routes"]:
+        fail("Columnar response should rebuild the same routes")
+    print(f"PASS: Response columns rebuild {len(direct['routes'])} routes.")
+
+    stops = payload["stops"]
+    short = columnar.column(np.zeros(3), "<f8")
+    fractional = columnar.column(np.full(len(request.stops), 1.5), "<f8")
+    errors = [
+        expect_error({**payload, "format": "other"}, "routeopt-columnar-v1"),
+        expect_error({**payload, "stops": {**stops, "lat": short}}, "stops.lat: expected 25 values"),
+        expect_error({**payload, "stops": {**stops, "demand_units": fractional}}, "must be integers"),
+        expect_error({**payload, "stops": {**stops, "lng": {"dtype": "<f8", "data": "x"}}}, "stops.lng"),
+        expect_error({**payload, "stops": {**stops, "id": ["S0", 1] + stops["id"][2:]}}, "stops.id"),
+        expect_error({**payload, "stops": {**stops, "id": 7}}, "stops.id"),
+        expect_error({**payload, "stops": {**stops, "items": [1, 2]}}, "stops.items: expected a column map"),
+        expect_error({**payload, "request": {**payload["request"], "vehicles": [{"id": "V"}]}}, "capacity"),
+    ]
+    for e in errors:
+        print(f"rejected: {e.splitlines()[0]}")
+    print("PASS: Malformed columns rejected.")
+
+    solver_pool.max_workers = 1
+    with TestClient(app) as client:
+        json_routes = client.post("/optimize", json=json.loads(request.model_dump_json())).json()["routes"]
+        if not columnar.available():
+            r = client.post("/optimize", content=b"\x80", headers={"Content-Type": columnar.MSGPACK_MEDIA_TYPE})
+            if r.status_code != 415:
+                fail(f"Without msgpack installed the content type should get 415, got {r.status_code}")
+            print("SKIP: msgpack not installed, HTTP round trip not exercised (415 checked).")
+        else:
+            r = client.post("/optimize", content=columnar.packb(payload),
+                            headers={"Content-Type": columnar.MSGPACK_MEDIA_TYPE})
+            if r.status_code != 200 or r.headers["content-type"] != columnar.MSGPACK_MEDIA_TYPE:
+                fail(f"MessagePack /optimize returned {r.status_code}")
+            routes = columnar.response_routes(columnar.decode_response(columnar.unpackb(r.content)))
+            if routes != json_routes:
+                fail("MessagePack and JSON /optimize should return the same routes")
+            bad = client.post("/optimize", content=b"\xc1", headers={"Content-Type": columnar.MSGPACK_MEDIA_TYPE})
+            if bad.status_code != 400:
+                fail(f"Undecodable body should get 400, got {bad.status_code}")
+            print("PASS: application/msgpack on /optimize matches the JSON response.")
+
+    print("\nPASS: Columnar encoding verified.")
+
+if __name__ == "__main__":
+    run_verify_columnar()
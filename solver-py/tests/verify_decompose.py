@@ -0,0 +1,123 @@
+import sys
+import os
+import random
+import time
+from collections import Counter, defaultdict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams
+from routeopt.pool import SolverPool
+from routeopt.decompose import solve_decomposed, partition_sweep, partition_kmeans, assign_vehicles, assign_depots, base_stop_id
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(mode, n_stops=240, n_vehicles=12, time_limit=6):
+    rng = random.Random(5)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1440)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=150 if i % 3 else 250), shift_start_min=0,
+                        shift_end_min=1440, speed_kmph=30.0) for i in range(n_vehicles)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.15, 0.15), lng=77.5946 + rng.uniform(-0.15, 0.15),
+                  demand_units=rng.choice([2, 3, 5, 18]), service_time_min=4) for i in range(n_stops)]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=time_limit, decomposition=mode,
+                                               decomposition_max_stops=80))
+
+def check_plan(req, resp):
+    delivered = defaultdict(int)
+    for r in resp.routes:
+        for s in r.steps:
+            delivered[base_stop_id(s.stop_id)] += s.delivered_units
+    unserved = {base_stop_id(u) for u in resp.summary.unserved_stop_ids}
+    for s in req.stops:
+        if s.id in unserved:
+            continue
+        if delivered[s.id] != s.demand_units:
+            fail(f"Stop {s.id} delivered {delivered[s.id]} of {s.demand_units}")
+    used = Counter(r.vehicle_id for r in resp.routes)
+    if any(c > 1 for c in used.values()):
+        fail(f"Vehicle routed in two partitions: {used.most_common(1)}")
+    return len(unserved)
+
+def run_verify_decompose():
+    print("\n--- Starting Decomposition Verification ---")
+    req = make_request("SWEEP")
+    for name, labels in (("SWEEP", partition_sweep(req, 3)), ("KMEANS", partition_kmeans(req, 3))):
+        sizes = Counter(labels)
+        groups = assign_vehicles(req, labels, 3)
+        print(f"{name} partitions: {sorted(sizes.values())}, vehicles per partition: {[len(g) for g in groups]}")
+        if len(sizes) != 3 or any(len(g) == 0 for g in groups):
+            fail(f"{name} partitioning left a partition empty or without vehicles")
+    if partition_kmeans(req, 3) != partition_kmeans(req, 3):
+        fail("k-means partitioning is not deterministic")
+    print("PASS: Partitioning and vehicle matching.")
+
+    pool = SolverPool(max_workers=3)
+    try:
+        pool.start()
+        for mode in ("KMEANS", "SWEEP"):
+            req = make_request(mode)
+            t0 = time.perf_counter()
+            resp = solve_decomposed(req, pool=pool)
+            wall = time.perf_counter() - t0
+            unserved = check_plan(req, resp)
+            print(f"{mode}: {resp.summary.solver_config} status={resp.summary.status} dist={resp.summary.total_dist_km}km "
+                  f"unserved={unserved} repairs={resp.summary.boundary_repairs} wall={wall:.1f}s")
+            for sp in resp.summary.subproblems:
+                print(f"  {sp.name}: stops={sp.stops} vehicles={sp.vehicles} {sp.status} t={sp.wall_seconds}s")
+            if resp.summary.status != "optimized" or len(resp.summary.subproblems) != 3 or unserved:
+                fail("Decomposed solve did not produce 3 optimized partitions")
+            if wall > req.params.time_limit_seconds + 4:
+                fail("Decomposed solve overran its time limit")
+        print("PASS: Partitions solved in parallel, merged and repaired.")
+
+        # Multi-depot: 3 depots, one stop pinned to a far depot explicitly
+        req = make_request("DEPOT", n_stops=60, n_vehicles=6)
+        depots = [Depot(id=f"DP{i}", lat=12.9716 + dlat, lng=77.5946 + dlng, shift_start_min=0, shift_end_min=1440)
+                  for i, (dlat, dlng) in enumerate([(0.1, 0.1), (-0.1, -0.1), (0.1, -0.1)])]
+        req.depot, req.depots = depots[0], depots
+        for i, v in enumerate(req.vehicles):
+            v.depot_id = depots[i % 3].id
+        req.stops[0].lat, req.stops[0].lng = 12.9716 + 0.1, 77.5946 + 0.1
+        req.stops[0].depot_id = "DP1"
+        assigned = assign_depots(req)
+        if assigned[0] != "DP1":
+            fail("Explicit stop depot_id not honored")
+        t0 = time.perf_counter()
+        resp = solve_decomposed(req, pool=pool)
+        wall = time.perf_counter() - t0
+        unserved = check_plan(req, resp)
+        print(f"DEPOT: {resp.summary.solver_config} status={resp.summary.status} unserved={unserved} wall={wall:.1f}s")
+        for sp in resp.summary.subproblems:
+            print(f"  {sp.name}: stops={sp.stops} vehicles={sp.vehicles} {sp.status} t={sp.wall_seconds}s")
+        vehicle_depot = {v.id: v.depot_id for v in req.vehicles}
+        for r in resp.routes:
+            for step in r.steps:
+                if assigned[int(base_stop_id(step.stop_id)[1:])] != vehicle_depot[r.vehicle_id]:
+                    fail(f"{step.stop_id} served from the wrong depot by {r.vehicle_id}")
+        if sorted(sp.name for sp in resp.summary.subproblems) != ["DP0", "DP1", "DP2"] or unserved:
+            fail("Expected one solved subproblem per depot")
+    finally:
+        pool.shutdown()
+    print("PASS: Multi-depot split by depot affinity.")
+
+    # More depots than workers: the depot solves run in sequence and share the time limit
+    req.params.local_search_metaheuristic = "GUIDED_LOCAL_SEARCH"
+    pool = SolverPool(max_workers=1)
+    try:
+        pool.start()
+        t0 = time.perf_counter()
+        resp = solve_decomposed(req, pool=pool)
+        wall = time.perf_counter() - t0
+    finally:
+        pool.shutdown()
+    print(f"DEPOT on 1 worker with GLS: wall={wall:.1f}s for a {req.params.time_limit_seconds}s limit")
+    if wall > req.params.time_limit_seconds + 1 or check_plan(req, resp):
+        fail("Sequential depot solves should stay within the time limit")
+    print("PASS: Depot solves split the time limit.")
+
+    print("\nPASS: Decomposition verified.")
+
+if __name__ == "__main__":
+    run_verify_decompose()
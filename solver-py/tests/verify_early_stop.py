@@ -0,0 +1,66 @@
+import sys
+import os
+import time
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams
+from routeopt.solver import solve_vrp
+
+TIME_LIMIT = 15
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(**params):
+    rng = random.Random(7)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1440)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=30), shift_start_min=0, shift_end_min=1440) for i in range(3)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.05, 0.05), lng=77.5946 + rng.uniform(-0.05, 0.05),
+                  demand_units=2, service_time_min=3) for i in range(40)]
+    params.setdefault("local_search_metaheuristic", "GUIDED_LOCAL_SEARCH")
+    params.setdefault("time_limit_seconds", TIME_LIMIT)
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(use_matrix_cache=False, **params))
+
+def timed_solve(**params):
+    started = time.time()
+    response = solve_vrp(make_request(**params))
+    elapsed = time.time() - started
+    print(f"{params}: stop_reason={response.summary.stop_reason}, objective={response.summary.objective_value}, "
+          f"{elapsed:.2f}s")
+    if response.summary.unserved_stop_ids:
+        fail("Early stop should still return a complete plan")
+    return response, elapsed
+
+def run_verify_early_stop():
+    print("\n--- Starting Early Stopping Verification ---")
+
+    cases = [
+        ({"stop_no_improvement_seconds": 1.0}, "no_improvement"),
+        ({"stop_improvement_window_seconds": 1.0, "stop_min_improvement_ratio": 0.01}, "converged"),
+        ({"stop_solution_limit": 5}, "solution_limit"),
+    ]
+    for params, reason in cases:
+        response, elapsed = timed_solve(**params)
+        if response.summary.stop_reason != reason:
+            fail(f"Expected stop_reason {reason}")
+        if elapsed > TIME_LIMIT / 2:
+            fail(f"{reason} did not stop the search early ({elapsed:.1f}s)")
+    print("PASS: Each rule ends the search early with its reason.")
+
+    # No metaheuristic: plain local search ends at a local optimum on its own
+    response, elapsed = timed_solve(local_search_metaheuristic=None)
+    if response.summary.stop_reason != "completed":
+        fail("Search ending at a local optimum should report completed")
+
+    response, elapsed = timed_solve(time_limit_seconds=2, stop_no_improvement_seconds=TIME_LIMIT)
+    if response.summary.stop_reason != "time_limit":
+        fail("Loose rule should leave the time limit in charge")
+    print("PASS: completed / time_limit reported without early stop.")
+
+    print("\nPASS: Early stopping verified.")
+
+if __name__ == "__main__":
+    run_verify_early_stop()
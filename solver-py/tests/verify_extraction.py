@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import (OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, GlobalSettings,
+                             CylinderType, DemandItem)
+from routeopt.solver import solve_vrp
+
+# Routes produced by the per-step extraction loop this file was recorded with.
+# Regenerate only for a deliberate output change: python verify_extraction.py --write-golden
+GOLDEN = os.path.join(os.path.dirname(__file__), "extraction_golden.json")
+VOLATILE = {"summary": {"matrix_cache", "result_cache", "timings", "search_stats"}}
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def cylinder_request(seed, num_types=50, num_stops=120, cost_model="DISTANCE", multi_trip=False, extra_depot=False,
+                     windows=True):
+    rng = random.Random(seed)
+    types = [CylinderType(id=f"C{t}", full_weight_kg=round(rng.uniform(5, 60), 3),
+                          empty_weight_kg=round(rng.uniform(2, 20), 3)) for t in range(num_types)]
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=360, shift_end_min=1320)
+    depots = [depot, Depot(id="D2", lat=13.01, lng=77.62, shift_start_min=360, shift_end_min=1320)]
+    vehicle_depots = list(depots)
+    if extra_depot:
+        # No vehicles here: the depot is routed through as a plain node
+        depots.append(Depot(id="D3", lat=12.95, lng=77.55, shift_start_min=360, shift_end_min=1320))
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=120), shift_start_min=360, shift_end_min=1320,
+                        speed_kmph=rng.choice([25.0, 30.0, 42.5]), tare_weight_kg=rng.uniform(2000, 6000),
+                        depot_id=vehicle_depots[i % 2].id, fixed_cost=300.0) for i in range(8)]
+    stops = []
+    for i in range(num_stops):
+        items = [DemandItem(cylinder_type_id=f"C{rng.randrange(num_types)}", deliver_units=rng.randint(0, 9),
+                            pickup_units=rng.randint(0, 9)) for _ in range(rng.randint(0, 4) if num_types else 0)]
+        if i % 17 == 0:
+            items.append(DemandItem(cylinder_type_id="UNKNOWN", deliver_units=3, pickup_units=1))
+        demand = sum(it.deliver_units for it in items) or rng.randint(1, 5)
+        start = rng.choice([None, 420, 600, 780]) if windows else None
+        stops.append(Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.1, 0.1), lng=77.5946 + rng.uniform(-0.1, 0.1),
+                          demand_units=demand, service_time_min=rng.randint(3, 15), items=items,
+                          time_window_start=start, time_window_end=None if start is None else start + 90))
+    settings = GlobalSettings(enable_multi_trip=multi_trip, max_trips_per_vehicle=2, co2_factor_kg_per_ton_km=0.083)
+    # Fixed 15-unit split: the node layout the golden output was recorded with
+    params = SolverParams(time_limit_seconds=30, use_matrix_cache=False, cost_model=cost_model, split_chunk_size=15,
+                          fuel_cost_per_km=11.5, driver_cost_per_hour=240.0, global_settings=settings)
+    return OptimizeRequest(depot=depot, depots=depots, vehicles=vehicles, stops=stops, params=params,
+                           cylinder_types=types)
+
+SCENARIOS = {
+    "cylinders_distance": lambda: cylinder_request(1, extra_depot=True),
+    "cylinders_money_multi_trip": lambda: cylinder_request(2, num_stops=80, cost_model="MONEY", multi_trip=True,
+                                                           windows=False),
+    "no_cylinder_types": lambda: cylinder_request(3, num_types=0, num_stops=60),
+}
+
+def solve_all():
+    return {name: solve_vrp(make()).model_dump(exclude=VOLATILE) for name, make in SCENARIOS.items()}
+
+def run_verify_extraction():
+    print("\n--- Starting Extraction Verification ---")
+    results = solve_all()
+    if "--write-golden" in sys.argv:
+        with open(GOLDEN, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"Wrote {GOLDEN}")
+        return
+
+    with open(GOLDEN) as f:
+        golden = json.load(f)
+    for name, result in results.items():
+        # JSON round trip so both sides compare with the same types
+        result = json.loads(json.dumps(result))
+        steps = sum(len(r["steps"]) for r in result["routes"])
+        if result != golden[name]:
+            for i, (a, b) in enumerate(zip(result["routes"], golden[name]["routes"])):
+                if a != b:
+                    fail(f"{name}: route {i} ({a['vehicle_id']}) differs from golden output")
+            fail(f"{name}: output differs from golden output")
+        print(f"{name}: {len(result['routes'])} routes, {steps} steps identical")
+    print("PASS: Extraction output identical to the recorded per-step loop.")
+
+if __name__ == "__main__":
+    run_verify_extraction()
@@ -0,0 +1,87 @@
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from routeopt.api import app
+from routeopt.pool import solver_pool
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_payload(stop_count, time_limit=1):
+    return {
+        "depot": {"id": "D1", "lat": 12.9716, "lng": 77.5946, "shift_start_min": 0, "shift_end_min": 1000},
+        "vehicles": [{"id": "V1", "capacity": {"units": 100}, "shift_start_min": 0, "shift_end_min": 1000}],
+        "stops": [{"id": f"S{i}", "lat": 12.9716 + 0.002 * i, "lng": 77.5946 - 0.001 * i,
+                   "demand_units": 1, "service_time_min": 5} for i in range(stop_count)],
+        "params": {"time_limit_seconds": time_limit}
+    }
+
+def wait_done(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    seen = set()
+    while time.time() < deadline:
+        status = client.get(f"/optimize/jobs/{job_id}").json()
+        seen.add(status["status"])
+        if status["status"] == "running" and status["started_at"] is None:
+            fail(f"Job {job_id} is running without a started_at")
+        if status["status"] in ("done", "failed"):
+            return status, seen
+        time.sleep(0.1)
+    fail(f"Job {job_id} did not finish")
+
+def run_verify_jobs():
+    print("\n--- Starting Async Job API Verification ---")
+    solver_pool.max_workers = 2
+    with TestClient(app) as client:
+        submitted = [client.post("/optimize/jobs", json=make_payload(n)) for n in (4, 6, 8)]
+        for r in submitted:
+            if r.status_code != 202:
+                fail(f"Submit returned {r.status_code}: {r.text}")
+        job_ids = [r.json()["job_id"] for r in submitted]
+        print(f"Submitted: {job_ids}")
+
+        early = client.get(f"/optimize/jobs/{job_ids[-1]}/result")
+        if early.status_code not in (200, 409):
+            fail(f"Unexpected early result status {early.status_code}")
+
+        for job_id, n in zip(job_ids, (4, 6, 8)):
+            status, seen = wait_done(client, job_id)
+            print(f"Job {job_id[:8]}: states seen {sorted(seen)}")
+            if status["status"] != "done":
+                fail(f"Job failed: {status['error']}")
+            result = client.get(f"/optimize/jobs/{job_id}/result")
+            if result.status_code != 200:
+                fail(f"Result returned {result.status_code}")
+            served = sum(len(route["steps"]) for route in result.json()["routes"])
+            if served != n:
+                fail(f"Expected {n} served stops, got {served}")
+        print("PASS: Jobs solved in background and results retrievable.")
+
+        slow = make_payload(8, time_limit=2)
+        slow["params"]["local_search_metaheuristic"] = "GUIDED_LOCAL_SEARCH"
+        job_id = client.post("/optimize/jobs", json=slow).json()["job_id"]
+        status, seen = wait_done(client, job_id)
+        if "running" not in seen:
+            fail(f"Job {job_id} was never reported running: {sorted(seen)}")
+        if not (status["submitted_at"] <= status["started_at"] <= status["finished_at"]):
+            fail(f"Job timestamps out of order: {status}")
+        print("PASS: Running jobs report their start time.")
+
+        if client.get("/optimize/jobs/nope").status_code != 404:
+            fail("Unknown job should 404")
+        if client.post("/optimize/jobs", json={**make_payload(1), "stops": []}).status_code != 400:
+            fail("Empty stop list should be rejected at submit")
+        sweep = make_payload(1)
+        sweep["params"]["first_solution_strategy"] = "SWEEP"
+        if client.post("/optimize/jobs", json=sweep).status_code != 400:
+            fail("Unsupported first_solution_strategy should be rejected at submit")
+        print("PASS: Error statuses.")
+
+    print("\nPASS: Async job API verified.")
+
+if __name__ == "__main__":
+    run_verify_jobs()
@@ -0,0 +1,153 @@
+import sys
+import os
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from routeopt.matrix import haversine_distance, compute_distance_matrix, compute_time_matrix, node_transit_time_cmin, node_distance_matrix_m
+from routeopt.matrix import node_money_cost_cents, LocationTransits
+from ortools.constraint_solver import pywrapcp
+from routeopt import solver
+from routeopt.solver import create_data_model, solve_vrp
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def run_verify_matrix():
+    print("\n--- Starting Matrix Engine Verification ---")
+    rng = random.Random(42)
+    # > MATRIX_BLOCK_ROWS so the blocked/mirrored path is exercised
+    locations = [(12.9716 + rng.uniform(-0.2, 0.2), 77.5946 + rng.uniform(-0.2, 0.2)) for _ in range(700)]
+
+    dist = compute_distance_matrix(locations)
+    if dist.dtype != np.float32 or dist.shape != (700, 700):
+        fail(f"Unexpected distance matrix layout {dist.dtype} {dist.shape}")
+    if not np.array_equal(dist, dist.T):
+        fail("Distance matrix not symmetric")
+    if np.any(np.diag(dist) != 0):
+        fail("Distance matrix diagonal not zero")
+
+    max_err = 0.0
+    for _ in range(3000):
+        i, j = rng.randrange(700), rng.randrange(700)
+        ref = haversine_distance(locations[i][0], locations[i][1], locations[j][0], locations[j][1])
+        max_err = max(max_err, abs(float(dist[i][j]) - ref))
+    print(f"Max abs error vs scalar haversine: {max_err:.2e} km")
+    if max_err > 1e-4:
+        fail("Vectorized haversine diverges from scalar reference")
+    print("PASS: Distance matrix matches scalar haversine.")
+
+    times = compute_time_matrix(locations[:50], speed_kmh=30.0)
+    if times.dtype != np.int32:
+        fail(f"Time matrix dtype {times.dtype}")
+    i, j = 3, 17
+    ref_min = int(round(haversine_distance(*locations[i], *locations[j]) / 30.0 * 60))
+    if abs(int(times[i][j]) - ref_min) > 1:
+        fail(f"Time matrix cell {times[i][j]} vs {ref_min}")
+    print("PASS: Time matrix in whole minutes.")
+
+    # Solver transit matrices: expanded through node_location, same rounding as the old callbacks
+    node_location = [0, 1, 1, 2]
+    service = [0, 10, 10, 5]
+    loc_km = compute_distance_matrix(locations[:3])
+    t_cmin = node_transit_time_cmin(loc_km, node_location, 45.0, service)
+    d_m = node_distance_matrix_m(loc_km, node_location)
+    for a in range(4):
+        for b in range(4):
+            km = float(loc_km[node_location[a]][node_location[b]])
+            if t_cmin[a][b] != int(round((km / 45.0) * 6000.0 + service[a] * 100)):
+                fail(f"Transit cmin mismatch at {a},{b}")
+            if d_m[a][b] != int(km * 1000):
+                fail(f"Transit meters mismatch at {a},{b}")
+    c_cents = node_money_cost_cents(loc_km, node_location, 45.0, service, 12.5, 300.0)
+    for a in range(4):
+        for b in range(4):
+            km = float(loc_km[node_location[a]][node_location[b]])
+            cmin_total = (km / 45.0) * 6000.0 + service[a] * 100
+            if c_cents[a][b] != int((km * 12.5 * 100) + (cmin_total / 6000.0 * 300.0 * 100)):
+                fail(f"MONEY cents mismatch at {a},{b}")
+    print("PASS: Native transit matrices match callback arithmetic.")
+
+    # Callbacks over the location matrix: same values as the node matrices, for every index pair
+    manager = pywrapcp.RoutingIndexManager(4, 2, 0)
+    routing = pywrapcp.RoutingModel(manager)
+    transits = LocationTransits(routing, manager, node_location, np.asarray(service), loc_km)
+    transits.transit_time_cmin(45.0)
+    transits.distance_m()
+    transits.money_cost_cents(45.0, 12.5, 300.0)
+    indices = range(routing.Size() + routing.vehicles())
+    for callback, dense in zip(transits._callbacks, (t_cmin, d_m, c_cents)):
+        for i in indices:
+            for j in indices:
+                expected = dense[manager.IndexToNode(i)][manager.IndexToNode(j)]
+                if callback(i, j) != expected:
+                    fail(f"Location callback {callback(i, j)} != node matrix {expected} at {i},{j}")
+    print("PASS: Location-matrix callbacks match the node matrices.")
+
+    print("\nPASS: Matrix engine verified.")
+
+def run_verify_chunk_dedup():
+    print("\n--- Starting Chunk De-duplication Verification ---")
+    depot = Depot(id="D1", lat=0, lng=0, shift_start_min=0, shift_end_min=1000)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=100), shift_start_min=0, shift_end_min=1000) for i in range(3)]
+    stops = [
+        # 200 units -> 14 chunk nodes at one site
+        Stop(id="S_BIG", lat=0.02, lng=0.01, demand_units=200, service_time_min=20),
+        Stop(id="S_SMALL", lat=0.01, lng=0.02, demand_units=5, service_time_min=5)
+    ]
+    req = OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                          params=SolverParams(time_limit_seconds=2, use_matrix_cache=False, split_chunk_size=15))
+
+    data = create_data_model(req)
+    n_locs = len(data['locations'])
+    print(f"Nodes: {data['num_nodes']}, Locations: {n_locs}, Matrix: {data['location_distance_km'].shape}")
+    if data['num_nodes'] != 16 or n_locs != 3:
+        fail("Chunks were not collapsed onto one location")
+    nodes = data['nodes']
+    big_locs = {data['node_location'][i] for i in range(len(nodes)) if nodes.node_id(i).startswith("S_BIG")}
+    if len(big_locs) != 1:
+        fail("Chunks of one stop map to different locations")
+
+    resp = solve_vrp(req)
+    if resp.summary.unserved_stop_ids:
+        fail(f"Unserved: {resp.summary.unserved_stop_ids}")
+    served_chunks = [s for r in resp.routes for s in r.steps if s.stop_id.startswith("S_BIG#chunk")]
+    # Consecutive chunks at one site travel 0 km
+    for r in resp.routes:
+        for prev, cur in zip(r.steps, r.steps[1:]):
+            if prev.stop_id.split("#")[0] == cur.stop_id.split("#")[0] and cur.dist_from_prev_km != 0.0:
+                fail(f"Non-zero hop between co-located chunks on {r.vehicle_id}")
+    print(f"Served chunks: {len(served_chunks)}, Total dist: {resp.summary.total_dist_km} km")
+    if len(served_chunks) != 14:
+        fail("Not all chunks served")
+
+    # Past the native budget, callbacks over the location matrix must give the same plans
+    req.vehicles[1].speed_kmph = 45.0
+    for cost_model in ("DISTANCE", "TIME", "MONEY"):
+        req.params.cost_model = cost_model
+        native = solve_vrp(req.model_copy(deep=True))
+        callbacks = solve_vrp(req.model_copy(deep=True, update={"params": req.params.model_copy(
+            update={"native_matrix_max_mb": 0})}))
+        if callbacks.model_dump()["routes"] != native.model_dump()["routes"]:
+            fail(f"{cost_model}: location-matrix callbacks should reproduce the native-matrix plan")
+        stats = (native.summary.search_stats, callbacks.summary.search_stats)
+        if stats[0].callback_transits != 0 or stats[1].native_transits != 0 or \
+                stats[0].native_transits != stats[1].callback_transits:
+            fail(f"{cost_model}: search_stats should report native and callback transit tables")
+    print("PASS: Location-matrix callbacks reproduce native plans (DISTANCE, TIME, MONEY).")
+
+    # Tables past the budget fall back in order of use: the distance (arc cost) matrix stays native longest
+    n = 1000
+    entry = solver.NATIVE_ENTRY_BYTES + solver.NATIVE_REGISTER_ENTRY_BYTES
+    tables = [("distance", None), ("time", 30.0), ("time", 45.0)]
+    kept = solver.native_tables(tables, n, n * n * entry)
+    if kept != {("distance", None)} or len(solver.native_tables(tables, n, 3 * n * n * entry)) != 3:
+        fail("Native tables should be chosen in order, as long as they fit the memory budget")
+    print("PASS: Native matrix memory budget keeps the distance matrix native first.")
+    print("\nPASS: Chunk nodes share location rows.")
+
+if __name__ == "__main__":
+    run_verify_matrix()
+    run_verify_chunk_dedup()
@@ -0,0 +1,92 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from routeopt.matrix import compute_distance_matrix
+from routeopt.matrix_cache import MatrixCache, default_matrix_cache
+from routeopt.pool import SolverPool
+from routeopt.solver import solve_vrp
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def run_verify_matrix_cache():
+    print("\n--- Starting Matrix Cache Verification ---")
+    locations = [(12.97 + i * 0.001, 77.59 - i * 0.002) for i in range(40)]
+
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = MatrixCache(disk_dir=disk_dir)
+        m1, src1 = cache.get_or_compute(locations, compute_distance_matrix)
+        m2, src2 = cache.get_or_compute(locations, compute_distance_matrix)
+        print(f"First: {src1}, Second: {src2}")
+        if (src1, src2) != ("miss", "memory"):
+            fail("Expected miss then memory hit")
+
+        # Fresh process-level cache, same disk dir -> mmap tier
+        cold = MatrixCache(disk_dir=disk_dir)
+        m3, src3 = cold.get_or_compute(locations, compute_distance_matrix)
+        print(f"Cold instance: {src3} ({type(m3).__name__})")
+        if src3 != "disk" or not isinstance(m3, np.memmap):
+            fail("Expected memory-mapped disk hit")
+        if not np.array_equal(np.asarray(m3), m1):
+            fail("Disk tier returned a different matrix")
+
+        # Ordered key: reversing the coordinates is a different plan
+        _, src4 = cache.get_or_compute(list(reversed(locations)), compute_distance_matrix)
+        if src4 != "miss":
+            fail("Reordered coordinates must not hit")
+
+        # Disk bound: room for a single 40x40 float32 entry (+ header)
+        tiny = MatrixCache(disk_dir=os.path.join(disk_dir, "tiny"), max_disk_bytes=40 * 40 * 4 + 256)
+        tiny.get_or_compute(locations, compute_distance_matrix)
+        tiny.get_or_compute(locations[:-1] + [(13.5, 77.0)], compute_distance_matrix)
+        files = [f for f in os.listdir(tiny.disk_dir) if f.endswith(".npy")]
+        print(f"Disk entries after eviction: {len(files)}")
+        if len(files) != 1:
+            fail("Disk tier exceeded its size bound")
+
+        stats = cache.stats()
+        print(f"Stats: {stats}")
+        if stats["hits_memory"] != 1 or stats["misses"] != 2:
+            fail("Hit/miss counters wrong")
+    print("PASS: LRU, mmap tier and eviction.")
+
+    depot = Depot(id="D1", lat=0, lng=0, shift_start_min=0, shift_end_min=1000)
+    vehicles = [Vehicle(id="V1", capacity=Capacity(units=100), shift_start_min=0, shift_end_min=1000)]
+    stops = [Stop(id="S1", lat=0.013, lng=0.021, demand_units=1, service_time_min=5),
+             Stop(id="S2", lat=0.027, lng=0.003, demand_units=1, service_time_min=5)]
+    req = lambda use: OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                                      params=SolverParams(time_limit_seconds=1, use_matrix_cache=use))
+    first = solve_vrp(req(True))
+    second = solve_vrp(req(True))
+    off = solve_vrp(req(False))
+    print(f"Solve cache tiers: {first.summary.matrix_cache} -> {second.summary.matrix_cache}, disabled={off.summary.matrix_cache}")
+    if second.summary.matrix_cache != "memory" or off.summary.matrix_cache is not None:
+        fail("create_data_model did not honor use_matrix_cache")
+    if first.summary.total_dist_km != second.summary.total_dist_km:
+        fail("Cached matrix changed the solution")
+    print("PASS: create_data_model honors use_matrix_cache.")
+
+    # Pooled solves look up the worker's cache; the API process's stats must still count them
+    default_matrix_cache.clear()
+    pool = SolverPool(max_workers=1)
+    try:
+        tiers = [pool.solve(req(True)).summary.matrix_cache for _ in range(3)]
+    finally:
+        pool.shutdown()
+    stats = default_matrix_cache.stats()
+    print(f"Pooled tiers: {tiers}, stats: {stats}")
+    if tiers[1:] != ["memory", "memory"] or stats["hits_memory"] != 2 or stats["hits_memory"] + stats["hits_disk"] + stats["misses"] != 3:
+        fail("Pooled lookups should be reported to the API process's stats")
+    if stats["workers"] != 1 or stats["worker_memory_entries"] != 1:
+        fail("Worker memory tiers should be reported")
+    print("PASS: Pool workers report their cache lookups.")
+
+    print("\nPASS: Matrix cache verified.")
+
+if __name__ == "__main__":
+    run_verify_matrix_cache()
@@ -0,0 +1,82 @@
+import sys
+import os
+import re
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from routeopt.api import app
+from routeopt.pool import solver_pool
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? -?[0-9.e+-]+$|^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? \+Inf$')
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_payload(stop_count=30):
+    return {
+        "depot": {"id": "D1", "lat": 12.9716, "lng": 77.5946, "shift_start_min": 0, "shift_end_min": 1000},
+        "vehicles": [{"id": f"V{v}", "capacity": {"units": 50}, "shift_start_min": 0, "shift_end_min": 1000}
+                     for v in range(3)],
+        "stops": [{"id": f"S{i}", "lat": 12.9716 + 0.002 * (i % 9), "lng": 77.5946 - 0.003 * (i % 7),
+                   "demand_units": 2, "service_time_min": 5} for i in range(stop_count)],
+        "params": {"time_limit_seconds": 1}
+    }
+
+def sample_value(text, name, **labels):
+    for line in text.splitlines():
+        if line.startswith(name) and all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+def run_verify_metrics():
+    print("\n--- Starting Timings & Metrics Verification ---")
+    solver_pool.max_workers = 1
+    with TestClient(app) as client:
+        for _ in range(2):
+            r = client.post("/optimize", json=make_payload())
+            if r.status_code != 200:
+                fail(f"/optimize returned {r.status_code}")
+        summary = r.json()["summary"]
+        timings, stats = summary["timings"], summary["search_stats"]
+        print(f"Timings: {timings}")
+        print(f"Search stats: {stats}")
+        if timings is None or stats is None:
+            fail("Response should carry timings and search_stats")
+        if any(v is None or v < 0 for v in timings.values()):
+            fail("Every phase should be timed")
+        solve_phases = sum(timings[f"{p}_seconds"] for p in
+                           ("data_model", "matrix", "model_build", "search", "extraction"))
+        if abs(solve_phases - timings["total_seconds"]) > 0.01:
+            fail(f"Phases ({solve_phases:.4f}s) should add up to total ({timings['total_seconds']}s)")
+        if stats["nodes"] != 31 or stats["vehicles"] != 3 or stats["solutions"] < 1:
+            fail("Unexpected search stats")
+        print("PASS: Per-phase timings and search stats in the response.")
+
+        time.sleep(0.2) # Pool done-callbacks record the solve
+        text = client.get("/metrics")
+        if text.status_code != 200 or not text.headers["content-type"].startswith("text/plain"):
+            fail("/metrics should serve Prometheus text")
+        body = text.text
+        for line in body.splitlines():
+            if not line.startswith("#") and not SAMPLE.match(line):
+                fail(f"Malformed sample line: {line}")
+        if sample_value(body, "routeopt_solve_phase_seconds_count", phase="search") != 2:
+            fail("Search phase histogram should count both solves")
+        if sample_value(body, "routeopt_solve_phase_seconds_count", phase="validation") != 2:
+            fail("Validation phase histogram should count both solves")
+        if sample_value(body, "routeopt_solve_nodes_bucket", le="50") != 2:
+            fail("Node-count histogram should place both 31-node solves under 50")
+        if sample_value(body, "routeopt_http_request_seconds_count", route="/optimize", status="200") != 2:
+            fail("HTTP latency histogram should count both requests")
+        if sample_value(body, "routeopt_solves_total", status="optimized") != 2:
+            fail("Solve counter should count both solves")
+        if sample_value(body, "routeopt_solver_queue_depth") != 0:
+            fail("Queue should be empty")
+        print("PASS: /metrics exposes latency, phase, node-count histograms and queue gauges.")
+
+    print("\nPASS: Timings & metrics verified.")
+
+if __name__ == "__main__":
+    run_verify_metrics()
@@ -0,0 +1,87 @@
+import sys
+import os
+import time
+import base64
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from routeopt.models import (OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, CylinderType, DemandItem,
+                             MatrixInput)
+from routeopt.pool import SolverPool, pack_request, unpack_request
+from routeopt.matrix_store import load_matrix_input
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request():
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1000)
+    vehicles = [Vehicle(id="V1", capacity=Capacity(units=100), shift_start_min=0, shift_end_min=1000, tare_weight_kg=2000)]
+    stops = [
+        Stop(id="S1", lat=12.9750, lng=77.5950, demand_units=10, service_time_min=10,
+             time_window_start=100, time_window_end=400,
+             items=[DemandItem(cylinder_type_id="C1", deliver_units=10, pickup_units=4)]),
+        Stop(id="S2", lat=12.9650, lng=77.5940, demand_units=20, service_time_min=15, depot_id="D1"),
+        Stop(id="S3", lat=12.9800, lng=77.6000, demand_units=3, service_time_min=5, priority=3),
+    ]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           cylinder_types=[CylinderType(id="C1", full_weight_kg=20, empty_weight_kg=10)],
+                           params=SolverParams(time_limit_seconds=1))
+
+def run_verify_pool():
+    print("\n--- Starting Solver Pool Verification ---")
+    req = make_request()
+
+    shm, envelope = pack_request(req)
+    try:
+        rebuilt = unpack_request(envelope)
+    finally:
+        shm.close()
+        shm.unlink()
+    if rebuilt.model_dump() != req.model_dump():
+        fail("Shared-memory round trip changed the request")
+    if type(rebuilt.stops[0].demand_units) is not int or rebuilt.stops[1].time_window_start is not None:
+        fail("Column types not restored")
+    print("PASS: Shared-memory request round trip.")
+
+    # An inline matrix is decoded once and travels in the block, not base64 in the pickled envelope
+    meters = np.arange(16, dtype="<i4").reshape(4, 4) * 100
+    np.fill_diagonal(meters, 0)
+    with_matrix = make_request()
+    with_matrix.matrix = MatrixInput(dtype="int32", distances=base64.b64encode(meters.tobytes()).decode("ascii"))
+    shm, envelope = pack_request(with_matrix)
+    try:
+        rebuilt = unpack_request(envelope)
+    finally:
+        shm.close()
+        shm.unlink()
+    if envelope["request"]["matrix"] is not None or "distances" not in envelope["arrays"]:
+        fail("Inline matrix should be packed into shared memory")
+    if not np.array_equal(load_matrix_input(rebuilt.matrix, 4).distances, meters):
+        fail("Shared-memory matrix round trip changed the values")
+    print("PASS: Inline matrix packed into shared memory.")
+
+    pool = SolverPool(max_workers=2)
+    try:
+        t0 = time.perf_counter()
+        pool.start()
+        print(f"Pool warm in {time.perf_counter() - t0:.2f}s")
+        t0 = time.perf_counter()
+        pooled = pool.solve(make_request())
+        print(f"Pooled solve: {time.perf_counter() - t0:.3f}s")
+    finally:
+        pool.shutdown()
+
+    local = solve_vrp(make_request())
+    # Cache tier and wall-clock measurements legitimately differ between the two runs
+    volatile = {"summary": {"matrix_cache", "timings", "search_stats"}}
+    if pooled.model_dump(exclude=volatile) != local.model_dump(exclude=volatile):
+        fail("Pooled solve differs from in-process solve")
+    print("PASS: Pooled solve matches in-process solve.")
+
+    print("\nPASS: Solver pool verified.")
+
+if __name__ == "__main__":
+    run_verify_pool()
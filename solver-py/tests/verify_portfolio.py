@@ -0,0 +1,83 @@
+import sys
+import os
+import random
+import time
+import multiprocessing
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, FIRST_SOLUTION_STRATEGIES
+from routeopt.pool import SolverPool
+from routeopt.portfolio import solve_portfolio, PORTFOLIO_CONFIGS
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(**params):
+    rng = random.Random(11)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1000)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=40), shift_start_min=0, shift_end_min=1000) for i in range(4)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.05, 0.05), lng=77.5946 + rng.uniform(-0.05, 0.05),
+                  demand_units=rng.randint(1, 6), service_time_min=5) for i in range(30)]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=2, **params))
+
+def run_verify_portfolio():
+    print("\n--- Starting Portfolio Verification ---")
+
+    single = solve_vrp(make_request(first_solution_strategy="SAVINGS", local_search_metaheuristic="TABU_SEARCH"))
+    print(f"Single run config: {single.summary.solver_config}, objective {single.summary.objective_value}")
+    if single.summary.solver_config != "SAVINGS/TABU_SEARCH":
+        fail("Strategy/metaheuristic params not applied")
+    if any(fs not in FIRST_SOLUTION_STRATEGIES for fs, _ in PORTFOLIO_CONFIGS):
+        fail("Portfolio uses a first-solution strategy single runs reject")
+
+    pool = SolverPool(max_workers=3)
+    try:
+        pool.start()
+        t0 = time.perf_counter()
+        resp = solve_portfolio(make_request(portfolio=True), pool=pool)
+        wall = time.perf_counter() - t0
+    finally:
+        pool.shutdown()
+
+    runs = resp.summary.portfolio_runs or []
+    for r in runs:
+        print(f"  {r.solver_config:<45} {r.status:<10} obj={r.objective_value} dist={r.total_dist_km} t={r.wall_seconds}s")
+    print(f"Winner: {resp.summary.solver_config} in {wall:.2f}s wall")
+    if len(runs) != 3 or [r.solver_config for r in runs] != [f"{fs}/{ls}" for fs, ls in PORTFOLIO_CONFIGS[:3]]:
+        fail("Expected one run per portfolio worker")
+    best = min(r.objective_value for r in runs if r.objective_value is not None)
+    if resp.summary.objective_value != best:
+        fail("Portfolio did not return the best objective")
+    if wall > 2 * 2 + 2:
+        fail("Portfolio runs did not overlap in time")
+    if resp.summary.unserved_stop_ids:
+        fail(f"Unserved: {resp.summary.unserved_stop_ids}")
+    print("PASS: Portfolio returns best of parallel runs and reports the winner.")
+
+    # Through a solver pool: coordinated in this process, runs in the one subsolve pool it owns
+    os.environ["ROUTEOPT_SUBSOLVE_WORKERS"] = "2"
+    outer = SolverPool(max_workers=2)
+    try:
+        futures = [outer.submit(make_request(portfolio=True, portfolio_size=2)) for _ in range(2)]
+        results = [f.result()["response"] for f in futures]
+        children = len(multiprocessing.active_children())
+    finally:
+        outer.shutdown()
+        del os.environ["ROUTEOPT_SUBSOLVE_WORKERS"]
+    print(f"Two pooled portfolio plans: {[r['summary']['solver_config'] for r in results]}, {children} solver processes")
+    if children != 2 or any(len(r["summary"]["portfolio_runs"]) != 2 for r in results):
+        fail("Pooled portfolio plans should share one bounded subsolve pool")
+    deadline = time.time() + 10
+    while multiprocessing.active_children() and time.time() < deadline:
+        time.sleep(0.1)
+    if multiprocessing.active_children():
+        fail("solver_pool.shutdown() should stop the subsolve pool")
+    print("PASS: Pooled portfolio plans share one subsolve pool, stopped with the solver pool.")
+
+    print("\nPASS: Portfolio verified.")
+
+if __name__ == "__main__":
+    run_verify_portfolio()
@@ -0,0 +1,94 @@
+import sys
+import os
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, GlobalSettings
+from routeopt.solver import create_data_model, solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(model, trips=3, n=45, seed=4):
+    rng = random.Random(seed)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=20), shift_start_min=0, shift_end_min=1200) for i in range(4)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.06, 0.06), lng=77.5946 + rng.uniform(-0.06, 0.06),
+                  demand_units=rng.randint(1, 4), service_time_min=5) for i in range(n)]
+    settings = GlobalSettings(enable_multi_trip=True, max_trips_per_vehicle=trips, reload_time_min=30,
+                              multi_trip_model=model)
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=2, use_matrix_cache=False, global_settings=settings))
+
+def trips_by_truck(resp):
+    trucks = {}
+    for route in resp.routes:
+        truck, _, trip = route.vehicle_id.partition("#trip")
+        trucks.setdefault(truck, {})[int(trip) if trip else 1] = route
+    return trucks
+
+def run_verify_reloads():
+    print("\n--- Starting Multi-Trip Reload Verification ---")
+    request = make_request("RELOADS")
+    data = create_data_model(request)
+    nodes = data['nodes']
+    if data['num_vehicles'] != 4 or nodes.num_reloads != 8 or len(nodes) != 1 + 45 + 8:
+        fail("RELOADS should keep one vehicle per truck and add trips - 1 reload visits each")
+    if nodes.node_id(len(nodes) - 1) != "D1#reload_7" or not nodes.is_depot(len(nodes) - 1) or nodes.stop_index[len(nodes) - 1] >= 0:
+        fail("Reload rows should be depot visits, not stops")
+    if nodes.location_rows()[-8:].tolist() != [0] * 8 or data['vehicle_reloads'][1] != [48, 49]:
+        fail("Reload rows should sit at their truck's depot")
+    print("PASS: 4 trucks -> 4 vehicles + 8 reload visits (clones would be 12 vehicles).")
+
+    resp = solve_vrp(request)
+    if resp.summary.unserved_stop_ids or resp.summary.search_stats.vehicles != 4:
+        fail("Reload plan should serve every stop with one vehicle per truck")
+    served = sorted(s.stop_id for r in resp.routes for s in r.steps)
+    if served != sorted(s.id for s in request.stops):
+        fail("Every stop should appear once, and no reload visit as a step")
+    multi = 0
+    for truck, trips in trips_by_truck(resp).items():
+        if sorted(trips) != list(range(1, len(trips) + 1)) or len(trips) > 3:
+            fail(f"{truck}: trips should be numbered 1..n (n <= 3), got {sorted(trips)}")
+        for k in range(1, len(trips) + 1):
+            route = trips[k]
+            if route.total_demand_units > 20:
+                fail(f"{route.vehicle_id} carries {route.total_demand_units} units on a 20-unit truck")
+            if k > 1 and route.steps[0].arrival_time < trips[k - 1].steps[-1].departure_time + 30:
+                fail(f"{route.vehicle_id} leaves before the previous trip is back and reloaded")
+        multi += len(trips) > 1
+    if not multi:
+        fail("The plan needs more than one trip per truck")
+    print(f"PASS: {len(resp.routes)} trips on {len(trips_by_truck(resp))} trucks, loads <= capacity, reload time kept "
+          f"({resp.summary.total_dist_km} km; {resp.summary.solver_config}).")
+
+    clones = solve_vrp(make_request("CLONES"))
+    print(f"CLONES: {clones.summary.total_dist_km} km on {clones.summary.search_stats.vehicles} vehicles")
+    if clones.summary.unserved_stop_ids:
+        fail("Clone plan should still serve every stop")
+
+    warm = request.model_copy(update={"initial_routes": resp.routes})
+    rewarm = solve_vrp(warm)
+    if not rewarm.summary.warm_started or rewarm.summary.unserved_stop_ids:
+        fail("A reload plan should warm start its own re-solve")
+    if rewarm.summary.objective_value > resp.summary.objective_value:
+        fail("Warm start from a plan should not end worse than that plan")
+    print("PASS: #tripN routes map back onto reload visits for warm starts.")
+
+    events = []
+    streamed = request.model_copy(deep=True)
+    streamed.params.stream_interval_seconds = 0
+    streamed.params.stream_routes = True
+    solve_vrp(streamed, on_progress=events.append)
+    last = events[-1]
+    if last["unserved_count"]:
+        fail("Unused reload visits should not count as unserved")
+    if not any("#trip" in v for v in last["routes"]) or any("#reload" in s for ids in last["routes"].values() for s in ids):
+        fail("Streamed routes should be split into #tripN like the final plan")
+    print("PASS: Streamed progress reports trips, not reload visits.")
+
+    print("\nPASS: Multi-trip reload visits verified.")
+
+if __name__ == "__main__":
+    run_verify_reloads()
@@ -0,0 +1,151 @@
+import sys
+import os
+import time
+import random
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from routeopt.api import app
+from routeopt.pool import solver_pool
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, DemandItem, MatrixInput
+from routeopt.result_cache import ResultCache, request_key, default_result_cache
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(n=30, seed=8, **params):
+    rng = random.Random(seed)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1000)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=40), shift_start_min=0, shift_end_min=1000) for i in range(3)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.05, 0.05), lng=77.5946 + rng.uniform(-0.05, 0.05),
+                  demand_units=rng.randint(1, 4), service_time_min=5,
+                  items=[DemandItem(cylinder_type_id="14kg", deliver_units=1, pickup_units=0),
+                         DemandItem(cylinder_type_id="19kg", deliver_units=1, pickup_units=1)] if i % 5 == 0 else [])
+             for i in range(n)]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=5, use_matrix_cache=False, **params))
+
+class CountingSolve:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return solve_vrp(request)
+
+def run_verify_result_cache():
+    print("\n--- Starting Result Cache Verification ---")
+    request = make_request()
+    shuffled = request.model_copy(deep=True)
+    random.Random(1).shuffle(shuffled.stops)
+    shuffled.vehicles.reverse()
+    shuffled.stops[0].items.reverse()
+    shuffled.stops[0].lat += 1e-15
+    shuffled.params.stream_routes = True
+    changed = request.model_copy(deep=True)
+    changed.stops[3].demand_units += 1
+    if request_key(shuffled) != request_key(request) or request_key(changed) == request_key(request):
+        fail("Key should ignore ordering, float noise and delivery params, but not plan changes")
+    # A supplied matrix indexes stops by position: permuting them is a different plan
+    with_matrix = request.model_copy(update={"matrix": MatrixInput(matrix_id="abc123")})
+    permuted = with_matrix.model_copy(deep=True)
+    permuted.stops.reverse()
+    if request_key(permuted) == request_key(with_matrix):
+        fail("With a supplied matrix, stop order should be part of the key")
+    print("PASS: Canonical key ignores ordering/float formatting and changes with the plan (and matrix row order).")
+
+    gls = make_request(60, local_search_metaheuristic="GUIDED_LOCAL_SEARCH", deterministic=True, stop_solution_limit=80)
+    first, second = solve_vrp(gls), solve_vrp(gls.model_copy(deep=True))
+    if first.summary.stop_reason != "solution_limit" or first.model_dump()["routes"] != second.model_dump()["routes"]:
+        fail("Deterministic GLS should end on its solution limit with the same routes every time")
+    print(f"PASS: Deterministic GLS reproduces its plan ({first.summary.objective_value}, "
+          f"{first.summary.search_stats.solutions} solutions).")
+
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    solve = CountingSolve(delay=0.3)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_solve(request, solve))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sources = sorted(r.summary.result_cache for r in results)
+    if solve.calls != 1 or sources.count("miss") != 1 or len({str(r.routes) for r in results}) != 1:
+        fail(f"Concurrent duplicates should share one solve, got {solve.calls} solves ({sources})")
+    print(f"PASS: 4 concurrent identical requests -> 1 solve ({sources}).")
+
+    solved = next(r for r in results if r.summary.result_cache == "miss")
+    hit = cache.get_or_solve(shuffled, solve)
+    if solve.calls != 1 or hit.summary.result_cache != "memory" or hit.routes != results[0].routes:
+        fail("A re-submitted plan should come from memory")
+    if hit.summary.timings.search_seconds != 0.0 or hit.summary.timings.total_seconds >= solved.summary.timings.total_seconds:
+        fail("A hit should report its own (lookup) timings, not the reused solve's")
+    hit.summary.timings.validation_seconds = 99.0
+    if cache.get_or_solve(request, solve).summary.timings.validation_seconds == 99.0:
+        fail("Callers should get copies of the cached response")
+
+    timed = make_request(local_search_metaheuristic="GUIDED_LOCAL_SEARCH")
+    timed.params.time_limit_seconds = 1
+    cache.get_or_solve(timed, solve)
+    cache.get_or_solve(timed, solve)
+    if solve.calls != 3 or cache.stats()["not_stored"] != 2:
+        fail("Time-limited (not reproducible) plans should be solved every time")
+    print("PASS: Hits return copies; time-limited plans are not stored.")
+
+    for seed in (20, 21):
+        cache.get_or_solve(make_request(seed=seed), solve)
+    calls = solve.calls
+    cache.get_or_solve(request, solve)
+    if solve.calls != calls + 1 or cache.stats()["memory_entries"] != 2:
+        fail("LRU should keep max_entries plans")
+    short = ResultCache(ttl_seconds=0.2)
+    short.get_or_solve(request, solve)
+    time.sleep(0.3)
+    if short.get_or_solve(request, solve).summary.result_cache != "miss":
+        fail("Entries should expire after the TTL")
+    print("PASS: LRU and TTL eviction.")
+
+    with tempfile.TemporaryDirectory() as disk_dir:
+        ResultCache(disk_dir=disk_dir).get_or_solve(request, solve)
+        calls = solve.calls
+        restarted = ResultCache(disk_dir=disk_dir)
+        from_disk = restarted.get_or_solve(request, solve)
+        again = restarted.get_or_solve(request, solve)
+        if solve.calls != calls or from_disk.summary.result_cache != "disk" or again.summary.result_cache != "memory":
+            fail("A new process should answer from the disk tier, then memory")
+        if from_disk.routes != results[0].routes:
+            fail("Disk entries should round-trip the routes")
+        tiny = ResultCache(disk_dir=disk_dir, max_disk_bytes=1)
+        tiny.get_or_solve(make_request(seed=22), solve)
+        if len(os.listdir(disk_dir)) > 1:
+            fail("Disk tier should evict down to its byte bound")
+    print("PASS: Disk tier survives a restart and stays within its bound.")
+
+    solver_pool.max_workers = 1
+    default_result_cache.clear()
+    payload = make_request(use_result_cache=True).model_dump(mode="json")
+    with TestClient(app) as client:
+        first = client.post("/optimize", json=payload).json()
+        second = client.post("/optimize", json=payload).json()
+        opted_out = client.post("/optimize", json={**payload, "params": {**payload["params"], "use_result_cache": False}})
+        stats = client.get("/api/cache/result").json()
+    if first["summary"]["result_cache"] != "miss" or second["summary"]["result_cache"] != "memory":
+        fail("/optimize should answer the second identical request from the cache")
+    if first["routes"] != second["routes"] or opted_out.json()["summary"]["result_cache"] is not None:
+        fail("Cached routes should match, and use_result_cache=false should bypass the cache")
+    if stats["hits_memory"] != 1 or stats["misses"] != 1:
+        fail(f"Unexpected cache stats {stats}")
+    print(f"PASS: /optimize re-submission served from cache ({stats['solve_seconds_saved']}s saved).")
+
+    print("\nPASS: Result cache verified.")
+
+if __name__ == "__main__":
+    run_verify_result_cache()
@@ -0,0 +1,104 @@
+import sys
+import os
+import base64
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, MatrixInput
+from routeopt.neighbors import nearest_neighbors, SparseArcs
+from routeopt.matrix import EARTH_RADIUS_KM, compute_distance_matrix
+from routeopt.solver import solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(n, sparse_neighbors=None, cost_model="DISTANCE", first_solution_strategy=None, seed=3):
+    rng = random.Random(seed)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=60), shift_start_min=0, shift_end_min=1200,
+                        speed_kmph=[30.0, 45.0][i % 2]) for i in range(max(3, n // 15))]
+    # S0 is bigger than any vehicle: its chunks share a location
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.08, 0.08), lng=77.5946 + rng.uniform(-0.08, 0.08),
+                  demand_units=75 if i == 0 else rng.randint(1, 5), service_time_min=5) for i in range(n)]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=2, use_matrix_cache=False, cost_model=cost_model,
+                                               fuel_cost_per_km=12.0, driver_cost_per_hour=250.0,
+                                               sparse_neighbors=sparse_neighbors,
+                                               first_solution_strategy=first_solution_strategy))
+
+def kept_pairs(request, k):
+    # Location-level arcs a k-nearest plan may use: neighbor pairs (either direction), same location, depot legs
+    points = [(request.depot.lat, request.depot.lng)] + [(s.lat, s.lng) for s in request.stops]
+    lat, lng = zip(*points)
+    pairs = set()
+    for i, row in enumerate(nearest_neighbors(lat, lng, k).tolist()):
+        pairs.update((i, j) for j in row)
+        pairs.update((j, i) for j in row)
+    return pairs
+
+def run_verify_sparse():
+    print("\n--- Starting Sparse Arc Verification ---")
+    rng = random.Random(9)
+    # Two clusters, an outlier and duplicates: rings must grow past empty cells
+    points = [(12.9 + rng.gauss(0, 0.01), 77.5 + rng.gauss(0, 0.01)) for _ in range(300)]
+    points += [(13.1 + rng.gauss(0, 0.02), 77.7 + rng.gauss(0, 0.02)) for _ in range(300)]
+    points += [(13.6, 78.3)] + points[:20]
+    lat, lng = np.radians(np.asarray(points)).T
+    x, y = EARTH_RADIUS_KM * lng * np.cos(lat.mean()), EARTH_RADIUS_KM * lat
+    d2 = (x[:, None] - x[None, :]) ** 2 + (y[:, None] - y[None, :]) ** 2
+    np.fill_diagonal(d2, np.inf)
+    found = nearest_neighbors(*zip(*points), 8)
+    kth = np.sort(d2, axis=1)[:, 7]
+    if found.shape != (len(points), 8) or not np.all(np.take_along_axis(d2, found, axis=1).max(axis=1) <= kth):
+        fail("Grid search should return the exact k nearest (projected) points")
+    print("PASS: Grid k-nearest matches brute force (clusters, outlier, duplicates).")
+
+    arcs = SparseArcs.build(points, [0], 8)
+    dense = compute_distance_matrix(points)
+    n = len(points)
+    rows, cols = divmod(arcs.keys, n)
+    print(f"Kept arcs: {len(arcs)} of {n * n} ({arcs.nbytes() / 1e3:.0f} KB vs {dense.nbytes / 1e3:.0f} KB dense)")
+    if len(arcs) > n * (2 * 8 + 1) + 2 * n or not np.array_equal(arcs.km, dense[rows, cols].astype(np.float64)):
+        fail("Kept arcs should be linear in n and carry the dense km values")
+    probe_r, probe_c = np.arange(n), np.arange(n)[::-1]
+    if not np.array_equal(arcs[probe_r, probe_c], dense[probe_r, probe_c].astype(np.float64)) or arcs[3, 500] != dense[3, 500]:
+        fail("Indexing should fall back to haversine for arcs that were not kept")
+    print("PASS: Sparse arcs are linear in size and index like the dense matrix.")
+
+    # Every arc kept: exactly the dense model, for each cost model
+    for cost_model in ("DISTANCE", "TIME", "MONEY"):
+        plain = solve_vrp(make_request(40, None, cost_model, "PATH_CHEAPEST_ARC")).model_dump()
+        full = solve_vrp(make_request(40, 1000, cost_model, "PATH_CHEAPEST_ARC")).model_dump()
+        if plain["routes"] != full["routes"]:
+            fail(f"{cost_model}: sparse mode keeping every arc should reproduce the dense routes")
+    print("PASS: With every arc kept, sparse callbacks reproduce the dense plans (DISTANCE, TIME, MONEY).")
+
+    request = make_request(150, 6)
+    resp = solve_vrp(request)
+    allowed = kept_pairs(request, 6)
+    row = {s.id: i + 1 for i, s in enumerate(request.stops)}
+    for route in resp.routes:
+        legs = [row[s.stop_id.split("#")[0]] for s in route.steps]
+        for a, b in zip(legs, legs[1:]):
+            if a != b and (a, b) not in allowed:
+                fail(f"{route.vehicle_id}: S{a - 1} -> S{b - 1} is not a kept arc")
+    print(f"k=6: {resp.summary.total_dist_km} km, {resp.summary.solver_arcs} arcs, {resp.summary.solver_config}")
+    if resp.summary.unserved_stop_ids or resp.summary.solver_arcs is None:
+        fail("Sparse plan should serve every stop and report its arcs")
+    print("PASS: Routes only follow kept arcs and serve every stop.")
+
+    km = compute_distance_matrix([(request.depot.lat, request.depot.lng)] + [(s.lat, s.lng) for s in request.stops])
+    meters = np.rint(km.astype(np.float64) * 1000.0).astype(np.int32)
+    supplied = request.model_copy(update={"matrix": MatrixInput(
+        dtype="int32", distances=base64.b64encode(meters.tobytes()).decode("ascii"))})
+    resp = solve_vrp(supplied)
+    if resp.summary.unserved_stop_ids or resp.summary.solver_arcs != solve_vrp(request).summary.solver_arcs:
+        fail("A supplied matrix should keep the same neighbor arcs")
+    print("PASS: Neighbors picked from a supplied matrix.")
+
+    print("\nPASS: Sparse arcs verified.")
+
+if __name__ == "__main__":
+    run_verify_sparse()
@@ -0,0 +1,66 @@
+import sys
+import os
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams
+from routeopt.nodes import fleet_split
+from routeopt.solver import create_data_model, solve_vrp
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_request(capacities, demands, split_chunk_size=None):
+    rng = random.Random(7)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=c), shift_start_min=0, shift_end_min=1200)
+                for i, c in enumerate(capacities)]
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.05, 0.05), lng=77.5946 + rng.uniform(-0.05, 0.05),
+                  demand_units=d, service_time_min=10) for i, d in enumerate(demands)]
+    return OptimizeRequest(depot=depot, vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=2, use_matrix_cache=False,
+                                               split_chunk_size=split_chunk_size))
+
+def run_verify_splitting():
+    print("\n--- Starting Adaptive Splitting Verification ---")
+    if fleet_split([100, 100, 50]) != (100, 100):
+        fail("Chunks should fit the capacity most of the fleet has")
+    if fleet_split([200, 50, 50, 50]) != (200, 50):
+        fail("Orders should be split only above the largest capacity")
+    if fleet_split([100, 60], override=15) != (15, 15):
+        fail("Override should fix threshold and chunk size")
+    if fleet_split([0])[0] is not None:
+        fail("A fleet without capacity should split nothing")
+    print("PASS: Split threshold and chunk size follow the fleet.")
+
+    # Typical plan: 40 orders of 16-60 units, trucks of 120
+    demands = [16 + (i * 7) % 45 for i in range(40)]
+    adaptive = create_data_model(make_request([120] * 6, demands))
+    legacy = create_data_model(make_request([120] * 6, demands, split_chunk_size=15))
+    print(f"Nodes: adaptive {adaptive['num_nodes']}, fixed 15-unit split {legacy['num_nodes']}")
+    if adaptive['num_nodes'] != 41 or adaptive['nodes'].split_stops() != 0:
+        fail("Orders every truck can carry should stay single nodes")
+    if legacy['num_nodes'] < 2 * adaptive['num_nodes']:
+        fail("Fixed split should create several times more nodes")
+    print("PASS: No split when a vehicle can carry the order.")
+
+    # One order above every capacity: split into chunks the 100-unit trucks carry, all served
+    resp = solve_vrp(make_request([100, 100, 100, 40], [250, 10, 20, 30]))
+    served = {}
+    for r in resp.routes:
+        for step in r.steps:
+            served[step.stop_id] = served.get(step.stop_id, 0) + step.delivered_units
+    print(f"Summary nodes {resp.summary.solver_nodes}, split stops {resp.summary.split_stops}, served {served}")
+    if resp.summary.unserved_stop_ids:
+        fail(f"Unserved: {resp.summary.unserved_stop_ids}")
+    if resp.summary.solver_nodes != 1 + 3 + 3 or resp.summary.split_stops != 1:
+        fail("Response should report 3 chunks for the 250-unit order")
+    if sorted(v for k, v in served.items() if k.startswith("S0#chunk_")) != [50, 100, 100]:
+        fail("Chunks should be 100 + 100 + 50 units")
+    print("PASS: Oversized order split by fleet capacity and node count reported.")
+
+    print("\nPASS: Adaptive splitting verified.")
+
+if __name__ == "__main__":
+    run_verify_splitting()
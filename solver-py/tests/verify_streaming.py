@@ -0,0 +1,128 @@
+import sys
+import os
+import json
+import time
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from routeopt.api import app
+from routeopt.pool import solver_pool
+from routeopt.streaming import stream_registry
+
+TIME_LIMIT = 20
+ACCEPT_AFTER = 3
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def make_payload(stop_count=80, include_routes=False):
+    return {
+        "depot": {"id": "D1", "lat": 12.9716, "lng": 77.5946, "shift_start_min": 0, "shift_end_min": 1440},
+        "vehicles": [{"id": f"V{v}", "capacity": {"units": 40}, "shift_start_min": 0, "shift_end_min": 1440}
+                     for v in range(4)],
+        "stops": [{"id": f"S{i}", "lat": 12.9716 + 0.003 * ((i * 7) % 23), "lng": 77.5946 - 0.002 * ((i * 11) % 31),
+                   "demand_units": 1, "service_time_min": 2} for i in range(stop_count)],
+        "params": {"time_limit_seconds": TIME_LIMIT, "local_search_metaheuristic": "GUIDED_LOCAL_SEARCH",
+                   "stream_interval_seconds": 0.2, "stream_routes": include_routes}
+    }
+
+def sse_events(lines):
+    event = None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+def check_progress(progress, include_routes):
+    objectives = [p["objective_value"] for p in progress]
+    if not objectives:
+        fail("No solution events streamed")
+    if objectives != sorted(objectives, reverse=True) or len(set(objectives)) != len(objectives):
+        fail(f"Streamed objectives must strictly improve: {objectives}")
+    if include_routes and not progress[-1]["routes"]:
+        fail("stream_routes=True should include routes")
+
+def run_verify_streaming():
+    print("\n--- Starting Streaming Verification ---")
+    solver_pool.max_workers = 1
+    with TestClient(app) as client:
+        # SSE: TestClient buffers the body, so the stream runs in a thread and is accepted from here
+        started = time.time()
+        response = {}
+        reader = threading.Thread(target=lambda: response.update(
+            r=client.post("/optimize/stream", json=make_payload(include_routes=True))))
+        reader.start()
+        deadline = time.time() + 30
+        while not stream_registry.active() and time.time() < deadline:
+            time.sleep(0.05)
+        if not stream_registry.active():
+            fail("Stream never opened")
+        time.sleep(ACCEPT_AFTER)
+        accepted = client.post(f"/optimize/stream/{stream_registry.active()[0]}/accept")
+        if accepted.status_code != 200:
+            fail(f"Accept returned {accepted.status_code}: {accepted.text}")
+        reader.join(60)
+        if response["r"].status_code != 200 or not response["r"].headers["content-type"].startswith("text/event-stream"):
+            fail(f"Stream returned {response['r'].status_code}")
+        events = list(sse_events(response["r"].text.splitlines()))
+        if events[0][0] != "start":
+            fail("First event should be start")
+        progress = [data for event, data in events if event == "solution"]
+        result = next((data for event, data in events if event == "result"), None)
+        elapsed = time.time() - started
+        print(f"SSE: {len(progress)} progress events, result after {elapsed:.2f}s "
+              f"(objectives {[p['objective_value'] for p in progress]})")
+        check_progress(progress, include_routes=True)
+        if result is None:
+            fail("No result event")
+        if elapsed > TIME_LIMIT * 0.75:
+            fail(f"Accepting did not end the search early ({elapsed:.1f}s)")
+        if result["summary"]["stop_reason"] != "accepted":
+            fail(f"Expected stop_reason accepted, got {result['summary']['stop_reason']}")
+        if result["summary"]["objective_value"] > progress[-1]["objective_value"]:
+            fail("Result is worse than the last streamed solution")
+        served = sum(len(route["steps"]) for route in result["routes"])
+        print(f"Result: objective {result['summary']['objective_value']}, served {served}")
+        print("PASS: SSE stream and early accept.")
+
+        if client.post("/optimize/stream/nope/accept").status_code != 404:
+            fail("Unknown stream should 404")
+
+        # WebSocket: same events, accept sent over the socket
+        started = time.time()
+        progress, result = [], None
+        with client.websocket_connect("/optimize/ws") as ws:
+            ws.send_json(make_payload())
+            while True:
+                message = ws.receive_json()
+                if message["event"] == "solution":
+                    progress.append(message["data"])
+                    if len(progress) == 2:
+                        ws.send_json({"action": "accept"})
+                elif message["event"] == "result":
+                    result = message["data"]
+                    break
+                elif message["event"] == "error":
+                    fail(f"WebSocket error: {message['data']}")
+        elapsed = time.time() - started
+        print(f"WebSocket: {len(progress)} progress events, result after {elapsed:.2f}s")
+        check_progress(progress, include_routes=False)
+        if progress[0]["routes"] is not None:
+            fail("Routes should be omitted unless stream_routes")
+        if result["summary"]["stop_reason"] != "accepted" or elapsed > TIME_LIMIT * 0.75:
+            fail("WebSocket accept did not end the search early")
+        print("PASS: WebSocket stream and early accept.")
+
+        with client.websocket_connect("/optimize/ws") as ws:
+            ws.send_json({**make_payload(), "stops": []})
+            if ws.receive_json()["event"] != "error":
+                fail("Empty stop list should be rejected")
+        print("PASS: Invalid WebSocket request rejected.")
+
+    print("\nPASS: Streaming verified.")
+
+if __name__ == "__main__":
+    run_verify_streaming()
@@ -0,0 +1,150 @@
+import sys
+import os
+import base64
+import random
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from routeopt.api import app
+from routeopt.pool import solver_pool
+from routeopt.matrix import compute_distance_matrix
+from routeopt.models import OptimizeRequest, Vehicle, Stop, Depot, Capacity, SolverParams, MatrixInput
+from routeopt.solver import solve_vrp
+from routeopt.matrix_store import MatrixStore, SuppliedMatrix, MatrixNotFound
+
+def fail(msg):
+    print(f"FAIL: {msg}")
+    sys.exit(1)
+
+def b64(values, dtype):
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+def make_request(n=30, seed=5, depots=None):
+    rng = random.Random(seed)
+    depot = Depot(id="D1", lat=12.9716, lng=77.5946, shift_start_min=0, shift_end_min=1200)
+    vehicles = [Vehicle(id=f"V{i}", capacity=Capacity(units=40), shift_start_min=0, shift_end_min=1200,
+                        speed_kmph=rng.choice([25.0, 40.0]), depot_id=(depots or [depot])[i % len(depots or [depot])].id)
+                for i in range(5)]
+    # S0 is bigger than any vehicle: its chunks share the stop's matrix row
+    stops = [Stop(id=f"S{i}", lat=12.9716 + rng.uniform(-0.06, 0.06), lng=77.5946 + rng.uniform(-0.06, 0.06),
+                  demand_units=60 if i == 0 else rng.randint(1, 6), service_time_min=5) for i in range(n)]
+    return OptimizeRequest(depot=depot, depots=depots or [], vehicles=vehicles, stops=stops,
+                           params=SolverParams(time_limit_seconds=2, use_matrix_cache=False))
+
+def plan_coordinates(request):
+    depots = list({d.id: d for d in [request.depot] + request.depots}.values())
+    return [(d.lat, d.lng) for d in depots] + [(s.lat, s.lng) for s in request.stops]
+
+def run_verify_supplied_matrix():
+    print("\n--- Starting Supplied Matrix Verification ---")
+    base = make_request()
+    km = compute_distance_matrix(plan_coordinates(base))
+    supplied = base.model_copy(update={"matrix": MatrixInput(size=km.shape[0], dtype="float32",
+                                                             distances=b64(km, "<f4"), distance_unit="km")})
+    plain, given = solve_vrp(base).model_dump(), solve_vrp(supplied).model_dump()
+    print(f"Computed: {plain['summary']['total_dist_km']} km, supplied: {given['summary']['total_dist_km']} km, "
+          f"matrix phase {given['summary']['timings']['matrix_seconds']}s")
+    if plain["routes"] != given["routes"] or given["summary"]["split_stops"] != 1:
+        fail("Supplying the haversine matrix should reproduce the computed plan")
+    print("PASS: Supplied km matrix (chunked stop included) gives the same routes as the computed one.")
+
+    # Road matrix in whole meters with a flat 6-minute drive between any two sites
+    meters = np.rint(km.astype(np.float64) * 1300.0).astype(np.int32)
+    seconds = np.full(meters.shape, 360, dtype=np.int32)
+    np.fill_diagonal(seconds, 0)
+    road = base.model_copy(update={"matrix": MatrixInput(dtype="int32", distances=b64(meters, "<i4"),
+                                                         durations=b64(seconds, "<i4"))})
+    resp = solve_vrp(road)
+    rows = {s.id: i + 1 for i, s in enumerate(base.stops)}
+    for route in resp.routes:
+        prev = None
+        for step in route.steps:
+            if prev is not None and rows[step.stop_id.split("#")[0]] != rows[prev.stop_id.split("#")[0]]:
+                if step.arrival_time != prev.departure_time + 6:
+                    fail(f"{route.vehicle_id}: arrival should follow the supplied 6-minute duration")
+            expected_km = meters[rows[prev.stop_id.split("#")[0]] if prev else 0, rows[step.stop_id.split("#")[0]]] / 1000.0
+            if abs(step.dist_from_prev_km - expected_km) > 0.0051: # reported to 2 decimals
+                fail(f"{route.vehicle_id}: leg distance should come from the supplied meters")
+            prev = step
+    if resp.summary.unserved_stop_ids:
+        fail("Road-matrix plan should serve every stop")
+    print("PASS: Supplied meters and durations drive distances and arrival times.")
+
+    # Multi-depot decomposition cuts the matrix per depot
+    depots = [base.depot, Depot(id="D2", lat=12.93, lng=77.62, shift_start_min=0, shift_end_min=1200)]
+    multi = make_request(depots=depots)
+    multi.params.decomposition = "DEPOT"
+    for stop in multi.stops:
+        stop.demand_units = 2 # Each depot's vehicles can carry its share
+    flat = np.full((2 + len(multi.stops),) * 2, 1000, dtype=np.int32)
+    np.fill_diagonal(flat, 0)
+    multi.matrix = MatrixInput(dtype="int32", distances=b64(flat, "<i4"))
+    resp = solve_vrp(multi)
+    for route in resp.routes:
+        legs = [s.dist_from_prev_km for s in route.steps if s.dist_from_prev_km]
+        if any(abs(d - 1.0) > 1e-9 for d in legs):
+            fail("Decomposed subproblems should use the supplied (sliced) matrix")
+    if resp.summary.unserved_stop_ids:
+        fail("Decomposed plan should serve every stop")
+    print("PASS: Decomposition slices the supplied matrix per subproblem.")
+
+    solver_pool.max_workers = 1
+    payload = road.model_dump()
+    with TestClient(app) as client:
+        r = client.post("/optimize", json=payload)
+        if r.status_code != 200 or r.json()["routes"] != resp_routes(solve_vrp(road)):
+            fail(f"/optimize with an inline matrix returned {r.status_code}")
+        uploaded = client.post("/matrices", json={**payload["matrix"], "size": len(meters)})
+        if uploaded.status_code != 201:
+            fail(f"Upload returned {uploaded.status_code}: {uploaded.text}")
+        matrix_id = uploaded.json()["matrix_id"]
+        by_id = client.post("/optimize", json={**payload, "matrix": {"matrix_id": matrix_id}})
+        if by_id.status_code != 200 or by_id.json()["routes"] != r.json()["routes"]:
+            fail("Referencing a stored matrix should match the inline matrix")
+        print(f"PASS: Stored matrix {matrix_id} referenced by id.")
+
+        short = {**payload, "stops": payload["stops"][:-1]}
+        checks = {
+            "size mismatch": client.post("/optimize", json=short),
+            "bad base64": client.post("/optimize", json={**payload, "matrix": {"distances": "not base64!"}}),
+            "unknown id": client.post("/optimize", json={**payload, "matrix": {"matrix_id": "0" * 32}}),
+            "bad dtype": client.post("/optimize", json={**payload, "matrix": {**payload["matrix"], "dtype": "float64"}}),
+        }
+        for name, check in checks.items():
+            print(f"{name}: {check.status_code} {check.json()['detail']}")
+            if check.status_code != 400:
+                fail(f"{name} should be rejected with 400")
+        if client.delete(f"/matrices/{matrix_id}").status_code != 200 or \
+                client.get(f"/matrices/{matrix_id}").status_code != 404:
+            fail("Deleted matrix should be gone")
+    print("PASS: Matrix dimensions and format validated against the plan.")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        square = np.arange(100, dtype=np.float32).reshape(10, 10)
+        store = MatrixStore(store_dir, max_bytes=2 * (square.nbytes + 256))  # two matrices with .npy headers and meta
+        first, second = (store.put(SuppliedMatrix(square + k, None, "m")) for k in (0, 1))
+        store.size(first)  # first is now the most recently used
+        third = store.put(SuppliedMatrix(square + 2, None, "m"))
+        try:
+            store.size(second)
+            fail("Least recently used matrix should be evicted over the byte budget")
+        except MatrixNotFound:
+            pass
+        if store.size(first) != 10 or store.size(third) != 10:
+            fail("Recently used matrices should stay in the store")
+        try:
+            store.put(SuppliedMatrix(np.zeros((20, 20), dtype=np.float32), None, "m"))
+            fail("A matrix over the store budget should be rejected")
+        except ValueError:
+            pass
+    print("PASS: Matrix store evicts least recently used matrices over its byte budget.")
+
+    print("\nPASS: Supplied matrices verified.")
+
+def resp_routes(response):
+    return [r.model_dump() for r in response.routes]
+
+if __name__ == "__main__":
+    run_verify_supplied_matrix()